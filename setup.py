@@ -17,6 +17,13 @@ requirements = [
     'mypy'
 ]
 
+extras_requirements = {
+    'graph': ['numpy'],
+    'http2': ['httpx[http2]'],
+    'parquet': ['pyarrow'],
+    'redis': ['redis'],
+}
+
 test_requirements = [ ]
 
 setup(
@@ -35,6 +42,12 @@ setup(
     ],
     description="A robust and scalable API client to crawl Twitter API politely and within limits.",
     install_requires=requirements,
+    extras_require=extras_requirements,
+    entry_points={
+        'console_scripts': [
+            'twitter-api-crawler=twitter_api_crawler.cli:main',
+        ],
+    },
     license="MIT license",
     long_description=readme + '\n\n' + history,
     include_package_data=True,
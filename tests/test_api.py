@@ -1,9 +1,14 @@
 import unittest
-from twitter_api_crawler.api import TwitterAPIv1
+from twitter_api_crawler.api import (
+    TwitterAPIv1,
+    TwitterAPIv2,
+    fetch_bearer_token,
+)
 from twitter_api_crawler.exceptions import (
     Twitter404Exception,
     Twitter503Exception,
-    Twitter429Exception
+    Twitter429Exception,
+    TwitterAPIClientException,
 )
 import responses
 import csv
@@ -110,3 +115,219 @@ class TestTwitterAPIv1(unittest.TestCase):
         with self.assertRaises(Twitter429Exception):
             self.api.lookup_users(screen_name)
 
+
+class TestAppOnlyAuth(unittest.TestCase):
+
+    @responses.activate
+    def test_fetch_bearer_token(self):
+        responses.add(
+            responses.POST,
+            'https://api.twitter.com/oauth2/token',
+            json={'token_type': 'bearer', 'access_token': 'AAAA'},
+        )
+
+        self.assertEqual(fetch_bearer_token('key', 'secret'), 'AAAA')
+        request = responses.calls[0].request
+        self.assertTrue(request.headers['Authorization'].startswith('Basic '))
+        self.assertEqual(request.body, 'grant_type=client_credentials')
+
+    @responses.activate
+    def test_fetch_bearer_token_refused(self):
+        responses.add(
+            responses.POST,
+            'https://api.twitter.com/oauth2/token',
+            status=403,
+            json={'errors': [{'code': 99}]},
+        )
+
+        with self.assertRaises(TwitterAPIClientException):
+            fetch_bearer_token('key', 'wrong')
+
+    @responses.activate
+    def test_requests_carry_the_bearer_token(self):
+        responses.add(
+            responses.POST,
+            'https://api.twitter.com/1.1/users/lookup.json',
+            json=[{'id': 1, 'screen_name': 'jack'}],
+        )
+        api = TwitterAPIv1.from_bearer_token('AAAA', key_id='app')
+
+        api.lookup_users('jack')
+
+        request = responses.calls[0].request
+        self.assertEqual(request.headers['Authorization'], 'Bearer AAAA')
+        self.assertTrue(api.app_only)
+        self.assertFalse(api.supports('friendships/lookup'))
+        self.assertTrue(api.supports('followers/list'))
+
+
+class TestTwitterAPIv2(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.api = TwitterAPIv2('a', 'b', 'c', 'd')
+
+    @responses.activate
+    def test_lookup_users(self):
+        responses.add(
+            responses.GET,
+            'https://api.twitter.com/2/users/by',
+            json={
+                'data': [{'id': '12', 'name': 'jack', 'username': 'jack'}],
+                'errors': [{'value': 'nobody', 'title': 'Not Found Error'}],
+            },
+        )
+
+        users = self.api.lookup_users('jack,nobody', user_fields=['url'])
+
+        self.assertEqual(users, [{'id': '12', 'name': 'jack',
+                                  'username': 'jack'}])
+        params = responses.calls[0].request.params
+        self.assertEqual(params['usernames'], 'jack,nobody')
+        self.assertEqual(params['user.fields'], 'url')
+
+    @responses.activate
+    def test_get_followers_pages(self):
+        url = 'https://api.twitter.com/2/users/12/followers'
+        responses.add(
+            responses.GET,
+            url,
+            json={
+                'data': [{'id': '1'}],
+                'meta': {'result_count': 1, 'next_token': 'ABC'},
+            },
+        )
+        responses.add(
+            responses.GET,
+            url,
+            json={'data': [{'id': '2'}], 'meta': {'result_count': 1}},
+        )
+
+        first = self.api.get_followers(12)
+        last = self.api.get_followers(12, first['next_token'])
+
+        self.assertEqual(first['users'], [{'id': '1'}])
+        self.assertEqual(first['next_token'], 'ABC')
+        self.assertIsNone(last['next_token'])
+        self.assertEqual(
+            responses.calls[0].request.params['max_results'], '1000',
+        )
+        self.assertNotIn('pagination_token', responses.calls[0].request.params)
+        self.assertEqual(
+            responses.calls[1].request.params['pagination_token'], 'ABC',
+        )
+        self.assertEqual(self.api._endpoint(url), 'users/:id/followers')
+
+    @responses.activate
+    def test_unknown_account(self):
+        responses.add(
+            responses.GET,
+            'https://api.twitter.com/2/users/99/following',
+            json={'errors': [{'value': '99', 'title': 'Not Found Error'}]},
+        )
+
+        with self.assertRaises(Twitter404Exception):
+            self.api.get_following(99)
+
+    def test_from_client(self):
+        v1 = TwitterAPIv1('a', 'b', 'c', 'd', key_id='k1',
+                          base_url='http://127.0.0.1:8000/1.1')
+
+        v2 = TwitterAPIv2.from_client(v1)
+
+        self.assertEqual(v2.base_url, 'http://127.0.0.1:8000/2')
+        self.assertIs(v2.auth, v1.auth)
+        self.assertIs(v2.transport, v1.transport)
+        v1.sleep(60)
+        self.assertFalse(v2.is_asleep())
+
+
+class TestTwitterAPIv1Hooks(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.api = TwitterAPIv1(
+            api_key="test_api_key",
+            api_key_secret='b',
+            access_token='c',
+            access_token_secret='d',
+            key_id='boom',
+        )
+        self.url = 'https://api.twitter.com/1.1/friends/list.json'
+        self.events = []
+
+    def record(self, event):
+        return lambda info: self.events.append((event, dict(info)))
+
+    def test_unknown_event(self):
+        with self.assertRaises(TwitterAPIClientException):
+            self.api.add_hook('on_success', print)
+
+    @responses.activate
+    def test_before_and_after(self):
+        responses.add(
+            method='GET',
+            url=self.url,
+            json={'users': [], 'next_cursor': 0},
+        )
+        self.api.add_hook('before_request', self.record('before'))
+        self.api.add_hook('after_response', self.record('after'))
+        self.api.get_following('bob')
+
+        self.assertEqual([_[0] for _ in self.events], ['before', 'after'])
+        before, after = self.events[0][1], self.events[1][1]
+        self.assertEqual(before['endpoint'], 'friends/list')
+        self.assertEqual(before['key_id'], 'boom')
+        self.assertEqual(before['params']['screen_name'], 'bob')
+        self.assertNotIn('status', before)
+        self.assertEqual(after['status'], 200)
+        self.assertGreater(after['size'], 0)
+        self.assertGreaterEqual(after['elapsed'], 0)
+
+    @responses.activate
+    def test_before_request_can_change_params(self):
+        responses.add(
+            method='GET',
+            url=self.url,
+            json={'users': [], 'next_cursor': 0},
+        )
+        self.api.add_hook(
+            'before_request',
+            lambda info: info['params'].update(count=10),
+        )
+        self.api.get_following('bob')
+        self.assertIn('count=10', responses.calls[0].request.url)
+
+    @responses.activate
+    def test_on_rate_limit(self):
+        responses.add(method='GET', url=self.url, status=429, json={})
+        self.api.add_hook('on_rate_limit', self.record('rate_limit'))
+        self.api.add_hook('on_error', self.record('error'))
+
+        with self.assertRaises(Twitter429Exception):
+            self.api.get_following('bob')
+
+        self.assertEqual([_[0] for _ in self.events], ['rate_limit'])
+
+    @responses.activate
+    def test_on_error(self):
+        responses.add(method='GET', url=self.url, status=503, json={})
+        self.api.add_hook('on_error', self.record('error'))
+
+        with self.assertRaises(Twitter503Exception):
+            self.api.get_following('bob')
+
+        self.assertEqual(self.events[0][1]['status'], 503)
+
+    @responses.activate
+    def test_remove_hook(self):
+        responses.add(
+            method='GET',
+            url=self.url,
+            json={'users': [], 'next_cursor': 0},
+        )
+        callback = self.record('after')
+        self.api.add_hook('after_response', callback)
+        self.api.remove_hook('after_response', callback)
+        self.api.get_following('bob')
+
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.api.hooks, {})
@@ -0,0 +1,35 @@
+import unittest
+from twitter_api_crawler.benchmark import percentile, run_benchmark
+
+
+class TestPercentile(unittest.TestCase):
+
+    def test_empty(self):
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(percentile(samples, 50), 50)
+        self.assertEqual(percentile(samples, 99), 99)
+        self.assertEqual(percentile(samples, 100), 100)
+
+
+class TestRunBenchmark(unittest.TestCase):
+
+    def test_small_run(self):
+        results = run_benchmark(
+            keys=2,
+            targets=3,
+            users=300,
+            window=0.5,
+            page_limit=2,
+        )
+
+        self.assertGreater(results['pages'], 0)
+        self.assertGreater(results['users'], 0)
+        self.assertEqual(set(results['key_requests']), {'key0', 'key1'})
+        self.assertLessEqual(results['key_utilization'], 1.0)
+        self.assertLessEqual(
+            results['p50_page_latency'],
+            results['p99_page_latency'],
+        )
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import time
+import unittest
+
+from twitter_api_crawler.cassette import RecordingTransport, ReplayTransport
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.sinks import MemorySink
+
+
+class TestCassette(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'crawl.ndjson.gz')
+        self.graph = SyntheticGraph(num_users=2000)
+        self.api = MockTwitterAPI(
+            graph=self.graph,
+            rate_limits={'followers/list': 6},
+            latency=0.02,
+        )
+        self.server = MockTwitterServer(self.api).start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        self.tmpdir.cleanup()
+
+    def crawl(self, transport):
+        crawler = TwitterAPIv1Crawler(sleep_period=600)
+        for key in ('k1', 'k2'):
+            crawler.create_api(
+                key, key, 'b', 'c', 'd',
+                base_url=self.server.base_url,
+                transport=transport,
+            )
+        sink = MemorySink()
+        result = crawler.crawl('user1', sink, 'followers')
+        return result, sink.records
+
+    def record(self):
+        recorder = RecordingTransport(self.path)
+        recorded = self.crawl(recorder)
+        recorder.close()
+        return recorded, recorder.entries
+
+    def test_replay_without_the_api(self):
+        (result, records), entries = self.record()
+        self.assertTrue(result['completed'])
+        # Six pages on the first key, its 429, then the rest on the second.
+        self.assertEqual(entries, result['pages'] + 1)
+
+        requests_before = sum(self.api.stats.values())
+
+        replay = ReplayTransport(self.path)
+        replayed, replayed_records = self.crawl(replay)
+
+        self.assertEqual(replayed, result)
+        self.assertEqual(replayed_records, records)
+        self.assertEqual(sum(self.api.stats.values()), requests_before)
+
+    def test_exhausted_cassette(self):
+        self.record()
+        replay = ReplayTransport(self.path)
+        self.crawl(replay)
+
+        with self.assertRaises(TwitterAPIClientException):
+            self.crawl(replay)
+
+        replay.rewind()
+        result, records = self.crawl(replay)
+        self.assertEqual(len(records), len(self.graph.followers[1]))
+
+    def test_original_timing(self):
+        self.record()
+
+        started = time.monotonic()
+        self.crawl(ReplayTransport(self.path))
+        fast = time.monotonic() - started
+
+        started = time.monotonic()
+        self.crawl(ReplayTransport(self.path, original_timing=True))
+        original = time.monotonic() - started
+
+        self.assertGreater(original, 11 * 0.02)
+        self.assertLess(fast, original)
@@ -0,0 +1,170 @@
+import glob
+import gzip
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
+
+from twitter_api_crawler.cli import main, read_usernames, save_checkpoint
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.sinks import NDJSONSink
+
+
+class TestReadUsernames(unittest.TestCase):
+
+    def test_strips_and_dedupes(self):
+        lines = ['jack\n', '@jack\n', '\n', '  biz \n']
+        self.assertEqual(read_usernames(lines), ['jack', 'biz'])
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.graph = SyntheticGraph(num_users=1000)
+        self.api = MockTwitterAPI(
+            graph=self.graph,
+            rate_limits={'followers/list': 100},
+        )
+        self.server = MockTwitterServer(self.api).start()
+
+        self.keys = self.path('keys.json')
+        self.write(self.keys, json.dumps({
+            'k1': {
+                'api_key': 'k1',
+                'api_key_secret': 'b',
+                'access_token': 'c',
+                'access_token_secret': 'd',
+            },
+            'k1:app': {'api_key': 'k1', 'api_key_secret': 'b', 'app_only': 1},
+        }))
+        self.usernames = self.path('users.txt')
+        self.write(self.usernames, 'user1\nuser2\nuser3\nnobody\n')
+        self.output = self.path('out')
+        self.checkpoint = self.path('checkpoint.json')
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def write(self, path, content):
+        with open(path, 'w') as output:
+            output.write(content)
+
+    def run_cli(self, *args):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            main([
+                *args,
+                '--keys', self.keys,
+                '--output', self.output,
+                '--checkpoint', self.checkpoint,
+                '--base-url', self.server.base_url,
+            ])
+        return json.loads(stdout.getvalue())
+
+    def records(self):
+        records = []
+        for path in sorted(glob.glob(os.path.join(self.output, '*.gz'))):
+            with gzip.open(path, 'rt') as lines:
+                records.extend(json.loads(line) for line in lines)
+        return records
+
+    def test_followers_with_checkpoint(self):
+        stats = self.run_cli('followers', '--input', self.usernames, '--lean')
+
+        expected = sum(len(self.graph.followers[_]) for _ in (1, 2, 3))
+        self.assertEqual(stats['users'], expected)
+        records = self.records()
+        self.assertEqual(len(records), expected)
+        self.assertNotIn('entities', records[0])
+        self.assertEqual(
+            {_['crawled_from'] for _ in records},
+            {'user1', 'user2', 'user3'},
+        )
+
+        with open(self.checkpoint) as checkpoint:
+            cursors = json.load(checkpoint)['cursors']['followers']
+        for username in ('user1', 'user2', 'user3'):
+            self.assertEqual(cursors[username], 0)
+
+        stats = self.run_cli('followers', '--input', self.usernames)
+        self.assertEqual(stats['users'], 0)
+        self.assertEqual(stats['accounts'], 1)
+
+    def test_api_version_2(self):
+        stats = self.run_cli(
+            'followers', '--input', self.usernames, '--api-version', '2',
+        )
+
+        expected = sum(len(self.graph.followers[_]) for _ in (1, 2, 3))
+        self.assertEqual(stats['users'], expected)
+        self.assertEqual(len(self.records()), expected)
+        self.assertEqual(
+            sum(
+                count for (kind, _, endpoint), count in self.api.stats.items()
+                if kind == 'requests' and endpoint == '2/users/by'
+            ),
+            1,
+        )
+
+    def test_lookup_from_stdin(self):
+        stdin = io.StringIO('user1\nuser5\nnobody\n')
+        with mock.patch('sys.stdin', stdin):
+            stats = self.run_cli('lookup', '--max-concurrency', '2')
+
+        self.assertEqual(stats['accounts'], 3)
+        self.assertEqual(
+            sorted(_['screen_name'] for _ in self.records()),
+            ['user1', 'user5'],
+        )
+
+    def test_modes_share_a_checkpoint(self):
+        self.run_cli('lookup', '--input', self.usernames)
+        stats = self.run_cli('following', '--input', self.usernames)
+
+        self.assertEqual(stats['accounts'], 4)
+        self.assertEqual(
+            stats['users'],
+            sum(len(self.graph.following[_]) for _ in (1, 2, 3)),
+        )
+        with open(self.checkpoint) as checkpoint:
+            cursors = json.load(checkpoint)['cursors']
+        self.assertEqual(set(cursors), {'lookup', 'following'})
+
+    def test_checkpoint_publishes_the_sink(self):
+        crawler = TwitterAPIv1Crawler()
+        sink = NDJSONSink(self.output)
+        sink.write([{'id': 1}])
+        crawler.set_cursor('user1', 0)
+
+        save_checkpoint(crawler, self.checkpoint, 'following', sink)
+        self.assertEqual(len(sink.paths), 1)
+        self.assertEqual(self.records(), [{'id': 1}])
+        self.assertFalse(glob.glob(os.path.join(self.output, '*.part')))
+        with open(self.checkpoint) as checkpoint:
+            cursors = json.load(checkpoint)['cursors']
+        self.assertEqual(cursors, {'following': {'user1': 0}})
+
+    def test_cache_needs_requests_transport(self):
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            self.run_cli(
+                'lookup', '--input', self.usernames, '--cache', '--http2',
+            )
+
+    def test_missing_credentials(self):
+        self.write(self.keys, json.dumps({'k1': {'api_key': 'k1'}}))
+        with self.assertRaises(TwitterAPIClientException):
+            self.run_cli('following', '--input', self.usernames)
@@ -0,0 +1,235 @@
+import threading
+import time
+import unittest
+
+import requests
+import responses
+
+from twitter_api_crawler.concurrency import AIMDController
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import (
+    Twitter429Exception,
+    Twitter503Exception,
+)
+from twitter_api_crawler.metrics import InMemoryMetrics
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.pipeline import Pipeline
+from twitter_api_crawler.sinks import MemorySink
+
+OK = {'status': 200, 'elapsed': 0.01, 'headers': {}}
+
+
+class TestAIMDController(unittest.TestCase):
+
+    def test_additive_increase(self):
+        controller = AIMDController(initial=2, maximum=4)
+        for _ in range(2):
+            controller.observe(OK)
+        self.assertAlmostEqual(controller.limit, 2.9, places=1)
+
+        for _ in range(100):
+            controller.observe(OK)
+        self.assertEqual(controller.limit, 4)
+
+    def test_multiplicative_decrease_with_cooldown(self):
+        controller = AIMDController(initial=16, cooldown=60)
+        controller.observe({'status': 503, 'elapsed': 0.01})
+        self.assertEqual(controller.limit, 8)
+
+        controller.observe({'status': 503, 'elapsed': 0.01})
+        self.assertEqual(controller.limit, 8)
+
+        controller.decreased_at -= 60
+        controller.observe({'status': 500, 'elapsed': 0.01})
+        self.assertEqual(controller.limit, 4)
+
+    def test_minimum(self):
+        controller = AIMDController(initial=2, minimum=1, cooldown=0)
+        for _ in range(5):
+            controller.observe({'exception': OSError(), 'elapsed': 0.01})
+        self.assertEqual(controller.limit, 1)
+
+    def test_distress_signals(self):
+        controller = AIMDController(initial=4, latency_target=0.5)
+        self.assertFalse(controller.distressed(OK))
+        self.assertTrue(controller.distressed({'status': 503}))
+        self.assertTrue(
+            controller.distressed({'status': 200, 'elapsed': 2.0}),
+        )
+        self.assertTrue(
+            controller.distressed({
+                'status': 200,
+                'headers': {'x-rate-limit-remaining': '3'},
+            }),
+        )
+        self.assertTrue(
+            controller.distressed({
+                'status': 429,
+                'headers': {'x-rate-limit-remaining': '10'},
+            }),
+        )
+
+    def test_limits_requests_in_flight(self):
+        controller = AIMDController(initial=2)
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with controller.slot():
+                with lock:
+                    peak.append(controller.in_flight)
+                time.sleep(0.02)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(controller.in_flight, 0)
+
+    def test_gauge(self):
+        metrics = InMemoryMetrics()
+        controller = AIMDController(initial=8, metrics=metrics)
+        controller.back_off()
+        self.assertEqual(metrics.get('concurrency_limit'), 4)
+
+
+class TestAttach(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.crawler = TwitterAPIv1Crawler()
+        self.crawler.create_api('k1', 'a', 'b', 'c', 'd')
+        self.controller = AIMDController(initial=4, cooldown=0)
+        self.controller.attach(self.crawler)
+        self.api = self.crawler.get_api('k1')
+
+    @responses.activate
+    def test_error_response_counted_once(self):
+        responses.add(
+            responses.POST,
+            'https://api.twitter.com/1.1/users/lookup.json',
+            status=503,
+            json={'errors': [{'code': 130}]},
+        )
+
+        with self.assertRaises(Twitter503Exception):
+            self.api.lookup_users('jack')
+
+        self.assertEqual(self.controller.limit, 2)
+
+    @responses.activate
+    def test_client_error_grows_once(self):
+        responses.add(
+            responses.POST,
+            'https://api.twitter.com/1.1/users/lookup.json',
+            status=403,
+            json={'errors': [{'code': 50}]},
+        )
+
+        with self.assertRaises(Exception):
+            self.api.lookup_users('jack')
+
+        self.assertEqual(self.controller.limit, 4.25)
+
+    def lookup(self, key, status=200, remaining=1):
+        responses.add(
+            responses.POST,
+            'https://api.twitter.com/1.1/users/lookup.json',
+            status=status,
+            json=[],
+            headers={
+                'x-rate-limit-limit': '15',
+                'x-rate-limit-remaining': str(remaining),
+                'x-rate-limit-reset': str(int(time.time()) + 900),
+            },
+        )
+        try:
+            self.crawler.get_api(key).lookup_users('jack')
+        except Twitter429Exception:
+            pass
+
+    @responses.activate
+    def test_quota_of_the_whole_pool(self):
+        self.crawler.create_api('k2', 'a2', 'b', 'c', 'd')
+
+        # k2 has a whole window left.
+        self.lookup('k1', remaining=1)
+        self.assertEqual(self.controller.limit, 4.25)
+
+        # Two requests left across the pool, fewer than the limit.
+        self.lookup('k2', remaining=1)
+        self.assertEqual(self.controller.limit, 2.125)
+
+        # Keys asleep do not count.
+        self.crawler.get_api('k1').sleep(900)
+        self.lookup('k2', remaining=2)
+        self.assertEqual(self.controller.limit, 2.125 + 1 / 2.125)
+
+    @responses.activate
+    def test_rate_limited(self):
+        self.lookup('k1', status=429, remaining=0)
+        self.assertEqual(self.controller.limit, 2)
+
+    @responses.activate
+    def test_connection_error(self):
+        responses.add(
+            responses.POST,
+            'https://api.twitter.com/1.1/users/lookup.json',
+            body=requests.ConnectionError('refused'),
+        )
+
+        with self.assertRaises(requests.ConnectionError):
+            self.api.lookup_users('jack')
+
+        self.assertEqual(self.controller.limit, 2)
+
+
+class TestPipelineConcurrency(unittest.TestCase):
+
+    def run_pipeline(self, error_rate):
+        graph = SyntheticGraph(num_users=500)
+        server = MockTwitterServer(
+            MockTwitterAPI(
+                graph=graph,
+                rate_limits={'friends/list': 1000},
+                error_rate=error_rate,
+            ),
+        ).start()
+        self.addCleanup(server.stop)
+
+        crawler = TwitterAPIv1Crawler()
+        crawler.create_api('k1', 'k1', 'b', 'c', 'd', base_url=server.base_url)
+        controller = AIMDController(initial=2, maximum=8, cooldown=0)
+        pipeline = Pipeline(
+            crawler,
+            MemorySink(),
+            enrichers={},
+            concurrency=controller,
+        )
+        limits = []
+        crawler.add_hook(
+            'after_response',
+            lambda info: limits.append(controller.limit),
+        )
+
+        stats = pipeline.run([f'user{_}' for _ in range(1, 41)])
+        return controller, stats, limits
+
+    def test_grows_while_healthy(self):
+        controller, stats, limits = self.run_pipeline(error_rate=0.0)
+        self.assertEqual(stats['accounts'], 40)
+        self.assertEqual(controller.limit, 8)
+        self.assertEqual(min(limits), 2.5)
+
+    def test_backs_off_on_errors(self):
+        controller, stats, limits = self.run_pipeline(error_rate=0.2)
+        self.assertGreater(controller.decreased_at, 0)
+        self.assertTrue(
+            any(after < before for before, after in zip(limits, limits[1:])),
+        )
@@ -0,0 +1,337 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from twitter_api_crawler.coordinator import (
+    Coordinator,
+    RedisCoordinator,
+    SQLiteCoordinator,
+    run_worker,
+)
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class TestCoordinator(unittest.TestCase):
+
+    def test_incomplete_backend(self):
+        class Backend(Coordinator):
+
+            def add_work(self, usernames, relationship='following'):
+                return 0
+
+        with self.assertRaises(TypeError):
+            Backend()
+
+
+class CoordinatorTests(object):
+    """Behaviour every coordinator backend shares."""
+
+    def connect(self):
+        """Return another coordinator on the same store."""
+        raise NotImplementedError
+
+    def test_add_work_dedupes(self):
+        self.assertEqual(self.coordinator.add_work(['bob', 'bill']), 2)
+        self.assertEqual(self.coordinator.add_work(['bob', 'sam']), 1)
+        self.assertEqual(self.coordinator.add_work(['bob'], 'followers'), 1)
+        self.assertEqual(self.coordinator.pending(), 4)
+
+    def test_lease_work_is_exclusive(self):
+        self.coordinator.add_work(['bob'])
+        item = self.coordinator.lease_work('w1')
+        self.assertEqual(
+            item,
+            {'username': 'bob', 'relationship': 'following', 'cursor': -1},
+        )
+        self.assertIsNone(self.coordinator.lease_work('w2'))
+
+    def test_cursor_survives_expired_lease(self):
+        self.coordinator.add_work(['bob'])
+        self.coordinator.lease_work('w1', ttl=0.1)
+        self.coordinator.update_cursor('w1', 'bob', 'following', 1234, ttl=0.1)
+
+        time.sleep(0.2)
+        item = self.coordinator.lease_work('w2')
+        self.assertEqual(item['cursor'], 1234)
+
+        # w1 lost the lease and can no longer write to it
+        self.coordinator.update_cursor('w1', 'bob', 'following', 99)
+        self.coordinator.complete_work('w1', 'bob', 'following')
+        self.assertEqual(self.coordinator.pending(), 1)
+
+        self.coordinator.complete_work('w2', 'bob', 'following')
+        self.assertEqual(self.coordinator.pending(), 0)
+
+    def test_heartbeat_keeps_lease(self):
+        self.coordinator.add_work(['bob'])
+        self.coordinator.lease_work('w1', ttl=0.2)
+        time.sleep(0.1)
+        self.coordinator.heartbeat('w1', ttl=5)
+        time.sleep(0.2)
+        self.assertIsNone(self.coordinator.lease_work('w2'))
+
+    def test_release_work(self):
+        self.coordinator.add_work(['bob'])
+        self.coordinator.lease_work('w1')
+        self.coordinator.release_work('w1', 'bob', 'following')
+        self.assertEqual(self.coordinator.lease_work('w2')['username'], 'bob')
+
+    def test_lease_key(self):
+        keys = ['k1', 'k2']
+        self.assertEqual(self.coordinator.lease_key('w1', keys), 'k1')
+        self.assertEqual(self.coordinator.lease_key('w2', keys), 'k2')
+        self.assertIsNone(self.coordinator.lease_key('w3', keys))
+
+        self.coordinator.release_key('w1', 'k1')
+        self.assertEqual(self.coordinator.lease_key('w3', keys), 'k1')
+
+    def test_renew_key(self):
+        self.coordinator.lease_key('w1', ['k1'], ttl=0.1)
+        self.assertTrue(self.coordinator.renew_key('w1', 'k1', ttl=0.1))
+
+        # Expired but nobody took it over.
+        time.sleep(0.2)
+        self.assertTrue(self.coordinator.renew_key('w1', 'k1', ttl=0.1))
+
+        time.sleep(0.2)
+        self.assertEqual(self.coordinator.lease_key('w2', ['k1']), 'k1')
+        self.assertFalse(self.coordinator.renew_key('w1', 'k1'))
+
+        self.coordinator.release_key('w2', 'k1', sleep_seconds=600)
+        self.assertFalse(self.coordinator.renew_key('w1', 'k1'))
+
+    def test_sleeping_key_is_shared(self):
+        self.coordinator.lease_key('w1', ['k1'])
+        self.coordinator.release_key('w1', 'k1', sleep_seconds=600)
+
+        other = self.connect()
+        self.assertIsNone(other.lease_key('w2', ['k1']))
+
+
+class TestSQLiteCoordinator(CoordinatorTests, unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'crawl.db')
+        self.coordinator = SQLiteCoordinator(self.path)
+
+    def tearDown(self) -> None:
+        self.coordinator.close()
+        self.tmpdir.cleanup()
+
+    def connect(self):
+        other = SQLiteCoordinator(self.path)
+        self.addCleanup(other.close)
+        return other
+
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestRedisCoordinator(CoordinatorTests, unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = fakeredis.FakeServer()
+        self.coordinator = self.connect()
+
+    def connect(self):
+        client = fakeredis.FakeRedis(
+            server=self.server,
+            decode_responses=True,
+        )
+        return RedisCoordinator(client, namespace='test')
+
+    def states(self):
+        """Count the items pending, leased and done."""
+        client = self.coordinator.client
+        return (
+            client.llen('test:pending'),
+            client.zcard('test:leases'),
+            client.scard('test:done'),
+        )
+
+    def test_every_item_has_one_state(self):
+        self.coordinator.add_work(['bob', 'bill', 'sam'])
+        self.coordinator.lease_work('w1', ttl=0.1)
+        self.coordinator.lease_work('w2')
+        self.coordinator.complete_work('w2', 'bill', 'following')
+        self.assertEqual(self.states(), (1, 1, 1))
+
+        time.sleep(0.2)
+        item = self.coordinator.lease_work('w3')
+        self.assertEqual(item['username'], 'sam')
+        self.assertEqual(self.states(), (1, 1, 1))
+        self.assertEqual(self.coordinator.pending(), 2)
+
+    def test_lease_key_is_one_script(self):
+        self.coordinator.lease_key('w1', ['k1'])
+        self.coordinator.release_key('w1', 'k1', sleep_seconds=600)
+
+        client = self.coordinator.client
+        keys = ['k1', 'k2']
+        with mock.patch.object(client, 'exists') as exists:
+            with mock.patch.object(client, 'set') as set_:
+                self.assertEqual(self.coordinator.lease_key('w2', keys), 'k2')
+                self.assertIsNone(self.coordinator.lease_key('w3', keys))
+                self.assertIsNone(self.coordinator.lease_key('w3', []))
+
+        exists.assert_not_called()
+        set_.assert_not_called()
+        self.assertEqual(client.smembers('test:worker_keys:w2'), {'k2'})
+        self.assertEqual(client.get('test:key:k2'), 'w2')
+
+    def test_empty_add_work(self):
+        self.assertEqual(self.coordinator.add_work([]), 0)
+        self.assertIsNone(self.coordinator.lease_work('w1'))
+
+
+class TestRunWorker(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'crawl.db')
+        self.graph = SyntheticGraph(num_users=300, mean_following=200)
+        self.server = MockTwitterServer(
+            MockTwitterAPI(
+                graph=self.graph,
+                rate_limits={'friends/list': 2},
+                window=0.3,
+            ),
+        ).start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        self.tmpdir.cleanup()
+
+    def make_crawler(self):
+        crawler = TwitterAPIv1Crawler(sleep_period=0.3)
+        for key in ('k1', 'k2', 'k3'):
+            crawler.create_api(
+                key, key, 'b', 'c', 'd', base_url=self.server.base_url,
+            )
+        return crawler
+
+    def share_frontier_and_keys(self, connect):
+        targets = [f'user{_}' for _ in range(1, 11)]
+        connect().add_work(targets)
+
+        crawled = {}
+        pages = {}
+        lock = threading.Lock()
+
+        def on_page(username, relationship, users):
+            with lock:
+                crawled.setdefault(username, []).extend(_['id'] for _ in users)
+
+        def work(worker_id):
+            pages[worker_id] = run_worker(
+                connect(),
+                self.make_crawler(),
+                worker_id,
+                on_page,
+                poll_interval=0.05,
+            )
+
+        workers = [
+            threading.Thread(target=work, args=(f'w{_}',)) for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        for username in targets:
+            user_id = self.graph.resolve(screen_name=username)
+            self.assertEqual(
+                crawled.get(username, []),
+                self.graph.following[user_id],
+            )
+
+        self.assertGreater(pages['w0'], 0)
+        self.assertGreater(pages['w1'], 0)
+
+    def test_workers_share_frontier_and_keys(self):
+        def connect():
+            coordinator = SQLiteCoordinator(self.path)
+            self.addCleanup(coordinator.close)
+            return coordinator
+
+        self.share_frontier_and_keys(connect)
+
+    @unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+    def test_redis_workers(self):
+        server = fakeredis.FakeServer()
+
+        def connect():
+            client = fakeredis.FakeRedis(server=server, decode_responses=True)
+            return RedisCoordinator(client)
+
+        self.share_frontier_and_keys(connect)
+
+    def test_idle_worker_releases_key(self):
+        coordinator = SQLiteCoordinator(self.path)
+        coordinator.add_work(['user1', 'user2'])
+        coordinator.lease_work('other')
+
+        worker = threading.Thread(
+            target=run_worker,
+            args=(
+                SQLiteCoordinator(self.path),
+                self.make_crawler(),
+                'w1',
+                lambda *args: None,
+            ),
+            kwargs={'poll_interval': 0.05},
+        )
+        worker.start()
+
+        while coordinator.pending() > 1:
+            time.sleep(0.05)
+        time.sleep(0.2)
+
+        keys = ['k1', 'k2', 'k3']
+        leased = [coordinator.lease_key('w2', keys) for _ in keys]
+        self.assertEqual(sorted(leased), keys)
+
+        coordinator.complete_work('other', 'user1', 'following')
+        worker.join()
+        coordinator.close()
+
+    def test_error_body_hands_the_item_back(self):
+        coordinator = SQLiteCoordinator(self.path)
+        self.addCleanup(coordinator.close)
+        coordinator.add_work(['user1'])
+
+        crawler = self.make_crawler()
+        api = crawler.get_api('k1')
+        get = api._get
+        errors = iter([{'errors': [{'code': 131}]}])
+
+        def flaky_get(url, request_params=None):
+            return next(errors, None) or get(url, request_params)
+
+        crawled = []
+        with mock.patch.object(api, '_get', side_effect=flaky_get):
+            run_worker(
+                coordinator,
+                crawler,
+                'w1',
+                lambda username, relationship, users: crawled.extend(
+                    _['id'] for _ in users
+                ),
+                poll_interval=0.01,
+            )
+
+        self.assertEqual(crawled, self.graph.following[1])
+        self.assertEqual(coordinator.pending(), 0)
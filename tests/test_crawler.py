@@ -1,8 +1,25 @@
+import tempfile
 import time
 import unittest
+
+import responses
+
 from twitter_api_crawler.api import TwitterAPIv1
 from twitter_api_crawler.crawler import TwitterAPIv1Crawler
-from twitter_api_crawler.exceptions import TwitterNoAvailableAPIs
+from twitter_api_crawler.exceptions import (
+    Twitter404Exception,
+    Twitter429Exception,
+    TwitterAPIClientException,
+    TwitterNoAvailableAPIs,
+)
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.frontier import GraphCrawler
+from twitter_api_crawler.sinks import MemorySink
+from twitter_api_crawler.snapshots import CompactSnapshotStore
 
 
 class TestTwitterAPIv1Crawler(unittest.TestCase):
@@ -111,6 +128,18 @@ class TestTwitterAPIv1Crawler(unittest.TestCase):
 
         self.assertFalse(self.crawler.fetch_api().is_asleep())
 
+    def test_seconds_until_available(self):
+        self.assertEqual(self.crawler.seconds_until_available(), 0)
+
+        self.create_api('boom')
+        self.create_api('boom2')
+        self.assertEqual(self.crawler.seconds_until_available(), 0)
+
+        self.crawler.get_api('boom').sleep(600)
+        self.crawler.get_api('boom2').sleep(60)
+        wait = self.crawler.seconds_until_available()
+        self.assertTrue(0 < wait <= 60)
+
     def test_next_api__all_apis_paused_is_none(self):
         self.create_api('boom')
         self.create_api('boom2')
@@ -126,3 +155,499 @@ class TestTwitterAPIv1Crawler(unittest.TestCase):
 
         with self.assertRaises(TwitterNoAvailableAPIs):
             self.crawler.next_api()
+
+    def test_add_hook_applies_to_new_apis(self):
+        self.create_api('boom')
+
+        def callback(info):
+            pass
+
+        self.crawler.add_hook('after_response', callback)
+        self.create_api('boom2')
+
+        for key in ('boom', 'boom2'):
+            hooks = self.crawler.get_api(key).hooks
+            self.assertEqual(hooks, {'after_response': [callback]})
+
+
+class TestRelationshipLookups(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=500)
+        self.api = MockTwitterAPI(
+            graph=self.graph,
+            rate_limits={'friendships/lookup': 2, 'friendships/show': 3},
+            accounts={'k1': 5, 'k2': 5},
+        )
+        self.server = MockTwitterServer(self.api).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=600)
+        for key in ('k1', 'k2'):
+            self.crawler.create_api(
+                key, key, 'b', 'c', 'd', base_url=self.server.base_url,
+            )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def requests(self, endpoint):
+        return sum(
+            count for (kind, _, name), count in self.api.stats.items()
+            if kind == 'requests' and name == endpoint
+        )
+
+    def test_lookup_friendships_chunks_and_caches(self):
+        usernames = [f'User{_}' for _ in range(1, 151)] + ['nobody']
+        connections = self.crawler.lookup_friendships(usernames)
+
+        self.assertEqual(self.requests('friendships/lookup'), 2)
+        self.assertEqual(len(connections), 150)
+        for user_id in range(1, 151):
+            expected = []
+            if user_id in self.graph.following[5]:
+                expected.append('following')
+            if 5 in self.graph.following[user_id]:
+                expected.append('followed_by')
+            self.assertEqual(
+                connections[f'user{user_id}'],
+                expected or ['none'],
+            )
+
+        again = self.crawler.lookup_friendships(usernames[:10])
+        self.assertEqual(self.requests('friendships/lookup'), 2)
+        self.assertEqual(len(again), 10)
+
+    def test_lookup_users_rotates_keys(self):
+        self.api.rate_limits['users/lookup'] = 1
+        usernames = [f'user{_}' for _ in range(1, 151)] + ['nobody']
+
+        users = self.crawler.lookup_users(usernames)
+
+        self.assertEqual(len(users), 150)
+        self.assertEqual(self.requests('users/lookup'), 3)
+        self.assertTrue(self.crawler.get_api('k1').is_asleep())
+        with self.assertRaises(TwitterNoAvailableAPIs):
+            self.crawler.lookup_users(['user1'])
+
+    def test_lookup_friendships_rate_limited(self):
+        usernames = [f'user{_}' for _ in range(1, 301)]
+        with self.assertRaises(Twitter429Exception):
+            self.crawler.lookup_friendships(usernames, key='k1')
+
+        self.assertTrue(self.crawler.get_api('k1').is_asleep())
+        self.assertEqual(
+            len(self.crawler.lookup_friendships(usernames[:200], key='k1')),
+            200,
+        )
+
+    def test_check_relationships_rotates_keys(self):
+        follower = self.graph.followers[1][0]
+        pairs = [(f'user{_}', 'user1') for _ in self.graph.followers[1][:5]]
+        pairs.append(('user1', f'user{follower}'))
+        pairs.append(('user1', 'nobody'))
+
+        results = self.crawler.check_relationships(pairs)
+
+        for pair in pairs[:5]:
+            self.assertTrue(results[pair]['following'])
+        self.assertEqual(
+            results[('user1', f'user{follower}')]['followed_by'],
+            True,
+        )
+        self.assertIsNone(results[('user1', 'nobody')])
+        self.assertEqual(self.requests('friendships/show'), 7)
+        self.assertTrue(self.crawler.get_api('k1').is_asleep())
+
+        with self.assertRaises(TwitterNoAvailableAPIs):
+            self.crawler.check_relationships([('user2', 'user3')])
+
+
+class TestKeyStrategies(unittest.TestCase):
+
+    def create_crawler(self, strategy):
+        crawler = TwitterAPIv1Crawler(key_strategy=strategy)
+        for key in ('k1', 'k2', 'k3'):
+            crawler.create_api(key, key, 'b', 'c', 'd')
+        return crawler
+
+    def picks(self, crawler, count, endpoint=None):
+        return [crawler.next_api(endpoint).key_id for _ in range(count)]
+
+    def test_unknown_strategy(self):
+        with self.assertRaises(TwitterAPIClientException):
+            TwitterAPIv1Crawler(key_strategy='random')
+
+    def test_first(self):
+        crawler = self.create_crawler('first')
+        self.assertEqual(self.picks(crawler, 3), ['k1', 'k1', 'k1'])
+
+    def test_round_robin_skips_sleeping_keys(self):
+        crawler = self.create_crawler('round_robin')
+        self.assertEqual(
+            self.picks(crawler, 4),
+            ['k1', 'k2', 'k3', 'k1'],
+        )
+
+        crawler.get_api('k2').sleep(60)
+        self.assertEqual(self.picks(crawler, 3), ['k3', 'k1', 'k3'])
+
+    def test_weighted_spreads_healthy_keys_evenly(self):
+        crawler = self.create_crawler('weighted')
+        self.assertEqual(
+            self.picks(crawler, 6),
+            ['k1', 'k2', 'k3', 'k1', 'k2', 'k3'],
+        )
+
+    def test_weighted_steers_away_from_degraded_keys(self):
+        crawler = self.create_crawler('weighted')
+        for _ in range(20):
+            crawler.get_api('k1').health.record(0.1, error=True)
+        crawler.get_api('k2').health.record(2.0)
+        crawler.get_api('k3').health.record(0.1)
+
+        picks = self.picks(crawler, 100)
+        self.assertGreater(picks.count('k3'), picks.count('k2'))
+        self.assertGreater(picks.count('k2'), picks.count('k1'))
+        self.assertGreater(picks.count('k1'), 0)
+
+    def test_weighted_uses_quota_left(self):
+        crawler = self.create_crawler('weighted')
+        reset = time.time() + 600
+        for key, remaining in (('k1', 1), ('k2', 15), ('k3', 15)):
+            crawler.get_api(key).rate_limits['friends/list'] = {
+                'limit': 15,
+                'remaining': remaining,
+                'reset': reset,
+            }
+
+        picks = self.picks(crawler, 30, 'friends/list')
+        self.assertLess(picks.count('k1'), 5)
+        self.assertEqual(self.picks(crawler, 30).count('k1'), 10)
+
+
+class TestIterPages(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=2000)
+        self.api = MockTwitterAPI(
+            graph=self.graph,
+            rate_limits={'followers/list': 10},
+            latency=0.05,
+        )
+        self.server = MockTwitterServer(self.api).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=600)
+        for key in ('k1', 'k2'):
+            self.crawler.create_api(
+                key, key, 'b', 'c', 'd', base_url=self.server.base_url,
+            )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_pages_and_cursor(self):
+        users = []
+        for page in self.crawler.iter_pages('user1', 'followers'):
+            self.assertEqual(self.crawler.get_cursor('user1'), -1)
+            users.extend(user['id'] for user in page['users'])
+            break
+
+        self.assertEqual(len(users), 200)
+        self.assertEqual(users, self.graph.followers[1][:200])
+
+    def test_fetch_overlaps_consumer(self):
+        ids = []
+        started = time.monotonic()
+        for page in self.crawler.iter_pages('user1', 'followers'):
+            time.sleep(0.05)
+            ids.extend(user['id'] for user in page['users'])
+        elapsed = time.monotonic() - started
+
+        pages = -(-len(self.graph.followers[1]) // 200)
+        self.assertEqual(ids, self.graph.followers[1])
+        self.assertEqual(page['cursor'], 0)
+        self.assertEqual(self.crawler.get_cursor('user1'), 0)
+        # Sequential fetch then consume would take 0.1s a page.
+        self.assertLess(elapsed, pages * 0.1 * 0.8)
+
+    def test_stops_when_every_key_sleeps(self):
+        self.api.rate_limits['followers/list'] = 2
+        pages = []
+        with self.assertRaises(TwitterNoAvailableAPIs):
+            for page in self.crawler.iter_pages('user1', 'followers'):
+                pages.append(page)
+
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(
+            self.crawler.get_cursor('user1'),
+            pages[-1]['cursor'],
+        )
+
+
+class TestIterPagesErrors(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.crawler = TwitterAPIv1Crawler()
+        self.crawler.create_api('k1', 'a', 'b', 'c', 'd')
+
+    def crawl_with_response(self, status, body):
+        responses.add(
+            responses.GET,
+            'https://api.twitter.com/1.1/friends/list.json',
+            status=status,
+            json=body,
+        )
+        with self.assertRaises(TwitterAPIClientException):
+            self.crawler.crawl('bob', MemorySink())
+        self.assertEqual(self.crawler.get_cursor('bob'), -1)
+
+    @responses.activate
+    def test_server_error(self):
+        self.crawl_with_response(
+            500,
+            {'errors': [{'code': 131, 'message': 'Internal error'}]},
+        )
+
+    @responses.activate
+    def test_expired_token(self):
+        self.crawl_with_response(
+            401,
+            {'errors': [{'code': 89, 'message': 'Invalid or expired token'}]},
+        )
+
+    @responses.activate
+    def test_error_body_without_cursor(self):
+        self.crawl_with_response(200, {'errors': [{'code': 131}]})
+
+
+class TestCrawlTimeline(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=1000)
+        self.api = MockTwitterAPI(
+            graph=self.graph,
+            rate_limits={'statuses/user_timeline': 3},
+        )
+        self.server = MockTwitterServer(self.api).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=600)
+        for key in ('k1', 'k2'):
+            self.crawler.create_api(
+                key, key, 'b', 'c', 'd', base_url=self.server.base_url,
+            )
+        self.sink = MemorySink()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_only_new_tweets_on_the_next_run(self):
+        result = self.crawler.crawl_timeline('user450', self.sink)
+
+        self.assertTrue(result['completed'])
+        self.assertEqual(result['pages'], 4)
+        self.assertEqual(result['tweets'], 450)
+        ids = [tweet['id'] for tweet in self.sink.records]
+        self.assertEqual(len(set(ids)), 450)
+        self.assertEqual(result['since_id'], max(ids))
+
+        tweet = self.sink.records[0]
+        self.assertEqual(tweet['crawled_from'], 'user450')
+        self.assertEqual(tweet['mentions'], [tweet['text'].split()[3][1:]])
+        self.assertEqual(tweet['hashtags'], [tweet['text'].split()[4][1:]])
+
+        posted = [self.graph.post(450) for _ in range(3)]
+        result = self.crawler.crawl_timeline('user450', self.sink)
+
+        self.assertEqual(result['pages'], 2)
+        self.assertEqual(
+            [tweet['id'] for tweet in self.sink.records[450:]],
+            [tweet['id'] for tweet in reversed(posted)],
+        )
+        self.assertEqual(result['since_id'], posted[-1]['id'])
+
+    def test_resumes_when_every_key_sleeps(self):
+        self.api.rate_limits['statuses/user_timeline'] = 1
+        result = self.crawler.crawl_timeline('user450', self.sink)
+
+        self.assertFalse(result['completed'])
+        self.assertEqual(result['tweets'], 400)
+        self.assertIsNone(result['since_id'])
+
+        for key in ('k1', 'k2'):
+            self.crawler.get_api(key).wakeup()
+        self.api.rate_limits['statuses/user_timeline'] = 5
+        result = self.crawler.crawl_timeline('user450', self.sink)
+
+        self.assertTrue(result['completed'])
+        ids = [tweet['id'] for tweet in self.sink.records]
+        self.assertEqual(len(ids), 450)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(result['since_id'], ids[0])
+
+
+class TestAppOnlyKeys(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=2000)
+        self.api = MockTwitterAPI(
+            graph=self.graph,
+            rate_limits={'followers/list': 2},
+        )
+        self.server = MockTwitterServer(self.api).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=600)
+        self.crawler.create_api(
+            'myapp', 'myapp', 'b', 'c', 'd', base_url=self.server.base_url,
+        )
+        self.crawler.create_app_api(
+            'myapp:app',
+            api_key='myapp',
+            api_key_secret='b',
+            base_url=self.server.base_url,
+        )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_app_window_adds_to_user_window(self):
+        result = self.crawler.crawl('user1', MemorySink(), 'followers')
+
+        self.assertEqual(result['pages'], 4)
+        stats = self.api.stats
+        self.assertEqual(stats[('requests', 'myapp', 'followers/list')], 3)
+        self.assertEqual(
+            stats[('requests', 'app-myapp', 'followers/list')],
+            3,
+        )
+        self.assertTrue(self.crawler.get_api('myapp').is_asleep())
+        self.assertTrue(self.crawler.get_api('myapp:app').is_asleep())
+
+    def test_user_context_endpoints_skip_app_keys(self):
+        self.crawler.get_api('myapp').sleep(60)
+
+        with self.assertRaises(TwitterNoAvailableAPIs):
+            self.crawler.next_api('friendships/lookup')
+        self.assertEqual(
+            self.crawler.next_api('followers/list').key_id,
+            'myapp:app',
+        )
+        with self.assertRaises(TwitterAPIClientException):
+            self.crawler.lookup_friendships(['user2'], key='myapp:app')
+
+    def test_needs_token_or_credentials(self):
+        with self.assertRaises(TwitterAPIClientException):
+            self.crawler.create_app_api('other:app')
+        with self.assertRaises(TwitterAPIClientException):
+            self.crawler.create_app_api('myapp:app', bearer_token='x')
+
+
+class TestAPIv2(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=2000)
+        self.api = MockTwitterAPI(graph=self.graph)
+        self.server = MockTwitterServer(self.api).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=600, api_version=2)
+        for key in ('k1', 'k2'):
+            self.crawler.create_api(
+                key, key, 'b', 'c', 'd', base_url=self.server.base_url,
+            )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def requests(self, endpoint):
+        return sum(
+            count for (kind, _, name), count in self.api.stats.items()
+            if kind == 'requests' and name == endpoint
+        )
+
+    def test_unknown_version(self):
+        with self.assertRaises(TwitterAPIClientException):
+            TwitterAPIv1Crawler(api_version=3)
+
+    def test_crawl_followers_1000_per_page(self):
+        sink = MemorySink()
+        self.crawler.crawl('user1', sink, relationship='followers')
+
+        self.assertEqual(
+            [user['id'] for user in sink.records],
+            self.graph.followers[1],
+        )
+        self.assertEqual(self.requests('2/users/:id/followers'), 2)
+        self.assertEqual(self.requests('2/users/by'), 1)
+        self.assertEqual(self.requests('followers/list'), 0)
+        self.assertEqual(self.crawler.get_cursor('user1'), 0)
+
+        user = sink.records[0]
+        self.assertEqual(user['screen_name'], f'user{user["id"]}')
+        self.assertEqual(
+            user['followers_count'],
+            len(self.graph.followers[user['id']]),
+        )
+        self.assertNotIn('public_metrics', user)
+
+    def test_pools_rotate_separately(self):
+        crawler = TwitterAPIv1Crawler(key_strategy='round_robin')
+        for key in ('k1', 'k2', 'k3'):
+            crawler.create_api(key, key, 'b', 'c', 'd')
+
+        picks = [
+            crawler._next_key('users/lookup'),
+            crawler._next_key('users/by', crawler.v2_apis),
+            crawler._next_key('users/by', crawler.v2_apis),
+            crawler._next_key('users/lookup'),
+        ]
+
+        self.assertEqual(picks, ['k1', 'k1', 'k2', 'k2'])
+        self.assertEqual(crawler.current_key, 'k2')
+
+    def test_graph_crawler(self):
+        graph = GraphCrawler(self.crawler, MemorySink(), max_depth=1)
+        graph.seed(['user5'])
+        result = graph.run()
+
+        self.assertEqual(
+            result['visited'],
+            1 + len(self.graph.following[5]),
+        )
+
+    def test_incremental_compact_snapshots(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            snapshots = CompactSnapshotStore(tmpdir)
+            result = self.crawler.crawl_incremental(
+                'user1', MemorySink(), snapshots, relationship='followers',
+            )
+
+            self.assertTrue(result['completed'])
+            self.assertEqual(
+                snapshots.get_ids('user1', 'followers'),
+                sorted(self.graph.followers[1]),
+            )
+
+    def test_rate_limits_separate_from_v1(self):
+        self.api.rate_limits['2/users/:id/following'] = 1
+        self.crawler.get_api('k1').sleep(600)
+
+        pages = []
+        with self.assertRaises(TwitterNoAvailableAPIs):
+            for user_id in range(1, 10):
+                try:
+                    pages.append(self.crawler.get_following(f'user{user_id}'))
+                except Twitter429Exception:
+                    pass
+
+        # One page per key, the sleeping v1 client did not hold k1 back.
+        self.assertEqual(len(pages), 2)
+        self.assertTrue(self.crawler.v2_apis['k1'].is_asleep())
+        self.assertTrue(self.crawler.v2_apis['k2'].is_asleep())
+        self.assertFalse(self.crawler.get_api('k2').is_asleep())
+
+    def test_lookup_users_caches_ids(self):
+        usernames = [f'user{_}' for _ in range(1, 151)] + ['nobody']
+
+        users = self.crawler.lookup_users(usernames)
+        user_id = self.crawler.resolve_user_id('USER7')
+
+        self.assertEqual(len(users), 150)
+        self.assertEqual(user_id, '7')
+        self.assertEqual(self.requests('2/users/by'), 2)
+        with self.assertRaises(Twitter404Exception):
+            self.crawler.resolve_user_id('nobody')
+        self.assertEqual(self.requests('2/users/by'), 2)
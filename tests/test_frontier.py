@@ -0,0 +1,123 @@
+import unittest
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.frontier import (
+    Frontier,
+    GraphCrawler,
+    depth_score,
+    follower_count_score,
+    watchlist_score,
+)
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.sinks import MemorySink
+
+
+class TestFrontier(unittest.TestCase):
+
+    def test_breadth_first_by_default(self):
+        frontier = Frontier()
+        frontier.push('deep', 2)
+        frontier.push('a', 0)
+        frontier.push('b', 1)
+        frontier.push('c', 0)
+
+        popped = [frontier.pop()[0] for _ in range(len(frontier))]
+        self.assertEqual(popped, ['a', 'c', 'b', 'deep'])
+
+    def test_dedupe_is_case_insensitive(self):
+        frontier = Frontier()
+        self.assertTrue(frontier.push('Bob'))
+        self.assertFalse(frontier.push('bob', 1))
+        self.assertEqual(len(frontier), 1)
+
+        frontier.pop()
+        self.assertFalse(frontier.push('BOB'))
+
+    def test_pop_empty(self):
+        with self.assertRaises(IndexError):
+            Frontier().pop()
+
+    def test_weighted_scores(self):
+        frontier = Frontier(scores=[
+            (1.0, depth_score),
+            (1.0, follower_count_score),
+            (10.0, watchlist_score(['#ethereum'])),
+        ])
+        frontier.push('small', 1, {'followers_count': 9})
+        frontier.push('big', 1, {'followers_count': 99999})
+        frontier.push('watched', 2, {'description': 'I like #Ethereum.'})
+
+        popped = [frontier.pop()[0] for _ in range(len(frontier))]
+        self.assertEqual(popped, ['watched', 'big', 'small'])
+
+    def test_watchlist_matches_username(self):
+        score = watchlist_score(['@heysamtexas'])
+        self.assertEqual(
+            score({'username': 'HeySamTexas', 'depth': 0, 'user': None}),
+            1.0,
+        )
+        self.assertEqual(
+            score({'username': 'bob', 'depth': 0, 'user': None}),
+            0.0,
+        )
+
+
+class TestGraphCrawler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=500)
+        self.server = MockTwitterServer(
+            MockTwitterAPI(
+                graph=self.graph,
+                rate_limits={'friends/list': 1000},
+            ),
+        ).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=0.3)
+        self.crawler.create_api(
+            'k1', 'k1', 'b', 'c', 'd', base_url=self.server.base_url,
+        )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_breadth_first_crawl(self):
+        sink = MemorySink()
+        graph = GraphCrawler(self.crawler, sink, max_depth=1)
+        graph.seed(['user5'])
+        result = graph.run()
+
+        following = self.graph.following[5]
+        self.assertEqual(result['visited'], 1 + len(following))
+        self.assertEqual(result['queued'], 0)
+        self.assertFalse(result['exhausted'])
+        self.assertEqual(graph.visited[0], 'user5')
+        self.assertEqual(
+            sorted(graph.visited[1:]),
+            sorted(f'user{_}' for _ in following),
+        )
+
+        depth_one = [_ for _ in sink.records if _['crawled_from'] == 'user5']
+        self.assertEqual([_['id'] for _ in depth_one], following)
+        self.assertTrue(all(_['depth'] == 1 for _ in depth_one))
+        self.assertTrue(any(_['depth'] == 2 for _ in sink.records))
+
+    def test_budget(self):
+        graph = GraphCrawler(self.crawler, MemorySink(), budget=3)
+        graph.seed(['user5', 'user6'])
+        result = graph.run()
+
+        self.assertTrue(result['exhausted'])
+        self.assertEqual(result['requests'], 3)
+        self.assertEqual(result['visited'], 3)
+        self.assertGreater(result['queued'], 0)
+
+    def test_missing_seed_is_skipped(self):
+        graph = GraphCrawler(self.crawler, MemorySink(), max_depth=0)
+        graph.seed(['nobody', 'user5'])
+        result = graph.run()
+
+        self.assertEqual(result['visited'], 2)
+        self.assertEqual(result['requests'], 2)
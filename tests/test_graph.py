@@ -0,0 +1,162 @@
+import gzip
+import json
+import tempfile
+import time
+import unittest
+from twitter_api_crawler.mock_server import SyntheticGraph
+from twitter_api_crawler.sinks import NDJSONSink
+
+try:
+    import numpy
+    from twitter_api_crawler.graph import FollowerGraph, intersect
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestFollowerGraph(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = FollowerGraph.from_edges([
+            ('alice', 'bob'),
+            ('bob', 'alice'),
+            ('carol', 'alice'),
+            ('carol', 'bob'),
+            ('dave', 'bob'),
+            ('alice', 'bob'),
+        ])
+
+    def labels(self, nodes):
+        return sorted(self.graph.to_labels(nodes))
+
+    def test_structure(self):
+        self.assertEqual(len(self.graph), 4)
+        self.assertEqual(self.graph.edges, 5)
+        self.assertEqual(
+            self.labels(self.graph.followers('bob')),
+            ['alice', 'carol', 'dave'],
+        )
+        self.assertEqual(
+            self.labels(self.graph.following('carol')),
+            ['alice', 'bob'],
+        )
+        self.assertEqual(self.labels(self.graph.followers('dave')), [])
+
+    def test_unknown_account(self):
+        with self.assertRaises(KeyError):
+            self.graph.followers('eve')
+
+    def test_set_operations(self):
+        self.assertEqual(self.labels(self.graph.mutual('alice')), ['bob'])
+        self.assertEqual(
+            self.labels(self.graph.common_followers('alice', 'bob')),
+            ['carol'],
+        )
+        self.assertEqual(
+            self.labels(self.graph.common_following('carol', 'dave')),
+            ['bob'],
+        )
+
+    def test_overlap(self):
+        overlap = self.graph.overlap('alice', 'bob')
+        self.assertEqual(overlap['common'], 1)
+        self.assertEqual(overlap['first_only'], 1)
+        self.assertEqual(overlap['second_only'], 2)
+        self.assertAlmostEqual(overlap['jaccard'], 0.25)
+        self.assertAlmostEqual(overlap['overlap'], 0.5)
+
+    def test_degree_stats(self):
+        stats = self.graph.degree_stats()
+        self.assertEqual(stats['nodes'], 4)
+        self.assertEqual(stats['edges'], 5)
+        self.assertEqual(stats['followers']['max'], 3)
+        self.assertEqual(stats['following']['max'], 2)
+        self.assertAlmostEqual(stats['following']['mean'], 1.25)
+
+    def test_from_records(self):
+        graph = FollowerGraph.from_records([
+            {
+                'screen_name': 'Bob',
+                'crawled_from': 'Alice',
+                'relationship': 'following',
+            },
+            {
+                'screen_name': 'carol',
+                'crawled_from': 'alice',
+                'relationship': 'followers',
+            },
+        ])
+
+        self.assertEqual(graph.to_labels(graph.following('Alice')), ['bob'])
+        self.assertEqual(graph.to_labels(graph.followers('alice')), ['carol'])
+
+    def test_from_ndjson_sink(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with NDJSONSink(tmpdir, max_bytes=100) as sink:
+                for name in ('bob', 'carol', 'dave'):
+                    sink.write([{
+                        'screen_name': name,
+                        'crawled_from': 'alice',
+                        'relationship': 'following',
+                    }])
+
+            # The module docstring example.
+            records = (
+                json.loads(line)
+                for path in sink.paths
+                for line in gzip.open(path, 'rt')
+            )
+            graph = FollowerGraph.from_records(records)
+
+        self.assertGreater(len(sink.paths), 1)
+        self.assertEqual(
+            sorted(graph.to_labels(graph.following('alice'))),
+            ['bob', 'carol', 'dave'],
+        )
+
+    def test_matches_synthetic_graph(self):
+        synthetic = SyntheticGraph(num_users=2000)
+        graph = FollowerGraph.from_edges(
+            (follower, followed)
+            for follower, following in synthetic.following.items()
+            for followed in following
+        )
+
+        for user_id in (1, 2, 50):
+            self.assertEqual(
+                sorted(graph.to_labels(graph.followers(user_id))),
+                sorted(synthetic.followers[user_id]),
+            )
+
+        expected = set(synthetic.followers[1]) & set(synthetic.followers[2])
+        self.assertEqual(len(graph.common_followers(1, 2)), len(expected))
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestIntersect(unittest.TestCase):
+
+    def test_intersect(self):
+        first = numpy.array([1, 3, 5, 7, 9])
+        second = numpy.array([0, 3, 4, 9, 10, 11])
+        self.assertEqual(intersect(first, second).tolist(), [3, 9])
+        self.assertEqual(intersect(second, first).tolist(), [3, 9])
+        self.assertEqual(intersect(first, second[:0]).tolist(), [])
+        self.assertEqual(
+            intersect(numpy.array([12]), second).tolist(),
+            [],
+        )
+
+    def test_million_follower_overlap_is_fast(self):
+        rng = numpy.random.default_rng(1)
+        first = numpy.unique(rng.integers(0, 5000000, 1200000))
+        second = numpy.unique(rng.integers(0, 5000000, 1200000))
+
+        started = time.perf_counter()
+        common = intersect(first, second)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(
+            len(common),
+            len(numpy.intersect1d(first, second, assume_unique=True)),
+        )
+        self.assertLess(elapsed, 1)
@@ -0,0 +1,39 @@
+import unittest
+from twitter_api_crawler.health import MIN_SCORE, KeyHealth
+
+
+class TestKeyHealth(unittest.TestCase):
+
+    def test_fresh_key_scores_one(self):
+        self.assertEqual(KeyHealth().score(), 1.0)
+
+    def test_moving_averages(self):
+        health = KeyHealth(smoothing=0.5)
+        health.record(1.0)
+        self.assertEqual(health.latency, 1.0)
+
+        health.record(3.0, error=True)
+        self.assertEqual(health.latency, 2.0)
+        self.assertEqual(health.error_rate, 0.5)
+        self.assertEqual(health.requests, 2)
+
+        health.record(2.0)
+        self.assertEqual(health.error_rate, 0.25)
+
+    def test_score(self):
+        slow = KeyHealth()
+        slow.record(1.0)
+        fast = KeyHealth()
+        fast.record(0.1)
+        failing = KeyHealth()
+        for _ in range(10):
+            failing.record(0.1, error=True)
+
+        self.assertGreater(fast.score(), slow.score())
+        self.assertGreater(fast.score(), failing.score())
+        self.assertGreater(fast.score(1.0), fast.score(0.2))
+
+    def test_score_floor(self):
+        health = KeyHealth()
+        health.record(0.1, error=True)
+        self.assertEqual(health.score(0.0), MIN_SCORE)
@@ -9,6 +9,8 @@ from twitter_api_crawler.helper_utils import (
     unroll_url,
     get_hashtags,
     get_mentions,
+    get_next_cursor,
+    user_from_v2,
 )
 import responses
 
@@ -29,6 +31,68 @@ class TestSanitize(unittest.TestCase):
         self.assertTrue('Hunter' == out2)
 
 
+class TestGetNextCursor(unittest.TestCase):
+
+    def test_next_cursor(self):
+        body = b'{"users": [], "next_cursor": 1674, "previous_cursor": 0}'
+        self.assertEqual(get_next_cursor(body), 1674)
+
+    def test_last_page(self):
+        body = b'{"users": [], "next_cursor" : 0}'
+        self.assertEqual(get_next_cursor(body), 0)
+
+    def test_negative_cursor(self):
+        body = b'{"users": [], "next_cursor": -1}'
+        self.assertEqual(get_next_cursor(body), -1)
+
+    def test_key_inside_user_text(self):
+        body = (
+            b'{"users": [{"description": "\\"next_cursor\\": 5"}], '
+            b'"next_cursor": 42}'
+        )
+        self.assertEqual(get_next_cursor(body), 42)
+
+    def test_missing_cursor(self):
+        self.assertIsNone(get_next_cursor(b'{"errors": []}'))
+
+
+class TestUserFromV2(unittest.TestCase):
+
+    def test_user_from_v2(self):
+        user = user_from_v2({
+            'id': '2244994945',
+            'name': 'Twitter Dev',
+            'username': 'TwitterDev',
+            'created_at': '2013-12-14T04:35:55.000Z',
+            'public_metrics': {
+                'followers_count': 513958,
+                'following_count': 2039,
+                'tweet_count': 3635,
+                'listed_count': 1672,
+            },
+            'entities': {'url': {'urls': []}},
+        })
+
+        self.assertEqual(user, {
+            'id': 2244994945,
+            'id_str': '2244994945',
+            'name': 'Twitter Dev',
+            'screen_name': 'TwitterDev',
+            'created_at': 'Sat Dec 14 04:35:55 +0000 2013',
+            'followers_count': 513958,
+            'friends_count': 2039,
+            'statuses_count': 3635,
+            'listed_count': 1672,
+            'entities': {'url': {'urls': []}},
+        })
+
+    def test_minimal_fields(self):
+        user = user_from_v2({'id': '12', 'name': 'jack', 'username': 'jack'})
+        self.assertEqual(user['id'], 12)
+        self.assertEqual(user['screen_name'], 'jack')
+        self.assertNotIn('followers_count', user)
+
+
 class TestGetEnsDomains(unittest.TestCase):
 
     def test_extract_ens_domains(self):
@@ -0,0 +1,114 @@
+import os
+import tempfile
+import time
+import unittest
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import TwitterNoAvailableAPIs
+from twitter_api_crawler.key_state import SQLiteKeyState
+
+
+class TestSQLiteKeyState(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'keys.db')
+        self.state = SQLiteKeyState(self.path)
+
+    def tearDown(self) -> None:
+        self.state.close()
+        self.tmpdir.cleanup()
+
+    def test_sleep_keeps_latest_wakeup(self):
+        later = time.time() + 600
+        self.state.sleep('boom', later)
+        self.state.sleep('boom', time.time() + 60)
+        self.assertEqual(self.state.sleep_until('boom'), later)
+        self.assertEqual(self.state.sleeping(), {'boom': later})
+
+    def test_sleep_expires(self):
+        self.state.sleep('boom', time.time() - 1)
+        self.assertIsNone(self.state.sleep_until('boom'))
+        self.assertEqual(self.state.try_acquire('boom'), (True, None))
+
+    def test_wakeup(self):
+        self.state.sleep('boom', time.time() + 600)
+        self.state.wakeup('boom')
+        self.assertEqual(self.state.try_acquire('boom'), (True, None))
+
+    def test_try_acquire_spends_quota(self):
+        reset = time.time() + 60
+        self.state.update_quota('boom', 'friends/list', 2, reset)
+
+        for _ in range(2):
+            self.assertEqual(
+                self.state.try_acquire('boom', 'friends/list'),
+                (True, None),
+            )
+        self.assertEqual(
+            self.state.try_acquire('boom', 'friends/list'),
+            (False, reset),
+        )
+        # other endpoints have their own quota
+        self.assertTrue(self.state.try_acquire('boom', 'users/lookup')[0])
+
+    def test_quota_resets(self):
+        self.state.update_quota('boom', 'friends/list', 0, time.time() - 1)
+        self.assertTrue(self.state.try_acquire('boom', 'friends/list')[0])
+
+    def test_state_is_persistent(self):
+        until = time.time() + 600
+        self.state.sleep('boom', until)
+        reopened = SQLiteKeyState(self.path)
+        self.assertEqual(reopened.try_acquire('boom'), (False, until))
+        reopened.close()
+
+
+class TestCrawlerKeyState(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'keys.db')
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def make_crawler(self):
+        crawler = TwitterAPIv1Crawler(key_state=SQLiteKeyState(self.path))
+        for key in ('boom', 'boom2'):
+            crawler.create_api(key, f'{key}_api_key', 'b', 'c', 'd')
+        return crawler
+
+    def test_sleep_is_shared_between_crawlers(self):
+        first = self.make_crawler()
+        second = self.make_crawler()
+
+        first.next_api()
+        first.pause_current_api(600)
+
+        second.next_api()
+        self.assertEqual(second.current_key, 'boom2')
+        self.assertTrue(second.get_api('boom').is_asleep())
+
+    def test_exhausted_quota_skips_key(self):
+        crawler = self.make_crawler()
+        for key in ('boom', 'boom2'):
+            crawler.key_state.update_quota(
+                key, 'friends/list', 0, time.time() + 60,
+            )
+
+        with self.assertRaises(TwitterNoAvailableAPIs):
+            crawler.next_api('friends/list')
+
+        # The keys sleep until the quota resets instead of being retried.
+        self.assertGreater(crawler.seconds_until_available(), 55)
+        self.assertTrue(crawler.get_api('boom').is_asleep())
+
+    def test_exhausted_quota_of_one_key(self):
+        crawler = self.make_crawler()
+        crawler.key_state.update_quota(
+            'boom', 'friends/list', 0, time.time() + 60,
+        )
+
+        crawler.next_api('friends/list')
+        self.assertEqual(crawler.current_key, 'boom2')
+        self.assertEqual(crawler.seconds_until_available(), 0)
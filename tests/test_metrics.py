@@ -0,0 +1,129 @@
+import unittest
+from twitter_api_crawler.api import TwitterAPIv1
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import Twitter429Exception
+from twitter_api_crawler.metrics import (
+    NULL_METRICS,
+    InMemoryMetrics,
+    PrometheusMetrics,
+)
+import responses
+
+
+class TestInMemoryMetrics(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.metrics = InMemoryMetrics(buckets=(0.1, 1.0))
+
+    def test_null_metrics_disabled(self):
+        self.assertFalse(NULL_METRICS.enabled)
+        NULL_METRICS.increment('requests_total')
+        self.assertTrue(self.metrics.enabled)
+
+    def test_counter(self):
+        self.metrics.increment('requests_total', labels={'status': 200})
+        self.metrics.increment('requests_total', 2, labels={'status': 200})
+        self.metrics.increment('requests_total', labels={'status': 429})
+
+        self.assertEqual(
+            self.metrics.get('requests_total', {'status': 200}), 3,
+        )
+        self.assertEqual(
+            self.metrics.get('requests_total', {'status': 429}), 1,
+        )
+        self.assertIsNone(self.metrics.get('requests_total', {'status': 503}))
+
+    def test_gauge(self):
+        self.metrics.gauge('rate_limit_remaining', 14, {'key': 'a'})
+        self.metrics.gauge('rate_limit_remaining', 13, {'key': 'a'})
+        self.assertEqual(
+            self.metrics.get('rate_limit_remaining', {'key': 'a'}), 13,
+        )
+
+    def test_histogram(self):
+        for value in (0.05, 0.5, 5):
+            self.metrics.observe('latency', value)
+        self.assertEqual(self.metrics.count('latency'), 3)
+
+
+class TestPrometheusMetrics(unittest.TestCase):
+
+    def test_render(self):
+        metrics = PrometheusMetrics(prefix='t_', buckets=(0.1, 1.0))
+        metrics.increment(
+            'requests_total', labels={'endpoint': 'friends/list'},
+        )
+        metrics.gauge('rate_limit_remaining', 14, {'key': 'a"b'})
+        metrics.observe('latency', 0.05)
+        metrics.observe('latency', 5)
+
+        expected = '\n'.join([
+            '# TYPE t_requests_total counter',
+            't_requests_total{endpoint="friends/list"} 1',
+            '# TYPE t_rate_limit_remaining gauge',
+            't_rate_limit_remaining{key="a\\"b"} 14',
+            '# TYPE t_latency histogram',
+            't_latency_bucket{le="0.1"} 1',
+            't_latency_bucket{le="1"} 1',
+            't_latency_bucket{le="+Inf"} 2',
+            't_latency_sum 5.05',
+            't_latency_count 2',
+        ]) + '\n'
+        self.assertEqual(metrics.render(), expected)
+
+
+class TestClientMetrics(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.metrics = InMemoryMetrics()
+        self.crawler = TwitterAPIv1Crawler(metrics=self.metrics)
+        self.crawler.create_api('boom', 'a', 'b', 'c', 'd')
+        self.url = 'https://api.twitter.com/1.1/friends/list.json'
+
+    @responses.activate
+    def test_request_metrics(self):
+        responses.add(
+            method='GET',
+            url=self.url,
+            json={'users': [], 'next_cursor': 0},
+            headers={
+                'x-rate-limit-limit': '15',
+                'x-rate-limit-remaining': '14',
+                'x-rate-limit-reset': '1600000000',
+            },
+        )
+        self.crawler.get_following('bob')
+
+        labels = {'endpoint': 'friends/list', 'key': 'boom'}
+        self.assertEqual(
+            self.metrics.get('requests_total', {**labels, 'status': 200}),
+            1,
+        )
+        self.assertEqual(
+            self.metrics.count('request_duration_seconds', labels), 1,
+        )
+        self.assertGreater(self.metrics.get('response_bytes_total', labels), 0)
+        self.assertEqual(self.metrics.get('rate_limit_remaining', labels), 14)
+        self.assertEqual(
+            self.crawler.get_api('boom').rate_limits['friends/list'],
+            {'limit': 15, 'remaining': 14, 'reset': 1600000000},
+        )
+
+    @responses.activate
+    def test_rate_limited_metrics(self):
+        responses.add(method='GET', url=self.url, status=429, json={})
+
+        with self.assertRaises(Twitter429Exception):
+            self.crawler.get_following('bob')
+
+        self.assertEqual(
+            self.metrics.get('rate_limited_total', {'key': 'boom'}), 1,
+        )
+        self.assertEqual(
+            self.metrics.get('key_sleep_seconds_total', {'key': 'boom'}),
+            self.crawler.sleep_period,
+        )
+
+    def test_default_client_has_null_metrics(self):
+        api = TwitterAPIv1('a', 'b', 'c', 'd')
+        self.assertIs(api.metrics, NULL_METRICS)
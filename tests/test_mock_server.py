@@ -0,0 +1,120 @@
+import unittest
+from twitter_api_crawler.api import TwitterAPIv1
+from twitter_api_crawler.exceptions import (
+    Twitter404Exception,
+    Twitter429Exception,
+    Twitter503Exception,
+)
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+
+
+class TestSyntheticGraph(unittest.TestCase):
+
+    def test_deterministic(self):
+        a = SyntheticGraph(num_users=200, seed=3)
+        b = SyntheticGraph(num_users=200, seed=3)
+        self.assertEqual(a.following, b.following)
+
+    def test_followers_mirror_following(self):
+        graph = SyntheticGraph(num_users=200)
+        for user_id, followed in graph.following.items():
+            for target in followed:
+                self.assertIn(user_id, graph.followers[target])
+
+    def test_resolve(self):
+        graph = SyntheticGraph(num_users=10)
+        self.assertEqual(graph.resolve(screen_name='user5'), 5)
+        self.assertEqual(graph.resolve(screen_name='USER5'), 5)
+        self.assertIsNone(graph.resolve(screen_name='user11'))
+        self.assertIsNone(graph.resolve(screen_name='bob'))
+
+
+class TestMockTwitterServer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.mock_api = MockTwitterAPI(
+            graph=SyntheticGraph(num_users=500, seed=1),
+            rate_limits={'friends/list': 3},
+        )
+        self.server = MockTwitterServer(self.mock_api).start()
+        self.api = TwitterAPIv1(
+            api_key='mock_api_key',
+            api_key_secret='b',
+            access_token='c',
+            access_token_secret='d',
+            base_url=self.server.base_url,
+        )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_lookup_users(self):
+        users = self.api.lookup_users('user1,user2,nobody')
+        self.assertEqual([_['screen_name'] for _ in users], ['user1', 'user2'])
+
+    def test_lookup_missing_users_404(self):
+        with self.assertRaises(Twitter404Exception):
+            self.api.lookup_users('nobody,nobody2')
+
+    def test_following_paginates(self):
+        graph = self.mock_api.graph
+        self.mock_api.rate_limits['friends/list'] = 100
+        user_id = max(graph.following, key=lambda _: len(graph.following[_]))
+
+        crawled = []
+        cursor = -1
+        while cursor != 0:
+            page = self.api.get_following(f'user{user_id}', cursor)
+            crawled.extend(_['id'] for _ in page['users'])
+            cursor = page['next_cursor']
+
+        self.assertEqual(crawled, graph.following[user_id])
+
+    def test_timeline_pages_with_max_id(self):
+        graph = self.mock_api.graph
+        tweets = self.api.get_user_timeline('user150')
+        self.assertEqual(len(tweets), graph.statuses[150])
+
+        page = self.api.get_user_timeline('user150', count=100)
+        older = self.api.get_user_timeline(
+            'user150',
+            max_id=page[-1]['id'] - 1,
+        )
+        self.assertEqual(page + older, tweets)
+
+        graph.post(150)
+        newer = self.api.get_user_timeline('user150', since_id=tweets[0]['id'])
+        self.assertEqual(len(newer), 1)
+        self.assertGreater(newer[0]['id'], tweets[0]['id'])
+
+    def test_rate_limit_per_key(self):
+        for _ in range(3):
+            self.api.get_following('user1')
+
+        with self.assertRaises(Twitter429Exception):
+            self.api.get_following('user1')
+
+        # other endpoints and other keys have their own windows
+        self.api.lookup_users('user1')
+        other = TwitterAPIv1(
+            'other_key', 'b', 'c', 'd', base_url=self.server.base_url,
+        )
+        other.get_following('user1')
+
+        stats = self.mock_api.stats
+        self.assertEqual(stats[('429', 'mock_api_key', 'friends/list')], 1)
+        self.assertEqual(stats[('requests', 'other_key', 'friends/list')], 1)
+
+    def test_inject_503(self):
+        self.mock_api.error_rate = 1.0
+        with self.assertRaises(Twitter503Exception):
+            self.api.lookup_users('user1')
+
+    def test_inject_nul_is_sanitized(self):
+        self.mock_api.nul_rate = 1.0
+        users = self.api.lookup_users('user1')
+        self.assertEqual(users[0]['name'], 'User 1')
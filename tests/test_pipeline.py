@@ -0,0 +1,144 @@
+import threading
+import time
+import unittest
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.pipeline import DEFAULT_ENRICHERS, Pipeline
+from twitter_api_crawler.sinks import MemorySink, Sink
+
+
+class SlowSink(Sink):
+
+    def __init__(self):
+        self.records = []
+        self.lock = threading.Lock()
+
+    def write(self, records):
+        time.sleep(0.01)
+        with self.lock:
+            self.records.extend(records)
+
+
+class BrokenSink(Sink):
+
+    def write(self, records):
+        raise OSError('disk full')
+
+
+class TestDefaultEnrichers(unittest.TestCase):
+
+    def test_description_fields(self):
+        user = {
+            'name': 'bob.eth',
+            'description': 'Friends with @heysamtexas #hashtag',
+            'entities': {},
+        }
+        enriched = {
+            field: enricher(user)
+            for field, enricher in DEFAULT_ENRICHERS.items()
+        }
+        self.assertEqual(enriched['urls'], [])
+        self.assertEqual(enriched['description_mentions'], ['heysamtexas'])
+        self.assertEqual(enriched['description_hashtags'], ['hashtag'])
+        self.assertEqual(enriched['ens_domains'], ['bob.eth'])
+
+    def test_missing_description(self):
+        user = {'name': None, 'description': None}
+        self.assertEqual(
+            DEFAULT_ENRICHERS['description_mentions'](user),
+            [],
+        )
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=1000)
+        self.server = MockTwitterServer(
+            MockTwitterAPI(
+                graph=self.graph,
+                rate_limits={'followers/list': 4},
+                window=0.3,
+            ),
+        ).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=0.3)
+        for key in ('k1', 'k2', 'k3'):
+            self.crawler.create_api(
+                key, key, 'b', 'c', 'd', base_url=self.server.base_url,
+            )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_followers_pipeline(self):
+        usernames = ['user1', 'user2', 'user3', 'user999999']
+        sink = SlowSink()
+        pipeline = Pipeline(
+            self.crawler,
+            sink,
+            relationship='followers',
+            fetch_workers=2,
+            enrich_workers=2,
+            queue_size=2,
+        )
+        stats = pipeline.run(usernames)
+
+        for user_id in (1, 2, 3):
+            crawled = [
+                _['id'] for _ in sink.records
+                if _['crawled_from'] == f'user{user_id}'
+            ]
+            self.assertEqual(
+                sorted(crawled), sorted(self.graph.followers[user_id]),
+            )
+            self.assertEqual(self.crawler.get_cursor(f'user{user_id}'), 0)
+
+        self.assertEqual(stats['accounts'], 4)
+        self.assertEqual(stats['users'], len(sink.records))
+        self.assertEqual(stats['errors'], 0)
+        self.assertIn('description_hashtags', sink.records[0])
+
+    def test_enricher_errors_are_counted(self):
+        def broken(user):
+            raise ValueError('boom')
+
+        sink = MemorySink()
+        pipeline = Pipeline(self.crawler, sink, enrichers={'broken': broken})
+        stats = pipeline.run(['user5'])
+
+        self.assertEqual(stats['errors'], stats['pages'])
+        self.assertEqual(sink.records, [])
+
+    def test_cursor_waits_for_the_sink(self):
+        pipeline = Pipeline(self.crawler, BrokenSink(), enrichers={})
+        stats = pipeline.run(['user5'])
+
+        self.assertGreater(stats['pages'], 0)
+        self.assertEqual(stats['errors'], stats['pages'])
+        self.assertEqual(self.crawler.get_cursor('user5'), -1)
+
+    def test_cursor_skips_no_unwritten_page(self):
+        sink = MemorySink()
+        pipeline = Pipeline(self.crawler, sink, enrichers={})
+
+        def page(sequence, cursor):
+            return {
+                'username': 'bob',
+                'users': [{'id': sequence}],
+                'cursor': cursor,
+                'sequence': sequence,
+            }
+
+        pipeline._write(page(1, 20), None)
+        self.assertEqual(self.crawler.get_cursor('bob'), -1)
+        pipeline._write(page(0, 10), None)
+        self.assertEqual(self.crawler.get_cursor('bob'), 20)
+        pipeline._write(page(3, 0), None)
+        self.assertEqual(self.crawler.get_cursor('bob'), 20)
+        pipeline._write(page(2, 30), None)
+        self.assertEqual(self.crawler.get_cursor('bob'), 0)
+        self.assertEqual(len(sink.records), 4)
@@ -0,0 +1,160 @@
+import datetime
+import unittest
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.planner import (
+    lookup_counts,
+    plan_crawl,
+    request_cost,
+)
+
+START = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def user(name, friends=0, followers=0):
+    return {
+        'screen_name': name,
+        'friends_count': friends,
+        'followers_count': followers,
+    }
+
+
+class TestRequestCost(unittest.TestCase):
+
+    def test_request_cost(self):
+        self.assertEqual(request_cost(user('a')), 1)
+        self.assertEqual(request_cost(user('a', friends=200)), 1)
+        self.assertEqual(request_cost(user('a', friends=201)), 2)
+        self.assertEqual(
+            request_cost(user('a', followers=4001), 'followers'),
+            21,
+        )
+        self.assertEqual(request_cost({'screen_name': 'a'}, 'followers'), 1)
+
+
+class TestPlanCrawl(unittest.TestCase):
+
+    def test_largest_first_balances_keys(self):
+        users = [
+            user('a', friends=200 * 7),
+            user('b', friends=200 * 5),
+            user('c', friends=200 * 4),
+            user('d', friends=200 * 3),
+            user('e', friends=200 * 3),
+        ]
+        plan = plan_crawl(users, ['k1', 'k2'], start=START)
+
+        self.assertEqual(
+            [_['username'] for _ in plan.assignments['k1']],
+            ['a', 'd'],
+        )
+        self.assertEqual(
+            [_['username'] for _ in plan.assignments['k2']],
+            ['b', 'c', 'e'],
+        )
+        self.assertEqual(plan.load('k1'), 10)
+        self.assertEqual(plan.load('k2'), 12)
+
+    def test_makespan_and_finish(self):
+        users = [user('a', friends=200 * 40)]
+        plan = plan_crawl(
+            users,
+            ['k1', 'k2'],
+            seconds_per_request=2,
+            start=START,
+        )
+
+        # 40 requests: two full windows and 10 requests in the third.
+        self.assertEqual(plan.makespan, 2 * 900 + 10 * 2)
+        report = plan.report()
+        self.assertEqual(report['finish'], '2022-01-01T00:30:20+00:00')
+        self.assertEqual(report['loads'], {'k1': 40, 'k2': 0})
+        self.assertLess(report['lower_bound'], report['makespan'])
+
+    def test_cost_caps(self):
+        users = [user('mega', friends=200 * 100), user('small', friends=10)]
+
+        plan = plan_crawl(users, ['k1'], max_requests=5, start=START)
+        self.assertEqual(plan.report()['truncated'], ['mega'])
+        self.assertEqual(plan.load('k1'), 6)
+
+        plan = plan_crawl(
+            users,
+            ['k1'],
+            max_requests=5,
+            cap='skip',
+            start=START,
+        )
+        self.assertEqual(plan.report()['skipped'], ['mega'])
+        self.assertEqual(plan.load('k1'), 1)
+
+    def test_windows(self):
+        users = [user('a', friends=200 * 20), user('b', friends=200 * 12)]
+        plan = plan_crawl(users, ['k1'], start=START)
+
+        self.assertEqual(
+            plan.windows('k1'),
+            [
+                [{'username': 'a', 'requests': 15}],
+                [
+                    {'username': 'a', 'requests': 5},
+                    {'username': 'b', 'requests': 10},
+                ],
+                [{'username': 'b', 'requests': 2}],
+            ],
+        )
+
+    def test_empty(self):
+        plan = plan_crawl([], ['k1'], start=START)
+        self.assertEqual(plan.makespan, 0)
+        self.assertEqual(plan.windows('k1'), [])
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(TwitterAPIClientException):
+            plan_crawl([], [])
+        with self.assertRaises(TwitterAPIClientException):
+            plan_crawl([], ['k1'], cap='drop')
+
+
+class TestLookupCounts(unittest.TestCase):
+
+    def test_lookup_counts(self):
+        graph = SyntheticGraph(num_users=300)
+        server = MockTwitterServer(MockTwitterAPI(graph=graph)).start()
+        self.addCleanup(server.stop)
+
+        crawler = TwitterAPIv1Crawler()
+        crawler.create_api('k1', 'k1', 'b', 'c', 'd', base_url=server.base_url)
+
+        usernames = [f'user{_}' for _ in range(1, 151)] + ['nobody']
+        users = lookup_counts(crawler, usernames)
+
+        self.assertEqual(len(users), 150)
+        self.assertEqual(users[0]['friends_count'], len(graph.following[1]))
+        self.assertEqual(
+            request_cost(users[0], 'followers'),
+            -(-len(graph.followers[1]) // 200),
+        )
+
+    def test_lookup_counts_rotates_keys(self):
+        server = MockTwitterServer(
+            MockTwitterAPI(rate_limits={'users/lookup': 1}),
+        ).start()
+        self.addCleanup(server.stop)
+
+        crawler = TwitterAPIv1Crawler()
+        for key in ('k1', 'k2'):
+            crawler.create_api(
+                key, key, 'b', 'c', 'd', base_url=server.base_url,
+            )
+        crawler.get_api('k1').lookup_users('user1')
+
+        users = lookup_counts(crawler, [f'user{_}' for _ in range(1, 101)])
+
+        self.assertEqual(len(users), 100)
+        self.assertTrue(crawler.get_api('k1').is_asleep())
@@ -0,0 +1,118 @@
+import io
+import os
+import signal
+import time
+import unittest
+from unittest import mock
+from twitter_api_crawler import profiling
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.profiling import (
+    NULL_PROFILER,
+    PROFILE_ENV_VAR,
+    Profiler,
+    profiler_from_env,
+)
+import responses
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.profiler = Profiler().start()
+
+    def tearDown(self) -> None:
+        self.profiler.stop()
+
+    def test_phase_records_time_and_calls(self):
+        for _ in range(2):
+            with self.profiler.phase('http'):
+                time.sleep(0.01)
+
+        calls, seconds, growth = self.profiler.phases['http']
+        self.assertEqual(calls, 2)
+        self.assertGreaterEqual(seconds, 0.02)
+
+    def test_phase_records_allocations(self):
+        with self.profiler.phase('decode'):
+            blob = [str(_) for _ in range(10000)]
+
+        self.assertGreater(self.profiler.phases['decode'][2], 0)
+        self.assertEqual(len(blob), 10000)
+
+    def test_report(self):
+        with self.profiler.phase('sink'):
+            pass
+
+        stream = io.StringIO()
+        self.profiler.dump(stream)
+        self.assertIn('sink', stream.getvalue())
+        self.assertIn('Top allocation sites', stream.getvalue())
+
+    @unittest.skipIf(
+        not hasattr(signal, 'SIGUSR1'),
+        'SIGUSR1 is not available',
+    )
+    def test_signal_while_recording(self):
+        previous = signal.getsignal(signal.SIGUSR1)
+        self.addCleanup(signal.signal, signal.SIGUSR1, previous)
+        self.assertTrue(self.profiler.install_signal_handler())
+        self.profiler.record('fetch', 0.5)
+
+        stderr = io.StringIO()
+        with mock.patch('sys.stderr', stderr):
+            # The signal lands while the main thread is inside record().
+            with self.profiler._lock:
+                os.kill(os.getpid(), signal.SIGUSR1)
+                time.sleep(0.05)
+                self.assertEqual(stderr.getvalue(), '')
+
+            for _ in range(100):
+                if stderr.getvalue():
+                    break
+                time.sleep(0.05)
+
+        self.assertIn('fetch', stderr.getvalue())
+
+    def test_null_profiler(self):
+        with NULL_PROFILER.phase('http'):
+            pass
+        self.assertFalse(NULL_PROFILER.enabled)
+
+
+class TestProfilerFromEnv(unittest.TestCase):
+
+    def test_unset(self):
+        with mock.patch.dict(os.environ, {PROFILE_ENV_VAR: ''}):
+            self.assertIs(profiler_from_env(), NULL_PROFILER)
+
+    @mock.patch('atexit.register')
+    @mock.patch.object(profiling, '_env_profiler', None)
+    def test_enabled(self, register):
+        with mock.patch.dict(os.environ, {PROFILE_ENV_VAR: '1'}):
+            profiler = profiler_from_env()
+            crawlers = [TwitterAPIv1Crawler() for _ in range(3)]
+
+        profiler.stop()
+        self.assertTrue(profiler.enabled)
+        self.assertTrue(all(_.profiler is profiler for _ in crawlers))
+        register.assert_called_once_with(profiler.dump)
+
+
+class TestCrawlerProfiling(unittest.TestCase):
+
+    @responses.activate
+    def test_crawl_phases(self):
+        responses.add(
+            method='GET',
+            url='https://api.twitter.com/1.1/friends/list.json',
+            json={'users': [{'id': 1}], 'next_cursor': 0},
+        )
+        profiler = Profiler(trace_allocations=False)
+        crawler = TwitterAPIv1Crawler(profiler=profiler)
+        crawler.create_api('boom', 'a', 'b', 'c', 'd')
+        crawler.get_following('bob')
+
+        self.assertEqual(
+            set(profiler.phases),
+            {'key_acquisition', 'http', 'sanitize', 'decode', 'extraction'},
+        )
@@ -0,0 +1,190 @@
+import gzip
+import json
+import os
+import tempfile
+import time
+import unittest
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.sinks import MemorySink, NDJSONSink, ParquetSink
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def read_ndjson(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+class TestNDJSONSink(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_write_and_close(self):
+        with NDJSONSink(self.tmpdir.name) as sink:
+            sink.write([{'id': 1}, {'id': 2}])
+            sink.write([{'id': 3, 'name': 'Zoë'}])
+            self.assertEqual(sink.paths, [])
+
+        self.assertEqual(len(sink.paths), 1)
+        self.assertTrue(sink.paths[0].endswith('.ndjson.gz'))
+        self.assertEqual(
+            read_ndjson(sink.paths[0]),
+            [{'id': 1}, {'id': 2}, {'id': 3, 'name': 'Zoë'}],
+        )
+        self.assertEqual(
+            os.listdir(self.tmpdir.name),
+            [os.path.basename(sink.paths[0])],
+        )
+
+    def test_rotate_by_size(self):
+        sink = NDJSONSink(self.tmpdir.name, compress=False, max_bytes=20)
+        for index in range(5):
+            sink.write([{'id': index, 'pad': 'xxxxxxxxxx'}])
+        sink.close()
+
+        self.assertEqual(len(sink.paths), 5)
+        records = [r for path in sink.paths for r in read_ndjson(path)]
+        self.assertEqual([r['id'] for r in records], list(range(5)))
+
+    def test_rotate_by_age(self):
+        sink = NDJSONSink(self.tmpdir.name, max_seconds=0)
+        sink.write([{'id': 1}])
+        sink.write([{'id': 2}])
+        sink.close()
+        self.assertEqual(len(sink.paths), 2)
+
+    def test_publish(self):
+        sink = NDJSONSink(self.tmpdir.name, compress=False)
+        sink.write([{'id': 1}])
+        sink.publish()
+        self.assertEqual(len(sink.paths), 1)
+        self.assertFalse(
+            [_ for _ in os.listdir(self.tmpdir.name) if _.endswith('.part')],
+        )
+
+        sink.publish()
+        sink.write([{'id': 2}])
+        sink.close()
+        self.assertEqual(
+            [read_ndjson(path) for path in sink.paths],
+            [[{'id': 1}], [{'id': 2}]],
+        )
+
+    def test_empty_sink_writes_nothing(self):
+        NDJSONSink(self.tmpdir.name).close()
+        self.assertEqual(os.listdir(self.tmpdir.name), [])
+
+
+@unittest.skipIf(pyarrow is None, 'pyarrow is not installed')
+class TestParquetSink(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_row_groups(self):
+        sink = ParquetSink(self.tmpdir.name, row_group_size=2)
+        sink.write([{'id': 1, 'screen_name': 'bob', 'entities': {}}])
+        sink.write([{'id': 2}, {'id': 3, 'verified': True}])
+        sink.close()
+
+        parquet_file = pyarrow.parquet.ParquetFile(sink.paths[0])
+        self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+        table = parquet_file.read()
+        self.assertEqual(table.column('id').to_pylist(), [1, 2, 3])
+        self.assertEqual(
+            table.column('screen_name').to_pylist(),
+            ['bob', None, None],
+        )
+        self.assertNotIn('entities', table.column_names)
+
+    def test_custom_columns_and_rotation(self):
+        sink = ParquetSink(
+            self.tmpdir.name,
+            columns={'id': 'int64'},
+            row_group_size=1,
+            max_rows=2,
+        )
+        sink.write([{'id': _} for _ in range(3)])
+        sink.close()
+
+        self.assertEqual(len(sink.paths), 2)
+        self.assertEqual(
+            pyarrow.parquet.read_table(sink.paths[1]).column_names,
+            ['id'],
+        )
+
+
+class TestCrawlToSink(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=2000)
+        self.server = MockTwitterServer(
+            MockTwitterAPI(
+                graph=self.graph,
+                rate_limits={'followers/list': 2},
+                window=0.3,
+            ),
+        ).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=0.3)
+        for key in ('k1', 'k2'):
+            self.crawler.create_api(
+                key, key, 'b', 'c', 'd', base_url=self.server.base_url,
+            )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_crawl_followers_rotates_keys(self):
+        sink = MemorySink()
+        result = {'completed': False}
+        while not result['completed']:
+            time.sleep(self.crawler.seconds_until_available())
+            result = self.crawler.crawl(
+                'user1', sink, relationship='followers',
+            )
+
+        self.assertEqual(
+            [_['id'] for _ in sink.records],
+            self.graph.followers[1],
+        )
+        self.assertEqual(sink.records[0]['crawled_from'], 'user1')
+        self.assertEqual(sink.records[0]['relationship'], 'followers')
+        self.assertEqual(self.crawler.get_cursor('user1'), 0)
+
+    def test_crawl_stops_when_keys_exhausted(self):
+        self.crawler.sleep_period = 600
+        result = self.crawler.crawl(
+            'user1',
+            MemorySink(),
+            relationship='followers',
+        )
+
+        self.assertFalse(result['completed'])
+        self.assertEqual(result['pages'], 4)
+        self.assertEqual(result['cursor'], 800)
+
+    def test_crawl_following(self):
+        sink = MemorySink()
+        result = self.crawler.crawl('user5', sink)
+
+        self.assertTrue(result['completed'])
+        self.assertEqual(
+            [_['id'] for _ in sink.records],
+            self.graph.following[5],
+        )
@@ -0,0 +1,308 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from twitter_api_crawler import snapshots
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.sinks import MemorySink
+from twitter_api_crawler.snapshots import (
+    CompactSnapshotStore,
+    JSONSnapshotStore,
+    SnapshotStore,
+    diff_ids,
+)
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def test_save_and_load(self):
+        store = SnapshotStore()
+        self.assertIsNone(store.load('bob', 'followers'))
+        self.assertEqual(store.get_ids('bob', 'followers'), [])
+
+        store.save('bob', 'followers', [3, 2, 1])
+        self.assertEqual(store.get_ids('bob', 'followers'), [3, 2, 1])
+        self.assertEqual(store.get_ids('bob', 'following'), [])
+
+    def test_needs_full_sweep(self):
+        store = SnapshotStore()
+        self.assertTrue(store.needs_full_sweep('bob', 'followers'))
+
+        store.save('bob', 'followers', [1])
+        self.assertFalse(store.needs_full_sweep('bob', 'followers'))
+        self.assertFalse(store.needs_full_sweep('bob', 'followers', 60))
+        self.assertTrue(store.needs_full_sweep('bob', 'followers', 0))
+
+    def test_incremental_save_keeps_full_sweep_time(self):
+        store = SnapshotStore()
+        store.save('bob', 'followers', [1], full_sweep=True)
+        swept = store.load('bob', 'followers')['full_sweep']
+
+        time.sleep(0.01)
+        store.save('bob', 'followers', [2, 1])
+        self.assertEqual(store.load('bob', 'followers')['full_sweep'], swept)
+
+        store.save('bob', 'followers', [2, 1], full_sweep=True)
+        self.assertGreater(store.load('bob', 'followers')['full_sweep'], swept)
+
+
+class TestJSONSnapshotStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_persists_across_instances(self):
+        JSONSnapshotStore(self.tmpdir.name).save('Bob', 'following', [5, 4])
+
+        store = JSONSnapshotStore(self.tmpdir.name)
+        self.assertEqual(store.get_ids('Bob', 'following'), [5, 4])
+        self.assertEqual(
+            os.listdir(self.tmpdir.name),
+            ['following-bob.json'],
+        )
+
+    def test_unsafe_usernames(self):
+        store = JSONSnapshotStore(self.tmpdir.name)
+        path = store.path('../etc/passwd', 'followers')
+        self.assertEqual(os.path.dirname(path), self.tmpdir.name)
+
+
+class TestCrawlIncremental(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=2000)
+        self.api = MockTwitterAPI(
+            graph=self.graph,
+            rate_limits={'followers/list': 100},
+        )
+        self.server = MockTwitterServer(self.api).start()
+        self.crawler = TwitterAPIv1Crawler(sleep_period=0.3)
+        self.crawler.create_api(
+            'k1', 'k1', 'b', 'c', 'd', base_url=self.server.base_url,
+        )
+        self.snapshots = SnapshotStore()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def crawl(self, **kwargs):
+        sink = MemorySink()
+        result = self.crawler.crawl_incremental(
+            'user1',
+            sink,
+            self.snapshots,
+            relationship='followers',
+            **kwargs,
+        )
+        return result, [_['id'] for _ in sink.records]
+
+    def requests(self):
+        return sum(
+            count for (kind, _, _), count in self.api.stats.items()
+            if kind == 'requests'
+        )
+
+    def test_first_crawl_is_full(self):
+        result, ids = self.crawl()
+
+        self.assertTrue(result['completed'])
+        self.assertTrue(result['full_sweep'])
+        self.assertEqual(ids, self.graph.followers[1])
+        self.assertEqual(
+            self.snapshots.get_ids('user1', 'followers'),
+            self.graph.followers[1],
+        )
+
+    def test_recrawl_stops_at_known_ids(self):
+        self.crawl()
+        pages = self.requests()
+        self.assertGreater(pages, 2)
+
+        followers = self.graph.followers[1]
+        new = [_ for _ in self.graph.following if _ not in followers][:3]
+        followers[0:0] = new
+
+        result, ids = self.crawl()
+
+        self.assertTrue(result['completed'])
+        self.assertFalse(result['full_sweep'])
+        self.assertEqual(result['pages'], 1)
+        self.assertEqual(self.requests(), pages + 1)
+        self.assertEqual(ids, new)
+        self.assertEqual(
+            self.snapshots.get_ids('user1', 'followers'),
+            followers,
+        )
+
+    def test_compact_store(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            self.snapshots = CompactSnapshotStore(tmpdir)
+            self.crawl()
+
+            followers = self.graph.followers[1]
+            new = [_ for _ in self.graph.following if _ not in followers][:2]
+            followers[0:0] = new
+
+            result, ids = self.crawl()
+            self.assertEqual(result['pages'], 1)
+            self.assertEqual(ids, new)
+            self.assertEqual(
+                self.snapshots.diff('user1', 'followers'),
+                {'added': sorted(new), 'removed': []},
+            )
+
+    def test_full_sweep_finds_removed(self):
+        self.crawl()
+
+        followers = self.graph.followers[1]
+        gone = followers.pop(10)
+
+        result, ids = self.crawl()
+        self.assertEqual(result['removed'], [])
+
+        result, ids = self.crawl(full_sweep_every=0)
+        self.assertTrue(result['full_sweep'])
+        self.assertEqual(result['removed'], [gone])
+        self.assertEqual(ids, [])
+        self.assertNotIn(gone, self.snapshots.get_ids('user1', 'followers'))
+
+    def test_error_body_during_full_sweep(self):
+        self.crawl()
+        known = self.snapshots.get_ids('user1', 'followers')
+        swept = self.snapshots.last_full_sweep('user1', 'followers')
+
+        error = {'errors': [{'code': 131, 'message': 'Internal error'}]}
+        api = self.crawler.get_api('k1')
+        with mock.patch.object(api, '_post', return_value=error):
+            with self.assertRaises(TwitterAPIClientException):
+                self.crawl(full_sweep_every=0)
+
+        self.assertEqual(self.snapshots.get_ids('user1', 'followers'), known)
+        self.assertEqual(
+            self.snapshots.last_full_sweep('user1', 'followers'),
+            swept,
+        )
+
+    def test_following_error_body(self):
+        error = {'errors': [{'code': 131, 'message': 'Internal error'}]}
+        api = self.crawler.get_api('k1')
+        with mock.patch.object(api, '_get', return_value=error):
+            with self.assertRaises(TwitterAPIClientException):
+                self.crawler.crawl_incremental(
+                    'user1',
+                    MemorySink(),
+                    self.snapshots,
+                )
+
+        self.assertIsNone(self.snapshots.load('user1', 'following'))
+
+
+class TestCompactSnapshotStore(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = CompactSnapshotStore(self.tmpdir.name)
+
+    def tearDown(self) -> None:
+        self.tmpdir.cleanup()
+
+    def test_round_trip(self):
+        for ids in ([], [7], [3, 1, 2], [1, 2 ** 62, 1500000000000000000]):
+            self.store.save('bob', 'followers', ids)
+            self.assertEqual(
+                self.store.get_ids('bob', 'followers'),
+                sorted(ids),
+            )
+
+        self.assertEqual(len(self.store.history('bob', 'followers')), 4)
+
+    def test_compact_on_disk(self):
+        ids = list(range(1000000, 1100000, 3))
+        self.store.save('bob', 'followers', ids)
+
+        path = self.store.history('bob', 'followers')[0]
+        self.assertLess(os.path.getsize(path), len(ids) // 10)
+        self.assertEqual(self.store.read(path)['count'], len(ids))
+
+    def test_diff(self):
+        self.store.save('bob', 'followers', [1, 2, 3, 4])
+        time.sleep(0.01)
+        self.store.save('bob', 'followers', [2, 4, 5, 6])
+
+        self.assertEqual(
+            self.store.diff('bob', 'followers'),
+            {'added': [5, 6], 'removed': [1, 3]},
+        )
+
+        first = self.store.history('bob', 'followers')[0]
+        self.assertEqual(
+            self.store.diff('bob', 'followers', newer=first),
+            {'added': [1, 2, 3, 4], 'removed': []},
+        )
+
+    @unittest.skipIf(snapshots.numpy is None, 'numpy is not installed')
+    def test_diff_vectorised(self):
+        old = list(range(10, 300000, 2)) + [2 ** 62]
+        new = list(range(10, 300000, 3)) + [2 ** 63 + 5]
+        self.store.save('bob', 'followers', old)
+        time.sleep(0.01)
+        self.store.save('bob', 'followers', new)
+
+        newer = self.store.history('bob', 'followers')[-1]
+        ids = self.store._read(newer, True)['ids']
+        self.assertIsInstance(ids, snapshots.numpy.ndarray)
+        self.assertEqual(ids.dtype, snapshots.numpy.uint64)
+
+        expected = self.store.diff('bob', 'followers')
+        with mock.patch.object(snapshots, 'numpy', None):
+            self.assertEqual(self.store.diff('bob', 'followers'), expected)
+            self.assertEqual(self.store.get_ids('bob', 'followers'), new)
+
+        added, removed = diff_ids(old, new)
+        self.assertEqual(expected, {'added': added, 'removed': removed})
+
+    def test_keep(self):
+        store = CompactSnapshotStore(self.tmpdir.name, keep=2)
+        for ids in ([1], [1, 2], [1, 2, 3]):
+            store.save('bob', 'following', ids)
+            time.sleep(0.01)
+
+        history = store.history('bob', 'following')
+        self.assertEqual(len(history), 2)
+        self.assertEqual(store.read(history[0])['ids'], [1, 2])
+
+    def test_full_sweep_time_read_from_header(self):
+        self.store.save('bob', 'followers', [1], full_sweep=True)
+        swept = self.store.last_full_sweep('bob', 'followers')
+
+        time.sleep(0.01)
+        self.store.save('bob', 'followers', [1, 2])
+        self.assertEqual(self.store.last_full_sweep('bob', 'followers'), swept)
+        self.assertFalse(self.store.needs_full_sweep('bob', 'followers', 60))
+
+    def test_not_a_snapshot(self):
+        path = os.path.join(self.tmpdir.name, 'junk.snap')
+        with open(path, 'wb') as f:
+            f.write(b'x' * 64)
+
+        with self.assertRaises(TwitterAPIClientException):
+            self.store.read(path)
+
+
+class TestDiffIds(unittest.TestCase):
+
+    def test_diff_ids(self):
+        self.assertEqual(diff_ids([], [1, 2]), ([1, 2], []))
+        self.assertEqual(diff_ids([1, 2], []), ([], [1, 2]))
+        self.assertEqual(diff_ids([1, 3, 5], [2, 3, 6]), ([2, 6], [1, 5]))
@@ -0,0 +1,214 @@
+import json
+import socket
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from twitter_api_crawler.api import TwitterAPIv1
+from twitter_api_crawler.exceptions import (
+    Twitter404Exception,
+    Twitter429Exception,
+)
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+from twitter_api_crawler.transport import HTTP2Transport, RequestsTransport
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    h2 = None
+
+
+class TestRequestsTransport(unittest.TestCase):
+
+    def test_default_transport(self):
+        api = TwitterAPIv1('a', 'b', 'c', 'd', cache_requests=True)
+        self.assertIsInstance(api.transport, RequestsTransport)
+        self.assertTrue(api.transport.cache_requests)
+
+
+@unittest.skipIf(httpx is None, 'httpx is not installed')
+class TestHTTP2Transport(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.graph = SyntheticGraph(num_users=500)
+        self.mock_api = MockTwitterAPI(
+            graph=self.graph,
+            rate_limits={'friends/list': 3},
+        )
+        self.server = MockTwitterServer(self.mock_api).start()
+        self.transport = HTTP2Transport(max_connections=2)
+        self.api = TwitterAPIv1(
+            'mock_api_key', 'b', 'c', 'd',
+            base_url=self.server.base_url,
+            transport=self.transport,
+        )
+
+    def tearDown(self) -> None:
+        self.transport.close()
+        self.server.stop()
+
+    def test_signed_requests(self):
+        users = self.api.lookup_users('user1,user2')
+        page = self.api.get_following('user1')
+
+        self.assertEqual([_['id'] for _ in users], [1, 2])
+        self.assertEqual(
+            [_['id'] for _ in page['users']],
+            self.graph.following[1],
+        )
+        requests_sent = self.mock_api.stats[
+            ('requests', 'mock_api_key', 'users/lookup')
+        ]
+        self.assertEqual(requests_sent, 1)
+        self.assertEqual(self.api.quota_left('friends/list'), 2 / 3)
+
+    def test_same_exceptions(self):
+        with self.assertRaises(Twitter404Exception):
+            self.api.lookup_users('nobody')
+
+        for _ in range(3):
+            self.api.get_following('user1')
+        with self.assertRaises(Twitter429Exception):
+            self.api.get_following('user1')
+
+    def test_connection_error(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+
+        api = TwitterAPIv1(
+            'a', 'b', 'c', 'd',
+            base_url=f'http://127.0.0.1:{port}/1.1',
+            transport=self.transport,
+        )
+        with self.assertRaises(requests.ConnectionError):
+            api.lookup_users('user1')
+        self.assertEqual(api.health.error_rate, api.health.smoothing)
+
+    def test_concurrent_requests(self):
+        self.mock_api.latency = 0.02
+        names = [f'user{_}' for _ in range(1, 21)]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            pages = list(executor.map(self.api.lookup_users, names))
+
+        self.assertEqual([page[0]['screen_name'] for page in pages], names)
+
+
+class H2Server(object):
+    """Plain-text HTTP/2 server answering every request with a user list."""
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen()
+        self.base_url = f'http://127.0.0.1:{self.sock.getsockname()[1]}/1.1'
+        self.connections = 0
+        self.requests = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(
+                target=self._serve,
+                args=(client,),
+                daemon=True,
+            ).start()
+
+    def _serve(self, client: socket.socket) -> None:
+        conn = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False),
+        )
+        conn.initiate_connection()
+        client.sendall(conn.data_to_send())
+        headers = {}
+
+        with client:
+            while True:
+                data = client.recv(65535)
+                if not data:
+                    return
+
+                for event in conn.receive_data(data):
+                    if isinstance(event, h2.events.RequestReceived):
+                        headers[event.stream_id] = dict(event.headers)
+                    elif isinstance(event, h2.events.DataReceived):
+                        conn.acknowledge_received_data(
+                            event.flow_controlled_length,
+                            event.stream_id,
+                        )
+                    elif isinstance(event, h2.events.StreamEnded):
+                        self.requests.append(headers.pop(event.stream_id))
+                        body = json.dumps(
+                            [{'id': 1, 'screen_name': 'user1'}],
+                        ).encode()
+                        conn.send_headers(event.stream_id, [
+                            (':status', '200'),
+                            ('content-type', 'application/json'),
+                            ('content-length', str(len(body))),
+                        ])
+                        conn.send_data(event.stream_id, body, end_stream=True)
+
+                client.sendall(conn.data_to_send())
+
+    def stop(self) -> None:
+        self.sock.close()
+
+
+@unittest.skipIf(httpx is None or h2 is None, 'httpx[http2] is not installed')
+class TestHTTP2Negotiation(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.server = H2Server()
+        self.transport = HTTP2Transport(http1=False, max_connections=1)
+        self.api = TwitterAPIv1(
+            'a', 'b', 'c', 'd',
+            base_url=self.server.base_url,
+            transport=self.transport,
+        )
+
+    def tearDown(self) -> None:
+        self.transport.close()
+        self.server.stop()
+
+    def test_signed_request_over_http2(self):
+        response = self.transport.send(
+            'post',
+            f'{self.server.base_url}/users/lookup.json',
+            auth=self.api.auth,
+            data={'screen_name': 'user1'},
+        )
+
+        self.assertEqual(response.http_version, 'HTTP/2')
+        headers = self.server.requests[0]
+        self.assertEqual(headers[b':method'], b'POST')
+        self.assertTrue(headers[b'authorization'].startswith(b'OAuth '))
+
+    def test_requests_multiplexed(self):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            pages = list(executor.map(
+                self.api.lookup_users,
+                [f'user{_}' for _ in range(20)],
+            ))
+
+        self.assertEqual(len(pages), 20)
+        self.assertEqual(len(self.server.requests), 20)
+        self.assertEqual(self.server.connections, 1)
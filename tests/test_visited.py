@@ -0,0 +1,178 @@
+import array
+import io
+import os
+import random
+import sys
+import tempfile
+import unittest
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+from twitter_api_crawler.frontier import Frontier
+from twitter_api_crawler.visited import (
+    BUFFER_LIMIT,
+    MERGE_SLICE,
+    BloomFilter,
+    IntSet,
+    VisitedSet,
+    _merge,
+)
+
+
+def snowflakes(count: int, seed: int = 1) -> list:
+    """Return IDs laid out like Twitter's: ms timestamp, worker, sequence."""
+    rng = random.Random(seed)
+    return [
+        (rng.randrange(0, 15 * 365 * 86400000) << 22)
+        | (rng.randrange(1024) << 12)
+        | rng.randrange(4096)
+        for _ in range(count)
+    ]
+
+
+class TestIntSet(unittest.TestCase):
+
+    def test_add_and_contains(self):
+        values = IntSet([5, 1 << 40, 1500000000000000000])
+        self.assertTrue(values.add(7))
+        self.assertFalse(values.add(5))
+
+        for value in (5, 7, 1 << 40, 1500000000000000000):
+            self.assertIn(value, values)
+        for value in (6, (1 << 40) + 1, 0):
+            self.assertNotIn(value, values)
+        self.assertEqual(len(values), 4)
+
+    def test_runs(self):
+        ids = snowflakes(5 * BUFFER_LIMIT + 10)
+        values = IntSet(ids)
+
+        self.assertEqual(len(values), len(set(ids)))
+        self.assertEqual(values.nbytes(), 8 * 5 * BUFFER_LIMIT)
+        self.assertTrue(all(value in values for value in ids))
+        self.assertFalse(any(value in values for value in snowflakes(100, 2)))
+        self.assertFalse(values.add(ids[0]))
+        self.assertEqual(list(values), sorted(set(ids)))
+
+    def test_merge_slices(self):
+        first = array.array('Q', range(0, 10 * MERGE_SLICE, 2))
+        second = array.array('Q', range(1, 10 * MERGE_SLICE, 6))
+        self.assertEqual(
+            list(_merge(first, second)),
+            sorted(set(first) | set(second)),
+        )
+        self.assertEqual(list(_merge(first, array.array('Q'))), list(first))
+
+    def test_memory_per_snowflake_id(self):
+        ids = snowflakes(200000)
+        values = IntSet(ids)
+
+        size = sum(sys.getsizeof(run) for run in values._runs)
+        size += sys.getsizeof(values._buffer)
+        size += sum(sys.getsizeof(value) for value in values._buffer)
+        self.assertEqual(len(values), len(set(ids)))
+        self.assertLess(size / len(values), 12)
+
+        plain = set(ids)
+        plain_size = sys.getsizeof(plain) + sum(map(sys.getsizeof, plain))
+        self.assertLess(size * 4, plain_size)
+
+    def test_iterates_sorted(self):
+        values = random.Random(1).sample(range(1 << 34), 1000)
+        self.assertEqual(list(IntSet(values)), sorted(values))
+
+    def test_dump_and_load(self):
+        ids = snowflakes(BUFFER_LIMIT + 1) + [1 << 50, 3 << 20, 0]
+        stream = io.BytesIO()
+        IntSet(ids).dump(stream)
+        stream.seek(0)
+
+        values = IntSet.load(stream)
+        self.assertEqual(len(values), len(set(ids)))
+        self.assertEqual(list(values), sorted(set(ids)))
+        self.assertTrue(values.add(1))
+        self.assertIn(1, values)
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        names = [f'user{_}' for _ in range(1000)]
+        for name in names:
+            bloom.add(name)
+
+        self.assertTrue(all(name in bloom for name in names))
+        self.assertLessEqual(len(bloom), 1000)
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(10000, error_rate=0.01)
+        for index in range(10000):
+            bloom.add(f'user{index}')
+
+        false = sum(f'other{_}' in bloom for _ in range(10000))
+        self.assertLess(false, 300)
+        self.assertLess(len(bloom.bits), 10000 * 10 // 8 + 100)
+
+    def test_add_reports_new(self):
+        bloom = BloomFilter(100)
+        self.assertTrue(bloom.add('bob'))
+        self.assertFalse(bloom.add('bob'))
+
+
+class TestVisitedSet(unittest.TestCase):
+
+    def test_ids_and_names(self):
+        visited = VisitedSet(capacity=1000)
+        self.assertTrue(visited.add(12345))
+        self.assertTrue(visited.add('HeySamTexas'))
+        self.assertFalse(visited.add('heysamtexas'))
+
+        self.assertIn(12345, visited)
+        self.assertIn('HEYSAMTEXAS', visited)
+        self.assertNotIn(12346, visited)
+        self.assertNotIn('jack', visited)
+        self.assertEqual(len(visited), 2)
+
+    def test_save_and_load(self):
+        visited = VisitedSet(capacity=1000)
+        visited.add(1 << 40)
+        visited.add('bob')
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'visited.bin')
+            visited.save(path)
+            loaded = VisitedSet.load(path)
+
+            self.assertIn(1 << 40, loaded)
+            self.assertIn('bob', loaded)
+            self.assertNotIn('alice', loaded)
+            self.assertEqual(os.listdir(tmpdir), ['visited.bin'])
+
+    def test_load_rejects_other_files(self):
+        with tempfile.NamedTemporaryFile() as junk:
+            junk.write(b'junk')
+            junk.flush()
+            with self.assertRaises(TwitterAPIClientException):
+                VisitedSet.load(junk.name)
+
+    def test_frontier_dedupe(self):
+        frontier = Frontier(visited=VisitedSet(capacity=1000))
+        self.assertTrue(frontier.push('Bob'))
+        self.assertFalse(frontier.push('bob'))
+        self.assertEqual(len(frontier), 1)
+
+    def test_frontier_survives_false_positives(self):
+        visited = VisitedSet(capacity=1000)
+        # Every name is a false positive.
+        visited.names.bits = bytearray(b'\xff' * len(visited.names.bits))
+        frontier = Frontier(visited=visited)
+
+        self.assertTrue(frontier.push('seed'))
+        self.assertFalse(frontier.push('SEED'))
+        for user_id in range(1, 101):
+            user = {'id': user_id, 'screen_name': f'user{user_id}'}
+            self.assertTrue(frontier.push(f'user{user_id}', 1, user))
+        self.assertFalse(frontier.push('renamed', 1, {'id': 7}))
+        self.assertFalse(frontier.push('seed', 1, {'id': 1000}))
+
+        self.assertEqual(len(frontier), 101)
+        self.assertEqual(len(visited.ids), 100)
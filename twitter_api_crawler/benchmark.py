@@ -0,0 +1,210 @@
+"""
+End-to-end crawl throughput benchmark.
+
+Runs `TwitterAPIv1Crawler` against the local mock server and reports pages/s,
+users/s, key utilization, 429s, page latency percentiles and peak RSS as JSON
+so capacity can be tracked from release to release::
+
+    python -m twitter_api_crawler.benchmark --keys 8 --targets 50 --users 20000
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from typing import Dict, List
+
+from twitter_api_crawler import __version__
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import (
+    Twitter429Exception,
+    Twitter503Exception,
+    TwitterNoAvailableAPIs,
+)
+from twitter_api_crawler.metrics import NULL_METRICS, MetricsSink
+from twitter_api_crawler.mock_server import (
+    MockTwitterAPI,
+    MockTwitterServer,
+    SyntheticGraph,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+_RETRY_429 = {'reason': '429'}
+_RETRY_503 = {'reason': '503'}
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile, 0.0 for an empty sample."""
+    if not samples:
+        return 0.0
+
+    ordered = sorted(samples)
+    rank = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def peak_rss_kb() -> int:
+    """Peak resident set size of this process in KiB, 0 if unknown."""
+    if resource is None:
+        return 0
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return peak // 1024  # macOS reports bytes
+
+    return peak
+
+
+def run_benchmark(
+    keys: int = 4,
+    targets: int = 20,
+    users: int = 2000,
+    mean_following: int = 50,
+    window: float = 2.0,
+    page_limit: int = 15,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = 0,
+    metrics: MetricsSink = NULL_METRICS,
+) -> Dict:
+    """
+    Crawl the following lists of the largest accounts of a synthetic graph.
+
+    Args
+        keys: Number of API keys in the crawler pool
+        targets: Number of accounts to crawl, the largest ones first
+        users: Number of accounts in the synthetic graph
+        mean_following: Rough average out-degree of the graph
+        window: Rate-limit window of the mock server in seconds
+        page_limit: Requests allowed per key and window on friends/list
+        latency: Seconds of latency the mock server adds to each response
+        error_rate: Probability of the mock server answering with a 503
+        seed: Seed for the graph and fault injection
+        metrics: Sink the crawler reports to during the run
+
+    Returns
+        A dict of the parameters and the measured results
+    """
+    params = dict(locals())
+    params.pop('metrics')
+    graph = SyntheticGraph(users, mean_following, seed)
+    mock_api = MockTwitterAPI(
+        graph=graph,
+        rate_limits={'friends/list': page_limit},
+        window=window,
+        latency=latency,
+        error_rate=error_rate,
+        seed=seed,
+    )
+
+    largest = sorted(graph.ids(), key=lambda _: -len(graph.following[_]))
+    usernames = [graph.screen_name(_) for _ in largest[:targets]]
+
+    with MockTwitterServer(mock_api) as server:
+        crawler = TwitterAPIv1Crawler(sleep_period=window, metrics=metrics)
+        for index in range(keys):
+            crawler.create_api(
+                key=f'key{index}',
+                api_key=f'key{index}',
+                api_key_secret='benchmark',
+                access_token='benchmark',
+                access_token_secret='benchmark',
+                base_url=server.base_url,
+            )
+
+        started = time.perf_counter()
+        results = _crawl(crawler, usernames)
+        elapsed = time.perf_counter() - started
+
+    key_requests = {
+        key: mock_api.stats[('requests', key, 'friends/list')]
+        for key in crawler.apis
+    }
+    quota = keys * page_limit * max(elapsed / window, 1)
+    latencies = results.pop('latencies')
+
+    return {
+        'version': __version__,
+        'params': params,
+        'elapsed': elapsed,
+        'pages_per_second': results['pages'] / elapsed,
+        'users_per_second': results['users'] / elapsed,
+        'key_requests': key_requests,
+        'key_utilization': min(results['pages'] / quota, 1.0),
+        'p50_page_latency': percentile(latencies, 50),
+        'p99_page_latency': percentile(latencies, 99),
+        'peak_rss_kb': peak_rss_kb(),
+        **results,
+    }
+
+
+def _crawl(crawler: TwitterAPIv1Crawler, usernames: List[str]) -> Dict:
+    results: Dict = {
+        'pages': 0,
+        'users': 0,
+        'rate_limited': 0,
+        'errors': 0,
+        'latencies': [],
+    }
+
+    for username in usernames:
+        cursor = -1
+        completed = False
+
+        while not completed:
+            started = time.perf_counter()
+            try:
+                following = crawler.get_following(username, cursor)
+            except Twitter429Exception:
+                results['rate_limited'] += 1
+                crawler.metrics.increment('retries_total', labels=_RETRY_429)
+                continue
+            except TwitterNoAvailableAPIs:
+                time.sleep(crawler.seconds_until_available())
+                continue
+            except Twitter503Exception:
+                results['errors'] += 1
+                crawler.metrics.increment('retries_total', labels=_RETRY_503)
+                continue
+
+            results['latencies'].append(time.perf_counter() - started)
+            results['pages'] += 1
+            results['users'] += len(following['users'])
+            cursor = following['cursor']
+            completed = following['completed']
+
+    return results
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--keys', type=int, default=4)
+    parser.add_argument('--targets', type=int, default=20)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--mean-following', type=int, default=50)
+    parser.add_argument('--window', type=float, default=2.0)
+    parser.add_argument('--page-limit', type=int, default=15)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--output',
+        type=argparse.FileType('w'),
+        default=sys.stdout,
+        help='Write the JSON results here instead of stdout',
+    )
+    args = vars(parser.parse_args(argv))
+    output = args.pop('output')
+
+    json.dump(run_benchmark(**args), output, indent=2)
+    output.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Record a crawl's HTTP traffic and replay it offline.
+
+`RecordingTransport` wraps a transport and appends every request and
+response it carries (status, headers, body and timing) to a cassette, one
+JSON line each, gzip compressed when the path ends in `.gz`.
+`ReplayTransport` answers from the cassette instead of the API, at full
+speed or with the recorded latencies, so decode, enrichment and sink stages
+can be benchmarked on real payloads and re-run without spending quota::
+
+    recorder = RecordingTransport('crawl.ndjson.gz')
+    crawler.create_api('key1', ..., transport=recorder)
+    crawler.crawl('jack', sink)
+    recorder.close()
+
+    replay = ReplayTransport('crawl.ndjson.gz')
+    crawler.create_api('key1', ..., transport=replay)
+    crawler.crawl('jack', sink)
+
+Requests are matched on method, URL path, params and data, never on the
+host or credentials, so a cassette recorded against the API replays behind
+any base_url. Repeated requests get their responses back in the recorded
+order, eg. a HTTP 429 followed by the retried page.
+"""
+import base64
+import gzip
+import json
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+from twitter_api_crawler.transport import RequestsTransport, Transport
+
+
+def _open(path: str, mode: str):
+    opener = gzip.open if path.endswith('.gz') else open
+    return opener(path, mode)
+
+
+def _request_key(
+    method: str,
+    url: str,
+    params: Dict = None,
+    data: Dict = None,
+) -> Tuple[str, str, str, str]:
+    return (
+        method.lower(),
+        urlsplit(url).path,
+        json.dumps(params or {}, sort_keys=True, default=str),
+        json.dumps(data or {}, sort_keys=True, default=str),
+    )
+
+
+class RecordingTransport(Transport):
+
+    def __init__(self, path: str, transport: Transport = None):
+        """
+        Send requests through a transport and record them to a cassette.
+
+        Arguments:
+            path: Cassette file, appended to, gzipped if it ends in `.gz`
+            transport: Transport sending the requests, a RequestsTransport
+            by default
+        """
+        self.path = path
+        self.transport = transport or RequestsTransport()
+        self.entries = 0
+        self._file = _open(path, 'ab')
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        auth=None,
+        params: Dict = None,
+        data: Dict = None,
+    ):
+        sent = time.monotonic()
+        response = self.transport.send(method, url, auth, params, data)
+        elapsed = time.monotonic() - sent
+
+        entry = {
+            'method': method.lower(),
+            'url': url,
+            'params': params or {},
+            'data': data or {},
+            'offset': sent - self._started,
+            'elapsed': elapsed,
+            'status': response.status_code,
+            'headers': dict(response.headers),
+            'body': base64.b64encode(response.content).decode(),
+        }
+        line = (json.dumps(entry, default=str) + '\n').encode()
+
+        with self._lock:
+            self._file.write(line)
+            self.entries += 1
+
+        return response
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+
+    def __init__(self, path: str, original_timing: bool = False):
+        """
+        Answer requests from a cassette written by RecordingTransport.
+
+        Arguments:
+            path: Cassette file
+            original_timing: Wait as long as the recorded request took
+            before answering, otherwise answer at once
+        """
+        self.path = path
+        self.original_timing = original_timing
+        self._recorded: Dict[Tuple[str, str, str, str], list] = {}
+        self._queues: Dict[Tuple[str, str, str, str], Deque[Dict]] = {}
+        self._lock = threading.Lock()
+
+        with _open(path, 'rb') as cassette:
+            for line in cassette:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = _request_key(
+                    entry['method'],
+                    entry['url'],
+                    entry['params'],
+                    entry['data'],
+                )
+                self._recorded.setdefault(key, []).append(entry)
+
+        self.rewind()
+
+    def rewind(self) -> None:
+        """Serve the cassette again from its first response."""
+        with self._lock:
+            self._queues = {
+                key: deque(entries) for key, entries in self._recorded.items()
+            }
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        auth=None,
+        params: Dict = None,
+        data: Dict = None,
+    ) -> requests.Response:
+        """
+        Return the next recorded response to the request.
+
+        Raises:
+            TwitterAPIClientException: when the cassette holds no (more)
+            responses for the request
+        """
+        key = _request_key(method, url, params, data)
+
+        with self._lock:
+            queue = self._queues.get(key)
+            entry = queue.popleft() if queue else None
+
+        if entry is None:
+            raise TwitterAPIClientException(
+                f'No recorded response for {method.upper()} {url} {params}',
+            )
+
+        if self.original_timing:
+            time.sleep(entry['elapsed'])
+
+        response = requests.Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = base64.b64decode(entry['body'])
+        response.encoding = 'utf-8'
+        response.url = requests.Request(
+            entry['method'].upper(),
+            entry['url'],
+            params=entry['params'],
+        ).prepare().url
+        return response
@@ -0,0 +1,373 @@
+"""
+Crawl the accounts listed in a file or on stdin to NDJSON files.
+
+    twitter-api-crawler following --keys keys.json --input users.txt \\
+        --output crawl/ --checkpoint crawl.json
+
+Modes: `following` and `followers` paginate the follow lists of every
+account through a `Pipeline`, `lookup` fetches the user objects themselves,
+100 per request. The key file is a JSON object naming every credential::
+
+    {
+        "key1": {"api_key": "...", "api_key_secret": "...",
+                 "access_token": "...", "access_token_secret": "..."},
+        "key1:app": {"bearer_token": "..."},
+        "key2:app": {"api_key": "...", "api_key_secret": "...",
+                     "app_only": true}
+    }
+
+Entries with a bearer token, or flagged app_only, become app-only clients.
+The checkpoint file holds the cursor of every account per mode, accounts
+done have cursor 0 and are skipped on the next run of that mode, so an
+interrupted crawl resumes where it stopped. Modes can share one file. The
+output file is published before every save, so with a checkpoint files
+rotate at least every `--checkpoint-every` seconds.
+
+With `--api-version 2` the follow lists come from the v2 API, 1000 users a
+page, after the ids of the accounts are looked up. The run summary is
+printed as JSON.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List
+
+from twitter_api_crawler.api import API_BASE_URL
+from twitter_api_crawler.concurrency import AIMDController
+from twitter_api_crawler.crawler import (
+    API_VERSIONS,
+    KEY_STRATEGIES,
+    USERS_LOOKUP_SIZE,
+    TwitterAPIv1Crawler,
+)
+from twitter_api_crawler.exceptions import (
+    TwitterAPIClientException,
+    TwitterNoAvailableAPIs,
+)
+from twitter_api_crawler.pipeline import DEFAULT_ENRICHERS, Pipeline
+from twitter_api_crawler.sinks import NDJSONSink, Sink
+from twitter_api_crawler.transport import HTTP2Transport, RequestsTransport
+
+MODES = ('following', 'followers', 'lookup')
+CHECKPOINT_EVERY = 30.0
+
+USER_CREDENTIALS = (
+    'api_key',
+    'api_key_secret',
+    'access_token',
+    'access_token_secret',
+)
+
+
+def load_keys(
+    crawler: TwitterAPIv1Crawler,
+    path: str,
+    base_url: str = API_BASE_URL,
+    transport=None,
+    lean: bool = False,
+) -> None:
+    """
+    Add the API clients described by a key file to a crawler.
+
+    Raises:
+        TwitterAPIClientException: for an empty file or missing credentials
+    """
+    with open(path) as key_file:
+        keys = json.load(key_file)
+
+    if not keys:
+        raise TwitterAPIClientException(f'No keys in {path}')
+
+    for name, credentials in keys.items():
+        if 'bearer_token' in credentials or credentials.get('app_only'):
+            crawler.create_app_api(
+                name,
+                api_key=credentials.get('api_key'),
+                api_key_secret=credentials.get('api_key_secret'),
+                bearer_token=credentials.get('bearer_token'),
+                base_url=base_url,
+                transport=transport,
+                lean=lean,
+            )
+            continue
+
+        missing = [_ for _ in USER_CREDENTIALS if not credentials.get(_)]
+        if missing:
+            raise TwitterAPIClientException(
+                f'Key {name} is missing {", ".join(missing)}',
+            )
+
+        crawler.create_api(
+            name,
+            *(credentials[_] for _ in USER_CREDENTIALS),
+            base_url=base_url,
+            transport=transport,
+            lean=lean,
+        )
+
+
+def read_usernames(lines: Iterable[str]) -> List[str]:
+    """Return the usernames of a file, one per line, without duplicates."""
+    usernames = (line.strip().lstrip('@') for line in lines)
+    return list(dict.fromkeys(_ for _ in usernames if _))
+
+
+def _read_checkpoint(path: str) -> Dict:
+    if path and os.path.exists(path):
+        with open(path) as checkpoint:
+            return json.load(checkpoint)
+    return {'cursors': {}}
+
+
+def load_checkpoint(
+    crawler: TwitterAPIv1Crawler,
+    path: str,
+    mode: str,
+) -> None:
+    """Restore the cursors a previous run of the mode saved."""
+    crawler.cursors.update(_read_checkpoint(path)['cursors'].get(mode, {}))
+
+
+def save_checkpoint(
+    crawler: TwitterAPIv1Crawler,
+    path: str,
+    mode: str,
+    sink: Sink = None,
+) -> None:
+    """
+    Write the cursors of the mode, keeping the other modes' cursors.
+
+    The file is replaced atomically, a crash never leaves half a file.
+
+    Arguments:
+        sink: Where the pages behind the cursors were written, published
+        after the cursors are copied so every saved cursor points at
+        records consumers can see
+    """
+    if not path:
+        return
+
+    cursors = dict(crawler.cursors)
+    if sink is not None:
+        sink.publish()
+
+    checkpoint = _read_checkpoint(path)
+    checkpoint['cursors'][mode] = cursors
+
+    part = f'{path}.part'
+    with open(part, 'w') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(part, path)
+
+
+def lookup(
+    crawler: TwitterAPIv1Crawler,
+    usernames: List[str],
+    sink: Sink,
+    workers: int = 1,
+) -> Dict:
+    """
+    Write the user objects of the usernames to a sink, 100 per request.
+
+    Chunks run on up to `workers` threads. When every key sleeps a chunk
+    waits for the first to wake up. Looked up accounts get cursor 0.
+
+    Returns
+        Counts of accounts, users found and elapsed seconds
+    """
+    started = time.perf_counter()
+    chunks = [
+        usernames[start:start + USERS_LOOKUP_SIZE]
+        for start in range(0, len(usernames), USERS_LOOKUP_SIZE)
+    ]
+    lock = threading.Lock()
+    stats = {'accounts': 0, 'users': 0}
+
+    def run(chunk: List[str]) -> None:
+        users = _wait_for_keys(crawler, crawler.lookup_users, chunk)
+        with lock:
+            sink.write(users)
+            for username in chunk:
+                crawler.set_cursor(username, 0)
+            stats['accounts'] += len(chunk)
+            stats['users'] += len(users)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in executor.map(run, chunks):
+            pass
+
+    sink.flush()
+    return {**stats, 'elapsed': time.perf_counter() - started}
+
+
+def _wait_for_keys(crawler: TwitterAPIv1Crawler, call: Callable, *args):
+    """Call, waiting for a key to wake up whenever every key sleeps."""
+    while True:
+        try:
+            return call(*args)
+        except TwitterNoAvailableAPIs:
+            time.sleep(crawler.seconds_until_available())
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog='twitter-api-crawler',
+        description=__doc__.split('\n')[1],
+    )
+    parser.add_argument('mode', choices=MODES)
+    parser.add_argument('--keys', required=True, help='JSON key file')
+    parser.add_argument(
+        '--input',
+        type=argparse.FileType('r'),
+        default=sys.stdin,
+        help='Usernames, one per line, stdin by default',
+    )
+    parser.add_argument('--output', required=True, help='NDJSON directory')
+    parser.add_argument('--prefix', default='crawl')
+    parser.add_argument('--no-compress', action='store_true')
+    parser.add_argument('--checkpoint', help='JSON file of the cursors')
+    parser.add_argument(
+        '--checkpoint-every',
+        type=float,
+        default=CHECKPOINT_EVERY,
+        help='Seconds between checkpoint saves',
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=4,
+        help='Accounts (or lookup chunks) crawled concurrently',
+    )
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        help='Adapt the requests in flight up to this limit (AIMD)',
+    )
+    parser.add_argument(
+        '--lean',
+        action='store_true',
+        help='Leave the latest tweet and entities out of user objects',
+    )
+    parser.add_argument(
+        '--enrich',
+        action='store_true',
+        help='Add urls, mentions, hashtags and ENS domains to every user',
+    )
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help='Cache requests, not with --http2',
+    )
+    parser.add_argument('--http2', action='store_true', help='Use HTTP/2')
+    parser.add_argument(
+        '--key-strategy',
+        choices=KEY_STRATEGIES,
+        default='round_robin',
+    )
+    parser.add_argument(
+        '--api-version',
+        type=int,
+        choices=API_VERSIONS,
+        default=1,
+        help='v2 pages hold 1000 users',
+    )
+    parser.add_argument('--sleep-period', type=int, default=15 * 60)
+    parser.add_argument('--base-url', default=API_BASE_URL)
+    parser.add_argument('-v', '--verbose', action='store_true')
+    args = parser.parse_args(argv)
+    if args.cache and args.http2:
+        parser.error('--cache needs the requests transport, drop --http2')
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s %(levelname)s %(name)s: %(message)s',
+    )
+
+    if args.http2:
+        transport = HTTP2Transport()
+    else:
+        transport = RequestsTransport(cache_requests=args.cache)
+
+    crawler = TwitterAPIv1Crawler(
+        sleep_period=args.sleep_period,
+        key_strategy=args.key_strategy,
+        api_version=args.api_version,
+    )
+    load_keys(crawler, args.keys, args.base_url, transport, args.lean)
+    load_checkpoint(crawler, args.checkpoint, args.mode)
+
+    usernames = [
+        username for username in read_usernames(args.input)
+        if crawler.get_cursor(username) != 0
+    ]
+    sink = NDJSONSink(
+        args.output,
+        prefix=args.prefix,
+        compress=not args.no_compress,
+    )
+
+    stop = threading.Event()
+    saver = threading.Thread(
+        target=_save_periodically,
+        args=(
+            crawler,
+            args.checkpoint,
+            args.mode,
+            sink,
+            args.checkpoint_every,
+            stop,
+        ),
+        daemon=True,
+    )
+    saver.start()
+
+    try:
+        if args.mode == 'lookup':
+            stats = lookup(crawler, usernames, sink, args.workers)
+        else:
+            if args.api_version == 2:
+                # The v2 lists need ids, resolve them 100 per request.
+                _wait_for_keys(crawler, crawler.lookup_users, usernames)
+
+            concurrency = None
+            if args.max_concurrency:
+                concurrency = AIMDController(maximum=args.max_concurrency)
+
+            stats = Pipeline(
+                crawler,
+                sink,
+                relationship=args.mode,
+                enrichers=DEFAULT_ENRICHERS if args.enrich else {},
+                fetch_workers=args.workers,
+                concurrency=concurrency,
+            ).run(usernames)
+    finally:
+        stop.set()
+        saver.join()
+        sink.close()
+        transport.close()
+        save_checkpoint(crawler, args.checkpoint, args.mode)
+
+    json.dump({**stats, 'files': sink.paths}, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+
+
+def _save_periodically(
+    crawler: TwitterAPIv1Crawler,
+    path: str,
+    mode: str,
+    sink: Sink,
+    every: float,
+    stop: threading.Event,
+) -> None:
+    while not stop.wait(every):
+        save_checkpoint(crawler, path, mode, sink)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Adaptive limit on the requests in flight (AIMD).
+
+`AIMDController` works like a semaphore whose size follows the health of
+the API: while responses are fast and successful the limit grows by one
+per round of requests (additive increase), on 5xx and 429 responses,
+connection errors, slow responses or a nearly spent quota it is cut in
+half (multiplicative decrease). Attach it to a crawler to feed it every
+response, the quota then counts what is left across the crawler's awake
+keys, and wrap the requests in `slot()`::
+
+    controller = AIMDController(maximum=16)
+    controller.attach(crawler)
+    with controller.slot():
+        crawler.get_followers('jack')
+
+`Pipeline(concurrency=controller)` does both for its fetch stage.
+"""
+import threading
+import time
+from typing import Dict, Optional
+
+from twitter_api_crawler.metrics import NULL_METRICS, MetricsSink
+
+
+class _Slot(object):
+
+    def __init__(self, controller: 'AIMDController'):
+        self.controller = controller
+
+    def __enter__(self) -> None:
+        self.controller.acquire()
+
+    def __exit__(self, *exc_info) -> None:
+        self.controller.release()
+
+
+class AIMDController(object):
+
+    def __init__(
+        self,
+        initial: int = 2,
+        minimum: int = 1,
+        maximum: int = 32,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_target: Optional[float] = None,
+        cooldown: float = 1.0,
+        metrics: MetricsSink = NULL_METRICS,
+    ):
+        """
+        Limit the requests in flight, adapting to the API responses.
+
+        Arguments:
+            initial: Starting limit
+            minimum: The limit never drops below this
+            maximum: The limit never grows above this
+            increase: Growth per round of `limit` healthy responses
+            decrease: Factor applied to the limit on distress
+            latency_target: Responses slower than this many seconds count
+            as distress, None to ignore latency
+            cooldown: Seconds after a decrease during which further
+            distress is ignored, so one burst of errors cuts the limit once
+            metrics: Sink receiving the `concurrency_limit` gauge
+        """
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self.metrics = metrics
+
+        self.in_flight = 0
+        self.decreased_at = 0.0
+        self.crawler = None
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Wait until a request may be sent."""
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def slot(self) -> _Slot:
+        """Hold a request slot for the duration of a with block."""
+        return _Slot(self)
+
+    def attach(self, crawler) -> None:
+        """Observe every response of a crawler's API clients."""
+        self.crawler = crawler
+        crawler.add_hook('after_response', self.observe)
+        # on_error also follows after_response for HTTP errors, count
+        # those once, only connection errors come through here alone.
+        crawler.add_hook('on_error', self._observe_exception)
+
+    def observe(self, info: Dict) -> None:
+        """
+        Adjust the limit to a response, a request hook callback.
+
+        Arguments:
+            info: The hook info dict, with status, elapsed and headers, or
+            exception for connection errors
+        """
+        if self.distressed(info):
+            self.back_off()
+        else:
+            self.grow()
+
+    def _observe_exception(self, info: Dict) -> None:
+        if 'exception' in info:
+            self.observe(info)
+
+    def distressed(self, info: Dict) -> bool:
+        status = info.get('status')
+        if info.get('exception') is not None or status is None:
+            return True
+
+        if status >= 500 or status == 429:
+            return True
+
+        elapsed = info.get('elapsed')
+        if self.latency_target and elapsed and elapsed > self.latency_target:
+            return True
+
+        # Fewer requests left in the window than we would send at once.
+        remaining = self.remaining(info)
+        return remaining is not None and remaining < int(self.limit)
+
+    def remaining(self, info: Dict) -> Optional[int]:
+        """
+        Return the requests left in the window of the response's endpoint.
+
+        Without an attached crawler that is the quota of the responding key,
+        otherwise the sum over the awake keys of its pool.
+
+        Returns
+            The number of requests, None when a key has not reported its
+            quota yet and so has a whole window left
+        """
+        headers = info.get('headers') or {}
+        remaining = headers.get('x-rate-limit-remaining')
+        if remaining is None or self.crawler is None:
+            return None if remaining is None else int(remaining)
+
+        endpoint = info.get('endpoint')
+        pool = self.crawler.apis
+        if info.get('key_id') in {
+            api.key_id for api in self.crawler.v2_apis.values()
+        }:
+            pool = self.crawler.v2_apis
+
+        total = 0
+        now = time.time()
+        for api in list(pool.values()):
+            if api.is_asleep() or not api.supports(endpoint):
+                continue
+
+            quota = api.rate_limits.get(endpoint)
+            if not quota or quota['reset'] < now:
+                return None
+            total += quota['remaining']
+
+        return total
+
+    def grow(self) -> None:
+        with self._condition:
+            limit = self.limit + self.increase / max(self.limit, 1)
+            self._set(min(limit, self.maximum))
+
+    def back_off(self) -> None:
+        now = time.monotonic()
+        with self._condition:
+            if now - self.decreased_at < self.cooldown:
+                return
+            self.decreased_at = now
+            self._set(max(self.limit * self.decrease, self.minimum))
+
+    def _set(self, limit: float) -> None:
+        self.limit = limit
+        self._condition.notify_all()
+        if self.metrics.enabled:
+            self.metrics.gauge('concurrency_limit', int(limit))
@@ -0,0 +1,767 @@
+"""
+Share the crawl frontier and the key pool between many crawler processes.
+
+A coordinator holds the usernames left to crawl with their cursors and leases
+them, as well as API keys, to workers for a limited time. Workers renew their
+leases with heartbeats, leases of dead workers expire and their work is picked
+up where it stopped by whichever worker asks next.
+
+`SQLiteCoordinator` works for processes on one host (or a shared filesystem
+that honours file locks), `RedisCoordinator` for a fleet of hosts.
+"""
+import abc
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import (
+    Twitter404Exception,
+    Twitter429Exception,
+    Twitter503Exception,
+    TwitterAPIClientException,
+)
+from twitter_api_crawler.sqlite_utils import Transaction, connect
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL = 60
+POLL_INTERVAL = 1.0
+
+# The work item scripts all take KEYS pending (list), leases (zset of
+# expiry times), owners (hash), cursors (hash) and done (set).
+ADD_WORK_SCRIPT = '''
+local added = 0
+for _, item in ipairs(ARGV) do
+    if redis.call('hsetnx', KEYS[4], item, -1) == 1 then
+        redis.call('rpush', KEYS[1], item)
+        added = added + 1
+    end
+end
+return added
+'''
+
+# ARGV: worker_id, now, expires. Expired leases go back to pending first.
+LEASE_WORK_SCRIPT = '''
+local expired = redis.call('zrangebyscore', KEYS[2], '-inf', ARGV[2])
+for _, item in ipairs(expired) do
+    redis.call('zrem', KEYS[2], item)
+    redis.call('hdel', KEYS[3], item)
+    redis.call('rpush', KEYS[1], item)
+end
+local item = redis.call('lpop', KEYS[1])
+if not item then
+    return false
+end
+redis.call('zadd', KEYS[2], ARGV[3], item)
+redis.call('hset', KEYS[3], item, ARGV[1])
+return {item, redis.call('hget', KEYS[4], item)}
+'''
+
+# ARGV: item, worker_id, cursor, expires
+UPDATE_CURSOR_SCRIPT = '''
+if redis.call('hget', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('hset', KEYS[4], ARGV[1], ARGV[3])
+redis.call('zadd', KEYS[2], ARGV[4], ARGV[1])
+return 1
+'''
+
+# ARGV: item, worker_id
+COMPLETE_WORK_SCRIPT = '''
+if redis.call('hget', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('zrem', KEYS[2], ARGV[1])
+redis.call('hdel', KEYS[3], ARGV[1])
+redis.call('sadd', KEYS[5], ARGV[1])
+return 1
+'''
+
+# ARGV: item, worker_id
+RELEASE_WORK_SCRIPT = '''
+if redis.call('hget', KEYS[3], ARGV[1]) ~= ARGV[2] then
+    return 0
+end
+redis.call('zrem', KEYS[2], ARGV[1])
+redis.call('hdel', KEYS[3], ARGV[1])
+redis.call('rpush', KEYS[1], ARGV[1])
+return 1
+'''
+
+# ARGV: worker_id, expires
+HEARTBEAT_SCRIPT = '''
+local owners = redis.call('hgetall', KEYS[3])
+for i = 1, #owners, 2 do
+    if owners[i + 1] == ARGV[1] then
+        redis.call('zadd', KEYS[2], 'XX', ARGV[2], owners[i])
+    end
+end
+return 1
+'''
+
+# KEYS: worker keys, then the lease and sleep keys of every candidate key.
+# ARGV: worker_id, ttl ms, then the candidate keys.
+LEASE_KEY_SCRIPT = '''
+for i = 3, #ARGV do
+    local lease = KEYS[2 * i - 4]
+    local sleep = KEYS[2 * i - 3]
+    if redis.call('exists', sleep) == 0
+        and redis.call('set', lease, ARGV[1], 'nx', 'px', ARGV[2]) then
+        redis.call('sadd', KEYS[1], ARGV[i])
+        return ARGV[i]
+    end
+end
+return false
+'''
+
+# The other key lease scripts take KEYS key lease, key sleep and worker keys.
+# ARGV: worker_id, ttl ms, key
+RENEW_KEY_SCRIPT = '''
+local owner = redis.call('get', KEYS[1])
+if owner ~= ARGV[1] then
+    if owner or redis.call('exists', KEYS[2]) == 1 then
+        return 0
+    end
+end
+redis.call('set', KEYS[1], ARGV[1], 'px', ARGV[2])
+redis.call('sadd', KEYS[3], ARGV[3])
+return 1
+'''
+
+# ARGV: worker_id, sleep ms, key
+RELEASE_KEY_SCRIPT = '''
+if tonumber(ARGV[2]) > 0 then
+    redis.call('set', KEYS[2], 1, 'px', ARGV[2])
+end
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('del', KEYS[1])
+end
+redis.call('srem', KEYS[3], ARGV[3])
+return 1
+'''
+
+
+class Coordinator(abc.ABC):
+    """Interface shared by the coordinator backends."""
+
+    @abc.abstractmethod
+    def add_work(
+        self,
+        usernames: Iterable[str],
+        relationship: str = 'following',
+    ) -> int:
+        """
+        Add usernames to the frontier, known ones are left untouched.
+
+        Returns
+            The number of new work items
+        """
+
+    @abc.abstractmethod
+    def lease_work(self, worker_id: str, ttl: float = LEASE_TTL):
+        """
+        Lease the next pending (or abandoned) work item to a worker.
+
+        Returns
+            A dict of username, relationship and cursor or None
+        """
+
+    @abc.abstractmethod
+    def update_cursor(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+        cursor: int,
+        ttl: float = LEASE_TTL,
+    ) -> None:
+        """Checkpoint the cursor of a leased item and renew its lease."""
+
+    @abc.abstractmethod
+    def complete_work(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+    ) -> None:
+        """Mark a leased item as done."""
+
+    @abc.abstractmethod
+    def release_work(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+    ) -> None:
+        """Hand a leased item back to the frontier unfinished."""
+
+    @abc.abstractmethod
+    def lease_key(
+        self,
+        worker_id: str,
+        keys: List[str],
+        ttl: float = LEASE_TTL,
+    ) -> Optional[str]:
+        """
+        Lease one of keys that is neither leased nor asleep.
+
+        Returns
+            The key or None when all of them are busy
+        """
+
+    @abc.abstractmethod
+    def renew_key(
+        self,
+        worker_id: str,
+        key: str,
+        ttl: float = LEASE_TTL,
+    ) -> bool:
+        """
+        Extend the worker's lease on a key, or lease it again once expired.
+
+        Returns
+            False when another worker holds the key or it is asleep
+        """
+
+    @abc.abstractmethod
+    def release_key(
+        self,
+        worker_id: str,
+        key: str,
+        sleep_seconds: float = 0,
+    ) -> None:
+        """Hand a key back, optionally asleep for sleep_seconds."""
+
+    @abc.abstractmethod
+    def heartbeat(self, worker_id: str, ttl: float = LEASE_TTL) -> None:
+        """Renew every lease held by the worker."""
+
+    @abc.abstractmethod
+    def pending(self) -> int:
+        """Return the number of items that are not completed yet."""
+
+
+class SQLiteCoordinator(Coordinator):
+
+    def __init__(self, path: str, timeout: float = 30):
+        """
+        Coordinate workers through a SQLite database in WAL mode.
+
+        Every lease is taken inside a `BEGIN IMMEDIATE` transaction so the
+        database file lock makes it atomic across processes.
+
+        Arguments:
+            path: Database file shared by the workers
+            timeout: Seconds to wait for the database lock
+        """
+        self.connection = connect(path, timeout)
+        self._lock = threading.Lock()
+        self.connection.executescript(
+            '''
+            CREATE TABLE IF NOT EXISTS work (
+                username TEXT NOT NULL,
+                relationship TEXT NOT NULL,
+                cursor INTEGER NOT NULL DEFAULT -1,
+                done INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                expires REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (username, relationship)
+            );
+            CREATE TABLE IF NOT EXISTS keys (
+                key TEXT PRIMARY KEY,
+                worker TEXT,
+                expires REAL NOT NULL DEFAULT 0,
+                sleep_until REAL NOT NULL DEFAULT 0
+            );
+            ''',
+        )
+
+    def add_work(
+        self,
+        usernames: Iterable[str],
+        relationship: str = 'following',
+    ) -> int:
+        rows = [(username, relationship) for username in usernames]
+        with self._transaction() as cursor:
+            before = self.connection.total_changes
+            cursor.executemany(
+                'INSERT OR IGNORE INTO work (username, relationship) '
+                + 'VALUES (?, ?)',
+                rows,
+            )
+            return self.connection.total_changes - before
+
+    def lease_work(self, worker_id: str, ttl: float = LEASE_TTL):
+        now = time.time()
+        with self._transaction() as cursor:
+            row = cursor.execute(
+                'SELECT username, relationship, cursor FROM work '
+                + 'WHERE done = 0 AND (worker IS NULL OR expires < ?) '
+                + 'ORDER BY rowid LIMIT 1',
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            cursor.execute(
+                'UPDATE work SET worker = ?, expires = ? '
+                + 'WHERE username = ? AND relationship = ?',
+                (worker_id, now + ttl, row[0], row[1]),
+            )
+
+        return {'username': row[0], 'relationship': row[1], 'cursor': row[2]}
+
+    def update_cursor(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+        cursor: int,
+        ttl: float = LEASE_TTL,
+    ) -> None:
+        self._update_work(
+            'cursor = ?, expires = ?',
+            (cursor, time.time() + ttl),
+            worker_id,
+            username,
+            relationship,
+        )
+
+    def complete_work(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+    ) -> None:
+        self._update_work(
+            'done = 1, worker = NULL',
+            (),
+            worker_id,
+            username,
+            relationship,
+        )
+
+    def release_work(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+    ) -> None:
+        self._update_work(
+            'worker = NULL, expires = 0',
+            (),
+            worker_id,
+            username,
+            relationship,
+        )
+
+    def lease_key(
+        self,
+        worker_id: str,
+        keys: List[str],
+        ttl: float = LEASE_TTL,
+    ) -> Optional[str]:
+        now = time.time()
+        with self._transaction() as cursor:
+            cursor.executemany(
+                'INSERT OR IGNORE INTO keys (key) VALUES (?)',
+                [(key,) for key in keys],
+            )
+            placeholders = ','.join('?' * len(keys))
+            row = cursor.execute(
+                'SELECT key FROM keys '
+                + f'WHERE key IN ({placeholders}) AND sleep_until <= ? '
+                + 'AND (worker IS NULL OR expires < ?) '
+                + 'ORDER BY sleep_until, key LIMIT 1',
+                (*keys, now, now),
+            ).fetchone()
+            if row is None:
+                return None
+
+            cursor.execute(
+                'UPDATE keys SET worker = ?, expires = ? WHERE key = ?',
+                (worker_id, now + ttl, row[0]),
+            )
+
+        return row[0]
+
+    def renew_key(
+        self,
+        worker_id: str,
+        key: str,
+        ttl: float = LEASE_TTL,
+    ) -> bool:
+        now = time.time()
+        with self._transaction() as cursor:
+            cursor.execute(
+                'UPDATE keys SET worker = ?, expires = ? '
+                + 'WHERE key = ? AND sleep_until <= ? '
+                + 'AND (worker = ? OR worker IS NULL OR expires < ?)',
+                (worker_id, now + ttl, key, now, worker_id, now),
+            )
+            return cursor.rowcount == 1
+
+    def release_key(
+        self,
+        worker_id: str,
+        key: str,
+        sleep_seconds: float = 0,
+    ) -> None:
+        with self._transaction() as cursor:
+            cursor.execute(
+                'UPDATE keys SET worker = NULL, expires = 0, '
+                + 'sleep_until = MAX(sleep_until, ?) '
+                + 'WHERE key = ? AND worker = ?',
+                (time.time() + sleep_seconds, key, worker_id),
+            )
+
+    def heartbeat(self, worker_id: str, ttl: float = LEASE_TTL) -> None:
+        expires = time.time() + ttl
+        with self._transaction() as cursor:
+            for table in ('work', 'keys'):
+                cursor.execute(
+                    f'UPDATE {table} SET expires = ? WHERE worker = ?',
+                    (expires, worker_id),
+                )
+
+    def pending(self) -> int:
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT COUNT(*) FROM work WHERE done = 0',
+            ).fetchone()
+        return row[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _update_work(
+        self,
+        assignments: str,
+        values: tuple,
+        worker_id: str,
+        username: str,
+        relationship: str,
+    ) -> None:
+        with self._transaction() as cursor:
+            cursor.execute(
+                f'UPDATE work SET {assignments} '
+                + 'WHERE username = ? AND relationship = ? AND worker = ?',
+                (*values, username, relationship, worker_id),
+            )
+
+    def _transaction(self):
+        return Transaction(self.connection, self._lock)
+
+
+class RedisCoordinator(Coordinator):
+
+    def __init__(self, client, namespace: str = 'twitter_api_crawler'):
+        """
+        Coordinate workers through a Redis compatible server.
+
+        Every change to a work item or a key lease runs as one Lua script,
+        so a worker dying half way never leaves an item neither pending,
+        leased nor done, and a sleeping key is never leased.
+
+        Arguments:
+            client: A `redis.Redis` like client with decode_responses=True
+            namespace: Prefix for every key the coordinator writes
+        """
+        self.client = client
+        self.namespace = namespace
+        self._add_work = client.register_script(ADD_WORK_SCRIPT)
+        self._lease_work = client.register_script(LEASE_WORK_SCRIPT)
+        self._update_cursor = client.register_script(UPDATE_CURSOR_SCRIPT)
+        self._complete_work = client.register_script(COMPLETE_WORK_SCRIPT)
+        self._release_work = client.register_script(RELEASE_WORK_SCRIPT)
+        self._heartbeat = client.register_script(HEARTBEAT_SCRIPT)
+        self._lease_key = client.register_script(LEASE_KEY_SCRIPT)
+        self._renew_key = client.register_script(RENEW_KEY_SCRIPT)
+        self._release_key = client.register_script(RELEASE_KEY_SCRIPT)
+
+    def add_work(
+        self,
+        usernames: Iterable[str],
+        relationship: str = 'following',
+    ) -> int:
+        items = [_item_id(username, relationship) for username in usernames]
+        if not items:
+            return 0
+        return self._add_work(keys=self._work_keys(), args=items)
+
+    def lease_work(self, worker_id: str, ttl: float = LEASE_TTL):
+        now = time.time()
+        leased = self._lease_work(
+            keys=self._work_keys(),
+            args=[worker_id, now, now + ttl],
+        )
+        if not leased:
+            return None
+
+        item, cursor = leased
+        username, relationship = _split_item_id(item)
+        return {
+            'username': username,
+            'relationship': relationship,
+            'cursor': int(cursor),
+        }
+
+    def update_cursor(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+        cursor: int,
+        ttl: float = LEASE_TTL,
+    ) -> None:
+        self._update_cursor(
+            keys=self._work_keys(),
+            args=[
+                _item_id(username, relationship),
+                worker_id,
+                cursor,
+                time.time() + ttl,
+            ],
+        )
+
+    def complete_work(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+    ) -> None:
+        self._complete_work(
+            keys=self._work_keys(),
+            args=[_item_id(username, relationship), worker_id],
+        )
+
+    def release_work(
+        self,
+        worker_id: str,
+        username: str,
+        relationship: str,
+    ) -> None:
+        self._release_work(
+            keys=self._work_keys(),
+            args=[_item_id(username, relationship), worker_id],
+        )
+
+    def lease_key(
+        self,
+        worker_id: str,
+        keys: List[str],
+        ttl: float = LEASE_TTL,
+    ) -> Optional[str]:
+        if not keys:
+            return None
+
+        lease_keys = [self._key('worker_keys', worker_id)]
+        for key in keys:
+            lease_keys += [self._key('key', key), self._key('sleep', key)]
+
+        leased = self._lease_key(
+            keys=lease_keys,
+            args=[worker_id, int(ttl * 1000), *keys],
+        )
+        return leased or None
+
+    def renew_key(
+        self,
+        worker_id: str,
+        key: str,
+        ttl: float = LEASE_TTL,
+    ) -> bool:
+        renewed = self._renew_key(
+            keys=self._lease_keys(worker_id, key),
+            args=[worker_id, int(ttl * 1000), key],
+        )
+        return bool(renewed)
+
+    def release_key(
+        self,
+        worker_id: str,
+        key: str,
+        sleep_seconds: float = 0,
+    ) -> None:
+        self._release_key(
+            keys=self._lease_keys(worker_id, key),
+            args=[worker_id, int(sleep_seconds * 1000), key],
+        )
+
+    def heartbeat(self, worker_id: str, ttl: float = LEASE_TTL) -> None:
+        self._heartbeat(
+            keys=self._work_keys(),
+            args=[worker_id, time.time() + ttl],
+        )
+
+        worker_keys = self._key('worker_keys', worker_id)
+        for key in self.client.smembers(worker_keys):
+            if not self.renew_key(worker_id, key, ttl):
+                self.client.srem(worker_keys, key)
+
+    def pending(self) -> int:
+        total = self.client.hlen(self._key('cursors'))
+        return total - self.client.scard(self._key('done'))
+
+    def _work_keys(self) -> List[str]:
+        """KEYS of the work item scripts."""
+        return [
+            self._key(name)
+            for name in ('pending', 'leases', 'owners', 'cursors', 'done')
+        ]
+
+    def _lease_keys(self, worker_id: str, key: str) -> List[str]:
+        """KEYS of the key lease scripts."""
+        return [
+            self._key('key', key),
+            self._key('sleep', key),
+            self._key('worker_keys', worker_id),
+        ]
+
+    def _key(self, *parts: str) -> str:
+        return ':'.join((self.namespace, *parts))
+
+
+def _item_id(username: str, relationship: str) -> str:
+    return f'{relationship}:{username}'
+
+
+def _split_item_id(item: str):
+    relationship, username = item.split(':', 1)
+    return username, relationship
+
+
+def run_worker(
+    coordinator: Coordinator,
+    crawler: TwitterAPIv1Crawler,
+    worker_id: str,
+    on_page: Callable[[str, str, List[Dict]], None],
+    ttl: float = LEASE_TTL,
+    poll_interval: float = POLL_INTERVAL,
+    stop_when_empty: bool = True,
+) -> int:
+    """
+    Crawl work items leased from the coordinator with keys leased from it.
+
+    The crawler only supplies the API clients, which key is used is decided by
+    the coordinator so a key is never used by two workers at once and a key
+    asleep after a HTTP 429 stays asleep for every worker. Items hit by a
+    HTTP 503 or an error body go back to the frontier at their last cursor.
+
+    Args
+        coordinator: The shared frontier and key pool
+        crawler: Holds an API client for every key the worker may lease
+        worker_id: Unique name of this worker
+        on_page: Called with username, relationship and users of every page
+        ttl: Lease time in seconds, renewed before every request and after
+        every page
+        poll_interval: Seconds to wait when no key or work is available,
+        the key is handed back while waiting for work
+        stop_when_empty: Return once the frontier has nothing to lease
+
+    Returns
+        The number of pages crawled
+    """
+    pages = 0
+    key = None
+
+    while True:
+        item = coordinator.lease_work(worker_id, ttl)
+        if item is None:
+            # Leave the key to the workers that have work.
+            if key is not None:
+                coordinator.release_key(worker_id, key)
+                key = None
+            if stop_when_empty and not coordinator.pending():
+                break
+            time.sleep(poll_interval)
+            continue
+
+        username = item['username']
+        relationship = item['relationship']
+        cursor = item['cursor']
+
+        while cursor != 0:
+            # The lease may have expired meanwhile, and the key gone to
+            # another worker.
+            if key is not None and not coordinator.renew_key(
+                worker_id,
+                key,
+                ttl,
+            ):
+                key = None
+            if key is None:
+                key = coordinator.lease_key(worker_id, list(crawler.apis), ttl)
+            if key is None:
+                coordinator.release_work(worker_id, username, relationship)
+                time.sleep(poll_interval)
+                break
+
+            try:
+                users, cursor = _fetch_page(
+                    crawler.get_api(key),
+                    relationship,
+                    username,
+                    cursor,
+                )
+            except Twitter429Exception:
+                coordinator.release_key(worker_id, key, crawler.sleep_period)
+                key = None
+                continue
+            except Twitter404Exception:
+                logger.info(f'{username} not found, skipping')
+                cursor = 0
+                continue
+            except (Twitter503Exception, TwitterAPIClientException) as error:
+                logger.warning(f'Handing {username} back: {error!r}')
+                coordinator.release_work(worker_id, username, relationship)
+                time.sleep(poll_interval)
+                break
+
+            pages += 1
+            on_page(username, relationship, users)
+            coordinator.update_cursor(
+                worker_id,
+                username,
+                relationship,
+                cursor,
+                ttl,
+            )
+            coordinator.heartbeat(worker_id, ttl)
+
+        if cursor == 0:
+            coordinator.complete_work(worker_id, username, relationship)
+
+    if key is not None:
+        coordinator.release_key(worker_id, key)
+
+    return pages
+
+
+def _fetch_page(api, relationship: str, username: str, cursor: int):
+    """
+    Fetch one page with the leased key.
+
+    Raises
+        TwitterAPIClientException: for a body without users or next_cursor,
+        like an error payload, never a sign of the last page
+    """
+    if relationship == 'followers':
+        followers = api.get_followers(username, cursor)
+        # The followers client flags a body without users as completed.
+        if followers['completed']:
+            raise TwitterAPIClientException(
+                f'No users in the followers page of {username}',
+            )
+        return followers['users'], int(followers['cursor'])
+
+    following = api.get_following(username, cursor)
+    if 'users' not in following or 'next_cursor' not in following:
+        raise TwitterAPIClientException(
+            f'No users or next_cursor in the following page of {username}: '
+            + str(following)[:200],
+        )
+    return following['users'], int(following['next_cursor'])
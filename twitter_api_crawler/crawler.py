@@ -1,25 +1,124 @@
+import datetime
 import logging
-from typing import Dict, Union
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from twitter_api_crawler.api import TwitterAPIv1
+from twitter_api_crawler.api import (
+    API_BASE_URL,
+    DEFAULT_USER_FIELDS,
+    HOOK_EVENTS,
+    TwitterAPIClient,
+    TwitterAPIv1,
+    TwitterAPIv2,
+    fetch_bearer_token,
+)
 from twitter_api_crawler.exceptions import (
+    Twitter404Exception,
     Twitter429Exception,
     TwitterAPIClientException,
     TwitterNoAvailableAPIs,
 )
+from twitter_api_crawler.helper_utils import (
+    get_hashtags,
+    get_mentions,
+    get_next_cursor,
+    user_from_v2,
+)
+from twitter_api_crawler.metrics import NULL_METRICS, MetricsSink
+from twitter_api_crawler.profiling import profiler_from_env
 
 logger = logging.getLogger(__name__)
 
 SLEEP_PERIOD = 15 * 60
+FRIENDSHIPS_LOOKUP_SIZE = 100
+USERS_LOOKUP_SIZE = 100
+TIMELINE_ENDPOINT = 'statuses/user_timeline'
+
+KEY_STRATEGIES = ('first', 'round_robin', 'weighted')
+API_VERSIONS = (1, 2)
+
+RELATIONSHIP_ENDPOINTS = {
+    'following': 'friends/list',
+    'followers': 'followers/list',
+}
+
+V2_RELATIONSHIP_ENDPOINTS = {
+    'following': 'users/:id/following',
+    'followers': 'users/:id/followers',
+}
 
 
 class TwitterAPIv1Crawler(object):
 
-    def __init__(self):
-        """Initialize the crawler object."""
+    def __init__(
+        self,
+        sleep_period: int = SLEEP_PERIOD,
+        metrics: MetricsSink = NULL_METRICS,
+        profiler=None,
+        key_state=None,
+        key_strategy: str = 'first',
+        api_version: int = 1,
+        user_fields: Sequence[str] = DEFAULT_USER_FIELDS,
+    ):
+        """
+        Initialize the crawler object.
+
+        Args
+            sleep_period: seconds an API client sleeps after a HTTP 429
+            metrics: sink shared by the crawler and every API client
+            profiler: a Profiler for the crawl phases, by default it is
+            enabled through the TWITTER_API_CRAWLER_PROFILE env var
+            key_state: a SQLiteKeyState shared with other processes using
+            the same keys, so sleep and quota state are not rediscovered
+            key_strategy: how the next key is picked, `first` takes the first
+            awake key, `round_robin` cycles through the keys and `weighted`
+            spreads requests in proportion to the key health scores
+            api_version: API of the follow lists and user lookups, with `2`
+            pages hold 1000 users and the users only the user_fields
+            user_fields: v2 user fields to request
+        """
+        if key_strategy not in KEY_STRATEGIES:
+            raise TwitterAPIClientException(
+                f'Unknown key strategy: {key_strategy}',
+            )
+        if api_version not in API_VERSIONS:
+            raise TwitterAPIClientException(
+                f'Unknown API version: {api_version}',
+            )
+
         self.apis = {}
+        self.v2_apis: Dict[str, TwitterAPIv2] = {}
         self.current_key = ''
         self.cursors = {}
+        self.timelines: Dict[str, Dict] = {}
+        self.sleep_period = sleep_period
+        self.metrics = metrics
+        self.hooks = []
+        self.profiler = profiler or profiler_from_env()
+        self.key_state = key_state
+        self.key_strategy = key_strategy
+        self.api_version = api_version
+        self.user_fields = user_fields
+        self._lock = threading.Lock()
+        # Per pool, the v1.1 and v2 clients of a key rotate separately.
+        self._last_key: Dict[int, str] = {}
+        # Weighted round-robin credit of every client, by key_id.
+        self._weights: Dict[str, float] = {}
+        self._connections: Dict[Tuple[str, str], Optional[List[str]]] = {}
+        self._relationships: Dict[Tuple[str, str], Optional[Dict]] = {}
+        self._user_ids: Dict[str, Optional[str]] = {}
 
     def create_api(
         self,
@@ -28,6 +127,9 @@ class TwitterAPIv1Crawler(object):
         api_key_secret: str,
         access_token: str,
         access_token_secret: str,
+        base_url: str = API_BASE_URL,
+        transport=None,
+        lean: bool = False,
     ):
         """
             Initialize a new TwitterAPI and add it to the list of APIs.
@@ -37,8 +139,78 @@ class TwitterAPIv1Crawler(object):
         @param api_key_secret:
         @param access_token:
         @param access_token_secret:
+        @param base_url: Root of the v1.1 API (eg. a local mock server)
+        @param transport: a `twitter_api_crawler.transport.Transport`, eg.
+        one HTTP2Transport shared by all the keys
+        @param lean: request user objects without latest tweet and entities
         @return:
         """
+        self._add_api(key, TwitterAPIv1(
+            api_key,
+            api_key_secret,
+            access_token,
+            access_token_secret,
+            base_url=base_url,
+            key_id=key,
+            metrics=self.metrics,
+            profiler=self.profiler,
+            transport=transport,
+            lean=lean,
+        ))
+
+    def create_app_api(
+        self,
+        key: str,
+        api_key: str = None,
+        api_key_secret: str = None,
+        bearer_token: str = None,
+        base_url: str = API_BASE_URL,
+        transport=None,
+        lean: bool = False,
+    ) -> None:
+        """
+        Add an app-only (bearer token) API client to the key pool.
+
+        App-only requests have their own rate-limit windows, so adding one
+        next to the user keys of the same app adds its quota to the pool.
+        It sleeps and tracks its quota on its own under its key. Endpoints
+        needing a user context, like friendships/lookup, skip it.
+
+        Args
+            key: name of the client in the pool, eg. `myapp:app`
+            api_key: the app's API_KEY, to fetch a bearer token
+            api_key_secret: the app's API_KEY_SECRET, to fetch a bearer token
+            bearer_token: the app's bearer token, fetched if not given
+            base_url: Root of the v1.1 API (eg. a local mock server)
+            transport: a `twitter_api_crawler.transport.Transport`
+            lean: request user objects without latest tweet and entities
+
+        Raises
+            TwitterAPIClientException: for a duplicate key or when no token
+            was given or could be fetched
+        """
+        if bearer_token is None:
+            if not (api_key and api_key_secret):
+                raise TwitterAPIClientException(
+                    'A bearer token or the API key and secret are needed',
+                )
+            bearer_token = fetch_bearer_token(
+                api_key,
+                api_key_secret,
+                base_url,
+            )
+
+        self._add_api(key, TwitterAPIv1.from_bearer_token(
+            bearer_token,
+            base_url=base_url,
+            key_id=key,
+            metrics=self.metrics,
+            profiler=self.profiler,
+            transport=transport,
+            lean=lean,
+        ))
+
+    def _add_api(self, key: str, api: TwitterAPIv1) -> None:
         if key in self.apis:
             raise TwitterAPIClientException(
                 'Duplicate Key in your credentials',
@@ -47,12 +219,29 @@ class TwitterAPIv1Crawler(object):
         if self.current_key == '':
             self.current_key = key
 
-        self.apis[key] = TwitterAPIv1(
-            api_key,
-            api_key_secret,
-            access_token,
-            access_token_secret,
-        )
+        self.apis[key] = api
+
+        for event, callback in self.hooks:
+            api.add_hook(event, callback)
+
+        # Same key, but v2 has its own rate-limit windows.
+        v2_api = TwitterAPIv2.from_client(api)
+        v2_api.key_id = f'{key}:v2'
+        self.v2_apis[key] = v2_api
+
+    def add_hook(self, event: str, callback: Callable[[Dict], None]) -> None:
+        """
+        Register a request hook on every current and future API client.
+
+        See `TwitterAPIv1.add_hook` for the events and callback arguments.
+        """
+        if event not in HOOK_EVENTS:
+            raise TwitterAPIClientException(f'Unknown hook event: {event}')
+
+        for api in [*self.apis.values(), *self.v2_apis.values()]:
+            api.add_hook(event, callback)
+
+        self.hooks.append((event, callback))
 
     def get_api(self, key: str) -> Union[TwitterAPIv1, None]:
         """Fetch an API client by it lookup key."""
@@ -62,23 +251,98 @@ class TwitterAPIv1Crawler(object):
         """Return the current active API client."""
         return self.apis.get(self.current_key, None)
 
-    def next_api(self) -> TwitterAPIv1:
+    def next_api(self, endpoint: str = None) -> TwitterAPIv1:
         """
         Grab the next available API client from our list that is not asleep.
 
+        With a shared key state, keys another process put to sleep are
+        skipped too and one request of the endpoint's quota is claimed.
+
+        Args
+            endpoint: the endpoint the client is for, eg. `friends/list`
+
         Returns
             A TwitterAPI client
 
         Raises
             TwitterNoAvailableAPIs
         """
-        for key in list(self.apis.keys()):
-            if not self.apis[key].is_asleep():
-                self.current_key = key
-                return self.apis[key]
+        return self.apis[self._next_key(endpoint)]
+
+    def _next_key(self, endpoint: str = None, pool: Dict = None) -> str:
+        """
+        Pick the next available key, safe to call from many threads.
+
+        The clients of pool are checked, `apis` (v1.1) by default. Only
+        picks from `apis` set current_key.
+        """
+        pool = self.apis if pool is None else pool
+        with self._lock:
+            keys = list(pool.keys())
+            last_key = self._last_key.get(id(pool))
+            if self.key_strategy != 'first' and last_key in pool:
+                # Start after the key picked last time.
+                start = keys.index(last_key) + 1
+                keys = keys[start:] + keys[:start]
 
-        self.current_key = None
-        raise TwitterNoAvailableAPIs()
+            keys = [
+                key for key in keys
+                if pool[key].supports(endpoint) and not pool[key].is_asleep()
+            ]
+            if self.key_strategy == 'weighted':
+                keys = self._weighted(keys, endpoint, pool)
+
+            for key in keys:
+                shared = self.key_state is not None
+                if shared and not self._acquire_shared(pool[key], endpoint):
+                    continue
+
+                if pool is self.apis:
+                    self.current_key = key
+                self._last_key[id(pool)] = key
+                return key
+
+            if pool is self.apis:
+                self.current_key = None
+            raise TwitterNoAvailableAPIs()
+
+    def _weighted(
+        self,
+        keys: List[str],
+        endpoint: str = None,
+        pool: Dict = None,
+    ) -> List[str]:
+        """
+        Order the awake keys for the weighted strategy.
+
+        Smooth weighted round-robin: every key earns its health score, the
+        richest key is picked and pays the total. Keys get picked in
+        proportion to their scores and interleaved rather than in bursts.
+        Ties go to the key after the one picked last.
+        """
+        if not keys:
+            return keys
+
+        pool = self.apis if pool is None else pool
+        scores = {
+            key: pool[key].health.score(
+                pool[key].quota_left(endpoint) if endpoint else None,
+            )
+            for key in keys
+        }
+        weights = self._weights
+        for key, score in scores.items():
+            key_id = pool[key].key_id
+            weights[key_id] = weights.get(key_id, 0.0) + score
+
+        best = max(keys, key=lambda _: weights[pool[_].key_id])
+        weights[pool[best].key_id] -= sum(scores.values())
+
+        rest = sorted(
+            (key for key in keys if key != best),
+            key=lambda _: -scores[_],
+        )
+        return [best] + rest
 
     def pause_current_api(self, secs: int) -> None:
         """
@@ -94,7 +358,81 @@ class TwitterAPIv1Crawler(object):
             None
         """
         if self.current_key:
-            self.apis[self.current_key].sleep(secs)
+            self._pause(self.current_key, secs)
+
+    def _pause(self, key: str, secs: int, pool: Dict = None) -> None:
+        """Put a key to sleep locally and in the shared key state."""
+        api = (self.apis if pool is None else pool)[key]
+        api.sleep(secs)
+
+        if self.key_state:
+            self.key_state.sleep(api.key_id, time.time() + secs)
+
+        if self.metrics.enabled:
+            self.metrics.increment(
+                'key_sleep_seconds_total',
+                secs,
+                {'key': key},
+            )
+
+    def _rate_limited(self, key: str, pool: Dict = None) -> None:
+        logger.info('Got 429: API Client Key unavailable for 15 minutes')
+        self.metrics.increment('rate_limited_total', labels={'key': key})
+        self._pause(key, self.sleep_period, pool)
+
+    def seconds_until_available(self) -> float:
+        """
+        Return how long until the first sleeping API client wakes up.
+
+        The clients of the crawler's api_version are checked.
+
+        Returns
+            0 when a client is awake, otherwise the shortest remaining sleep
+        """
+        now = datetime.datetime.now(datetime.timezone.utc)
+        waits = []
+        pool = self.v2_apis if self.api_version == 2 else self.apis
+
+        for api in pool.values():
+            if not api.is_asleep():
+                return 0
+            waits.append((api.sleep_until - now).total_seconds())
+
+        return max(min(waits, default=0), 0)
+
+    def _acquire_shared(
+        self,
+        api: TwitterAPIClient,
+        endpoint: str = None,
+    ) -> bool:
+        """
+        Claim a request from the shared key state, syncing its sleep.
+
+        A key that is asleep in the shared state, or out of shared quota,
+        sleeps locally until it wakes up or the quota resets, so
+        `seconds_until_available` tells callers how long to wait.
+        """
+        acquired, until = self.key_state.try_acquire(api.key_id, endpoint)
+        if acquired:
+            return True
+
+        api.sleep_until = datetime.datetime.fromtimestamp(
+            until,
+            datetime.timezone.utc,
+        )
+        return False
+
+    def _share_quota(self, key: str, endpoint: str, pool: Dict = None) -> None:
+        """Publish the quota an API client last saw to the shared state."""
+        api = (self.apis if pool is None else pool)[key]
+        quota = api.rate_limits.get(endpoint)
+        if self.key_state and quota:
+            self.key_state.update_quota(
+                api.key_id,
+                endpoint,
+                quota['remaining'],
+                quota['reset'],
+            )
 
     def set_cursor(self, username: str, cursor: str) -> None:
         """Set the cursor for the current API round."""
@@ -103,6 +441,13 @@ class TwitterAPIv1Crawler(object):
     def get_cursor(self, username: str) -> str:
         return self.cursors.get(username, -1)
 
+    def set_timeline_state(self, username: str, state: Dict) -> None:
+        """Set the timeline checkpoint of an account, see `crawl_timeline`."""
+        self.timelines[username] = state
+
+    def get_timeline_state(self, username: str) -> Dict:
+        return self.timelines.get(username, {})
+
     def get_following(self, username: str, cursor: int = -1) -> Dict:
         """
         Crawl as many followed accounts as possible with the Twitter Objects.
@@ -129,25 +474,668 @@ class TwitterAPIv1Crawler(object):
             cursor (int), and completed(boolean)
 
         """
-        output = []
+        return self._get_page('following', username, cursor)
+
+    def get_followers(self, username: str, cursor: int = -1) -> Dict:
+        """
+        Crawl a page of the accounts following username.
+
+        Works like `get_following`, rotating API clients on HTTP 429.
+
+        Args
+            username (str): username (eg. screen_name) of a known Twitter user
+            cursor (int): An integer that is used for pagination with the
+            Twitter API
+
+        Returns
+            Python dict containing username(str), users(list of users crawled),
+            cursor (int), and completed(boolean)
+        """
+        return self._get_page('followers', username, cursor)
+
+    def crawl(
+        self,
+        username: str,
+        sink,
+        relationship: str = 'following',
+        cursor: int = None,
+    ) -> Dict:
+        """
+        Crawl every page of a relationship and write each page to a sink.
+
+        Users are written as they arrive, each tagged with the account it was
+        crawled from (`crawled_from`) and the `relationship`, so memory use is
+        bounded by a single page. Pages come from `iter_pages`, so the next
+        page is fetched while this one is decoded and written.
+
+        Args
+            username: username (eg. screen_name) of a known Twitter user
+            sink: a `twitter_api_crawler.sinks.Sink`
+            relationship: `following` or `followers`
+            cursor: where to resume, defaults to the saved cursor
+
+        Returns
+            Python dict containing username, cursor, completed, pages and
+            users (the number written). completed is False when every API
+            client is asleep, resume later from the returned cursor.
+        """
+        if cursor is None:
+            cursor = self.get_cursor(username)
+
+        pages = 0
+        written = 0
+        completed = cursor == 0
+
+        try:
+            for page in self.iter_pages(username, relationship, cursor):
+                for user in page['users']:
+                    user['crawled_from'] = username
+                    user['relationship'] = relationship
+
+                with self.profiler.phase('sink'):
+                    sink.write(page['users'])
+
+                pages += 1
+                written += len(page['users'])
+                cursor = page['cursor']
+                completed = page['completed']
+        except TwitterNoAvailableAPIs:
+            pass
+
+        return {
+            'username': username,
+            'cursor': cursor,
+            'completed': completed,
+            'pages': pages,
+            'users': written,
+        }
+
+    def iter_pages(
+        self,
+        username: str,
+        relationship: str = 'following',
+        cursor: int = None,
+    ) -> Iterator[Dict]:
+        """
+        Yield every page of a relationship, prefetching the next one.
+
+        As soon as a response arrives its next_cursor is read from the raw
+        body and the next page is requested from a background thread, while
+        this page is decoded and handed to the caller. The key is kept busy
+        during the CPU work on either side. Rate-limited clients are rotated
+        out and the cursor is saved with `set_cursor` once the caller asks
+        for the page after.
+
+        Args
+            username: username (eg. screen_name) of a known Twitter user
+            relationship: `following` or `followers`
+            cursor: where to resume, defaults to the saved cursor
+
+        Yields
+            Python dict containing username, users, cursor and completed
+
+        Raises
+            TwitterNoAvailableAPIs: when every API client is asleep, resume
+            later from the saved cursor
+            TwitterAPIClientException: on an error response, or a page
+            without next_cursor, the saved cursor is left as it was
+        """
+        if cursor is None:
+            cursor = self.get_cursor(username)
+
+        if cursor == 0:
+            return
+
+        if self.api_version == 2:
+            yield from self._iter_pages_v2(username, relationship, cursor)
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(
+                self._fetch_raw,
+                relationship,
+                username,
+                cursor,
+            )
+
+            while pending is not None:
+                api, body = pending.result()
+
+                with self.profiler.phase('extraction'):
+                    cursor = get_next_cursor(body)
+
+                # An error body, never a sign of the last page.
+                if cursor is None:
+                    raise TwitterAPIClientException(
+                        f'No next_cursor in the {relationship} page of '
+                        + f'{username}: {body[:200]}',
+                    )
+
+                pending = None
+                if cursor:
+                    pending = executor.submit(
+                        self._fetch_raw,
+                        relationship,
+                        username,
+                        cursor,
+                    )
+
+                users = api.decode(body).get('users', [])
+
+                yield {
+                    'username': username,
+                    'users': users,
+                    'cursor': cursor,
+                    'completed': cursor == 0,
+                }
+
+                # Only once the caller is done with the page.
+                self.set_cursor(username, cursor)
+
+    def _iter_pages_v2(
+        self,
+        username: str,
+        relationship: str,
+        cursor,
+    ) -> Iterator[Dict]:
+        """Yield v2 pages one request after the other."""
+        while cursor != 0:
+            try:
+                page = self._get_page(relationship, username, cursor)
+            except Twitter429Exception:
+                continue
+
+            yield page
+
+            cursor = page['cursor']
+            self.set_cursor(username, cursor)
+
+    def _fetch_raw(
+        self,
+        relationship: str,
+        username: str,
+        cursor: int,
+    ) -> Tuple[TwitterAPIv1, bytes]:
+        """Fetch an undecoded page, rotating clients on HTTP 429."""
+        endpoint = RELATIONSHIP_ENDPOINTS[relationship]
+
+        while True:
+            with self.profiler.phase('key_acquisition'):
+                key = self._next_key(endpoint)
+            api = self.apis[key]
+
+            try:
+                body = api.fetch_list(endpoint, username, cursor)
+            except Twitter429Exception:
+                self._rate_limited(key)
+                continue
+
+            self._share_quota(key, endpoint)
+            return api, body
+
+    def lookup_users(self, usernames: List[str]) -> List[Dict]:
+        """
+        Fetch the user objects of many accounts, 100 per request.
+
+        Rotates the API clients on HTTP 429, accounts that do not exist are
+        left out. With api_version 2 the v2 user objects are converted to
+        the v1.1 shape and their ids kept for the v2 follow lists.
+
+        Args
+            usernames: screen_names to look up
+
+        Returns
+            The user objects found
+
+        Raises
+            TwitterNoAvailableAPIs: once every client is asleep
+        """
+        users = []
+
+        for start in range(0, len(usernames), USERS_LOOKUP_SIZE):
+            chunk = usernames[start:start + USERS_LOOKUP_SIZE]
+            if self.api_version == 2:
+                users.extend(self._lookup_users_v2(chunk))
+                continue
+
+            while True:
+                key = self._next_key('users/lookup')
+                try:
+                    users.extend(self.apis[key].lookup_users(','.join(chunk)))
+                except Twitter404Exception:
+                    pass
+                except Twitter429Exception:
+                    self._rate_limited(key)
+                    continue
+
+                self._share_quota(key, 'users/lookup')
+                break
+
+        return users
+
+    def _lookup_users_v2(self, usernames: List[str]) -> List[Dict]:
+        """Fetch up to 100 v2 user objects, remembering their ids."""
+        while True:
+            key = self._next_key('users/by', self.v2_apis)
+            try:
+                users = self.v2_apis[key].lookup_users(
+                    ','.join(usernames),
+                    self.user_fields,
+                )
+            except Twitter429Exception:
+                self._rate_limited(key, self.v2_apis)
+                continue
+
+            self._share_quota(key, 'users/by', self.v2_apis)
+            break
+
+        for username in usernames:
+            self._user_ids.setdefault(username.lower(), None)
+        for user in users:
+            self._user_ids[user['username'].lower()] = user['id']
+
+        return [user_from_v2(user) for user in users]
+
+    def resolve_user_id(self, username: str) -> str:
+        """
+        Return the id of an account, as the v2 follow lists need.
+
+        Ids are looked up once and cached, `lookup_users` resolves many
+        accounts in one request.
+
+        Raises
+            Twitter404Exception: when the account does not exist
+        """
+        name = username.lower()
+        if name not in self._user_ids:
+            self._lookup_users_v2([username])
+
+        user_id = self._user_ids[name]
+        if user_id is None:
+            raise Twitter404Exception()
+
+        return user_id
+
+    def lookup_friendships(
+        self,
+        usernames: List[str],
+        key: str = None,
+    ) -> Dict[str, List[str]]:
+        """
+        Lookup how the account behind a key relates to many accounts.
+
+        friendships/lookup answers for the authenticating user only, so the
+        key is not rotated. Usernames go out in chunks of 100 and answers are
+        cached, after a HTTP 429 a retry only sends the missing chunks.
+
+        Args
+            usernames: screen_names to check
+            key: the key whose account is checked, the current one if None
+
+        Returns
+            Lowercased screen_names mapped to their connections, eg.
+            `['following', 'followed_by']` or `['none']`, accounts that do
+            not exist are left out
+
+        Raises
+            Twitter429Exception: when the key is rate limited, it is paused
+            TwitterAPIClientException: for an app-only key
+        """
+        key = key or self.current_key
+        api = self.apis[key]
+        if not api.supports('friendships/lookup'):
+            raise TwitterAPIClientException(
+                f'{key} is app-only, friendships/lookup needs a user key',
+            )
+        wanted = [
+            name for name in dict.fromkeys(_.lower() for _ in usernames)
+            if (key, name) not in self._connections
+        ]
+
+        for start in range(0, len(wanted), FRIENDSHIPS_LOOKUP_SIZE):
+            chunk = wanted[start:start + FRIENDSHIPS_LOOKUP_SIZE]
+            try:
+                relationships = api.lookup_friendships(','.join(chunk))
+            except Twitter429Exception:
+                self._rate_limited(key)
+                raise
+
+            for name in chunk:
+                self._connections[(key, name)] = None
+            for relationship in relationships:
+                name = relationship['screen_name'].lower()
+                self._connections[(key, name)] = relationship['connections']
+
+        return {
+            name: self._connections[(key, name)]
+            for name in (_.lower() for _ in usernames)
+            if self._connections.get((key, name)) is not None
+        }
+
+    def check_relationships(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+    ) -> Dict[Tuple[str, str], Optional[Dict]]:
+        """
+        Tell whether the source of every pair follows the target.
+
+        Uses friendships/show, which works for any two accounts, rotating
+        the API clients on HTTP 429. Answers are cached, including the
+        reverse pair since one call answers both directions.
+
+        Args
+            pairs: (source, target) screen_names
+
+        Returns
+            Every pair mapped to a dict with `following` (source follows
+            target) and `followed_by`, or None if an account does not exist
+
+        Raises
+            TwitterNoAvailableAPIs: once every client is asleep, the answers
+            gathered so far stay cached
+        """
+        results = {}
+
+        for source, target in pairs:
+            pair = (source.lower(), target.lower())
+            if pair not in self._relationships:
+                self._relationships.update(self._show_friendship(*pair))
+            results[(source, target)] = self._relationships[pair]
+
+        return results
+
+    def _show_friendship(self, source: str, target: str) -> Dict:
+        """Fetch one pair, returning the cache entries for both directions."""
+        while True:
+            key = self._next_key('friendships/show')
+            try:
+                relationship = self.apis[key].show_friendship(source, target)
+            except Twitter404Exception:
+                return {(source, target): None, (target, source): None}
+            except Twitter429Exception:
+                self._rate_limited(key)
+                continue
+
+            self._share_quota(key, 'friendships/show')
+            following = relationship['source']['following']
+            followed_by = relationship['source']['followed_by']
+            return {
+                (source, target): {
+                    'following': following,
+                    'followed_by': followed_by,
+                },
+                (target, source): {
+                    'following': followed_by,
+                    'followed_by': following,
+                },
+            }
+
+    def crawl_incremental(
+        self,
+        username: str,
+        sink,
+        snapshots,
+        relationship: str = 'following',
+        full_sweep_every: float = None,
+    ) -> Dict:
+        """
+        Crawl only the edges added since the last snapshot of an account.
+
+        Lists come back newest first, so paging stops at the first page
+        holding an ID from the previous snapshot and only the unknown users
+        are written to the sink. Accounts without a snapshot, or whose last
+        full sweep is older than full_sweep_every, get the whole list walked
+        to also find the removed edges. The snapshot is only updated once the
+        crawl completes.
+
+        Args
+            username: username (eg. screen_name) of a known Twitter user
+            sink: a `twitter_api_crawler.sinks.Sink` receiving the new users
+            snapshots: a `twitter_api_crawler.snapshots.SnapshotStore`
+            relationship: `following` or `followers`
+            full_sweep_every: seconds between full sweeps, None to never
+            sweep an account that already has a snapshot
+
+        Returns
+            Python dict containing username, relationship, completed,
+            full_sweep, pages, added (the number of new users) and removed
+            (the IDs gone since the snapshot, only known after a full sweep)
+        """
+        known = snapshots.get_ids(username, relationship)
+        known_ids = set(known)
+        full_sweep = snapshots.needs_full_sweep(
+            username,
+            relationship,
+            full_sweep_every,
+        )
+
+        cursor = -1
+        pages = 0
+        added = []
+        seen = []
+        completed = False
+
+        while not completed:
+            try:
+                page = self._get_page(relationship, username, cursor)
+            except Twitter429Exception:
+                continue
+            except TwitterNoAvailableAPIs:
+                break
+
+            pages += 1
+            ids = [user['id'] for user in page['users']]
+            new_users = [
+                user for user in page['users'] if user['id'] not in known_ids
+            ]
+            for user in new_users:
+                user['crawled_from'] = username
+                user['relationship'] = relationship
+
+            with self.profiler.phase('sink'):
+                sink.write(new_users)
+
+            added.extend(user['id'] for user in new_users)
+            seen.extend(ids)
+            cursor = page['cursor']
+            completed = page['completed']
+
+            if not full_sweep and len(new_users) < len(ids):
+                completed = True
+
+        removed = []
+        if completed and full_sweep:
+            removed = sorted(known_ids.difference(seen))
+            snapshots.save(username, relationship, seen, full_sweep=True)
+        elif completed:
+            snapshots.save(username, relationship, added + known)
+
+        return {
+            'username': username,
+            'relationship': relationship,
+            'completed': completed,
+            'full_sweep': full_sweep,
+            'pages': pages,
+            'added': len(added),
+            'removed': removed,
+        }
+
+    def crawl_timeline(
+        self,
+        username: str,
+        sink,
+        max_pages: int = None,
+    ) -> Dict:
+        """
+        Crawl the tweets of an account posted since the last crawl.
+
+        The timeline is paged backwards with max_id, down to the since_id
+        recorded by the previous complete crawl, so accounts without new
+        tweets cost a single request. Every tweet is tagged with the account
+        it was crawled from (`crawled_from`) and its `mentions` and
+        `hashtags` before it is written to the sink.
+
+        The checkpoint (`get_timeline_state`) holds the since_id to start
+        from next time, and while a crawl is unfinished, the max_id to resume
+        from and the newest id seen so far.
+
+        Args
+            username: username (eg. screen_name) of a known Twitter user
+            sink: a `twitter_api_crawler.sinks.Sink` receiving the tweets
+            max_pages: stop after this many requests, None for no limit
+
+        Returns
+            Python dict containing username, completed, pages, tweets (the
+            number written) and since_id. completed is False when every API
+            client is asleep or max_pages was hit, crawl again to resume.
+        """
+        state = self.get_timeline_state(username)
+        since_id = state.get('since_id')
+        max_id = state.get('max_id')
+        newest = state.get('newest', since_id)
+
+        pages = 0
+        written = 0
+        completed = False
+
+        while max_pages is None or pages < max_pages:
+            try:
+                with self.profiler.phase('key_acquisition'):
+                    key = self._next_key(TIMELINE_ENDPOINT)
+            except TwitterNoAvailableAPIs:
+                break
+
+            try:
+                tweets = self.apis[key].get_user_timeline(
+                    username,
+                    max_id=max_id,
+                    since_id=since_id,
+                )
+            except Twitter429Exception:
+                self._rate_limited(key)
+                continue
+            except Twitter404Exception:
+                logger.warning(f'No timeline for {username}')
+                break
+
+            self._share_quota(key, TIMELINE_ENDPOINT)
+            pages += 1
+
+            if not tweets:
+                completed = True
+                break
+
+            with self.profiler.phase('extraction'):
+                for tweet in tweets:
+                    tweet['crawled_from'] = username
+                    tweet['mentions'] = get_mentions(tweet)
+                    tweet['hashtags'] = get_hashtags(tweet)
+
+                ids = [tweet['id'] for tweet in tweets]
+                newest = max(newest or 0, max(ids))
+                max_id = min(ids) - 1
+
+            with self.profiler.phase('sink'):
+                sink.write(tweets)
+            written += len(tweets)
+
+        if completed:
+            state = {'since_id': newest}
+        else:
+            state = {'since_id': since_id, 'max_id': max_id, 'newest': newest}
+        self.set_timeline_state(username, state)
+
+        return {
+            'username': username,
+            'completed': completed,
+            'pages': pages,
+            'tweets': written,
+            'since_id': state['since_id'],
+        }
+
+    def _get_page(self, relationship: str, username: str, cursor: int) -> Dict:
+        """
+        Fetch one page of following or followers with the next client.
+
+        Raises
+            TwitterAPIClientException: for a body without users or
+            next_cursor, like an error payload, never a sign of the last page
+        """
+        if self.api_version == 2:
+            return self._get_page_v2(relationship, username, cursor)
+
+        endpoint = RELATIONSHIP_ENDPOINTS[relationship]
+
+        with self.profiler.phase('key_acquisition'):
+            key = self._next_key(endpoint)
+        api = self.apis[key]
+
         try:
-            following = self.next_api().get_following(username, cursor)
+            if relationship == 'followers':
+                page = api.get_followers(username, cursor)
+            else:
+                page = api.get_following(username, cursor)
         except Twitter429Exception:
-            logger.info('Got 429: API Client Key unavailable for 15 minutes')
-            self.pause_current_api(SLEEP_PERIOD)
+            self._rate_limited(key)
             raise Twitter429Exception()
 
-        users = following.get('users', [])
-        cursor = int(following.get('next_cursor', -1))
+        self._share_quota(key, endpoint)
 
-        if users:
-            output.append(users)
+        with self.profiler.phase('extraction'):
+            # The followers client flags a body without users as completed.
+            if relationship == 'followers':
+                next_cursor = None if page['completed'] else page['cursor']
+            else:
+                next_cursor = page.get('next_cursor')
+            if 'users' not in page or next_cursor is None:
+                raise TwitterAPIClientException(
+                    f'No users or next_cursor in the {relationship} page '
+                    + f'of {username}: {str(page)[:200]}',
+                )
+
+            users = page['users']
+            cursor = int(next_cursor)
+
+        return {
+            'username': username,
+            'users': users,
+            'cursor': cursor,
+            'completed': cursor == 0,
+        }
+
+    def _get_page_v2(self, relationship: str, username: str, cursor) -> Dict:
+        """
+        Fetch one page of a v2 follow list with the next v2 client.
+
+        The cursor is the pagination token, -1 for the first page and 0
+        after the last one, like the v1.1 cursors. Users are converted to
+        the v1.1 shape.
+        """
+        endpoint = V2_RELATIONSHIP_ENDPOINTS[relationship]
+        user_id = self.resolve_user_id(username)
+
+        with self.profiler.phase('key_acquisition'):
+            key = self._next_key(endpoint, self.v2_apis)
+        api = self.v2_apis[key]
+        token = cursor if isinstance(cursor, str) else None
+
+        if relationship == 'followers':
+            get_page = api.get_followers
+        else:
+            get_page = api.get_following
+
+        try:
+            page = get_page(user_id, token, user_fields=self.user_fields)
+        except Twitter429Exception:
+            self._rate_limited(key, self.v2_apis)
+            raise Twitter429Exception()
 
-        flat_users = [user for sublist in output for user in sublist]
+        self._share_quota(key, endpoint, self.v2_apis)
+        cursor = page['next_token'] or 0
 
         return {
             'username': username,
-            'users': flat_users,
+            'users': [user_from_v2(user) for user in page['users']],
             'cursor': cursor,
             'completed': cursor == 0,
         }
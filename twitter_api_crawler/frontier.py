@@ -0,0 +1,268 @@
+"""
+Snowball crawl of the Twitter graph from a set of seed accounts.
+
+`GraphCrawler` pops the highest priority account off a `Frontier`, pages
+through its following (or followers) list and queues every account it
+discovers one level deeper. The priority is a weighted sum of scores,
+breadth first by default::
+
+    frontier = Frontier(scores=[
+        (1.0, depth_score),
+        (0.5, follower_count_score),
+        (10.0, watchlist_score({'heysamtexas'})),
+    ])
+    graph = GraphCrawler(crawler, sink, frontier=frontier, budget=5000)
+    graph.seed(['jack'])
+    graph.run()
+"""
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import (
+    Twitter404Exception,
+    Twitter429Exception,
+    TwitterNoAvailableAPIs,
+)
+
+logger = logging.getLogger(__name__)
+
+# A score gets the candidate account: its username, depth and the user
+# object it was discovered with (None for seeds).
+Score = Callable[[Dict], float]
+
+
+def depth_score(candidate: Dict) -> float:
+    """Prefer shallow accounts, a breadth first crawl on its own."""
+    return -candidate['depth']
+
+
+def follower_count_score(candidate: Dict) -> float:
+    """Prefer popular accounts, on a log scale."""
+    user = candidate['user'] or {}
+    return math.log10(1 + (user.get('followers_count') or 0))
+
+
+def watchlist_score(watchlist: Iterable[str]) -> Score:
+    """
+    Build a score of 1 for the accounts mentioning a watched term.
+
+    Arguments:
+        watchlist: Usernames or words matched against the screen name and
+        description, case insensitive
+    """
+    terms = {term.lower().strip('@#') for term in watchlist}
+
+    def score(candidate: Dict) -> float:
+        user = candidate['user'] or {}
+        text = f'{candidate["username"]} {user.get("description") or ""}'
+        words = {word.strip('@#.,:;!?').lower() for word in text.split()}
+        return 1.0 if words & terms else 0.0
+
+    return score
+
+
+class Frontier(object):
+
+    def __init__(
+        self,
+        scores: Optional[List[Tuple[float, Score]]] = None,
+        visited=None,
+    ):
+        """
+        Priority queue of the accounts left to crawl.
+
+        Every account is queued at most once, ties are popped in the order
+        they were pushed. Accounts pushed with their user object are
+        deduplicated on the user ID, the others (eg. seeds) on their
+        username, case insensitively. The usernames in visited only serve
+        as a pre-check in front of an exact set of those few names, so a
+        Bloom filter false positive never drops an account.
+
+        Arguments:
+            scores: Weights and score functions summed into the priority,
+            breadth first (depth_score only) if None
+            visited: Where the queued IDs and usernames are remembered, a
+            set if None, a `twitter_api_crawler.visited.VisitedSet` for huge
+            crawls
+        """
+        self.scores = scores or [(1.0, depth_score)]
+        self.seen = set() if visited is None else visited
+        # Exact usernames of the accounts queued without a user ID.
+        self._names = set()
+        self._heap: List[Tuple] = []
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def push(self, username: str, depth: int = 0, user: Dict = None) -> bool:
+        """
+        Queue an account unless it was queued before.
+
+        Returns
+            True if the account was queued
+        """
+        candidate = {'username': username, 'depth': depth, 'user': user}
+        priority = sum(
+            weight * score(candidate) for weight, score in self.scores
+        )
+
+        name = username.lower()
+        user_id = (user or {}).get('id')
+
+        with self._lock:
+            if name in self.seen and name in self._names:
+                return False
+
+            if isinstance(user_id, int):
+                if user_id in self.seen:
+                    return False
+                self.seen.add(user_id)
+            else:
+                self._names.add(name)
+
+            self.seen.add(name)
+            heapq.heappush(
+                self._heap,
+                (-priority, next(self._counter), username, depth),
+            )
+
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        """
+        Take the highest priority account.
+
+        Returns
+            The username and its depth
+
+        Raises
+            IndexError: if the frontier is empty
+        """
+        with self._lock:
+            _, _, username, depth = heapq.heappop(self._heap)
+
+        return username, depth
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+
+class GraphCrawler(object):
+
+    def __init__(
+        self,
+        crawler: TwitterAPIv1Crawler,
+        sink,
+        relationship: str = 'following',
+        frontier: Optional[Frontier] = None,
+        max_depth: int = 2,
+        budget: Optional[int] = None,
+        max_pages: Optional[int] = None,
+    ):
+        """
+        Expand the graph from seed accounts.
+
+        Arguments:
+            crawler: Supplies the API clients
+            sink: Receives the users of every page, tagged with crawled_from,
+            relationship and depth
+            relationship: `following` or `followers`
+            frontier: A Frontier, breadth first if None
+            max_depth: Accounts deeper than this are written but not crawled
+            budget: Requests sent in total (429s included), None for no limit
+            max_pages: Pages crawled per account, None for the whole list
+        """
+        self.crawler = crawler
+        self.sink = sink
+        self.relationship = relationship
+        self.frontier = frontier or Frontier()
+        self.max_depth = max_depth
+        self.budget = budget
+        self.max_pages = max_pages
+
+        self.requests = 0
+        self.visited: List[str] = []
+
+    def seed(self, usernames: Iterable[str]) -> None:
+        for username in usernames:
+            self.frontier.push(username, 0)
+
+    def run(self) -> Dict:
+        """
+        Crawl until the frontier is empty or the budget is spent.
+
+        While every API client is asleep the crawl waits for the first one
+        to wake up.
+
+        Returns
+            Python dict containing visited (number of accounts crawled),
+            queued (accounts left in the frontier), requests and
+            exhausted (True if the budget ran out)
+        """
+        while len(self.frontier) and not self.exhausted():
+            username, depth = self.frontier.pop()
+            self._crawl_account(username, depth)
+            self.visited.append(username)
+
+        return {
+            'visited': len(self.visited),
+            'queued': len(self.frontier),
+            'requests': self.requests,
+            'exhausted': self.exhausted(),
+        }
+
+    def exhausted(self) -> bool:
+        return self.budget is not None and self.requests >= self.budget
+
+    def _crawl_account(self, username: str, depth: int) -> None:
+        if self.relationship == 'followers':
+            get_page = self.crawler.get_followers
+        else:
+            get_page = self.crawler.get_following
+
+        cursor = -1
+        pages = 0
+
+        while cursor != 0 and not self.exhausted():
+            if self.max_pages is not None and pages >= self.max_pages:
+                break
+
+            try:
+                self.requests += 1
+                page = get_page(username, cursor)
+            except Twitter429Exception:
+                continue
+            except TwitterNoAvailableAPIs:
+                self.requests -= 1
+                time.sleep(self.crawler.seconds_until_available())
+                continue
+            except Twitter404Exception:
+                logger.info(f'{username} not found, skipping')
+                break
+
+            pages += 1
+            cursor = page['cursor']
+            self._discovered(username, depth, page['users'])
+
+    def _discovered(
+        self,
+        username: str,
+        depth: int,
+        users: List[Dict],
+    ) -> None:
+        for user in users:
+            user['crawled_from'] = username
+            user['relationship'] = self.relationship
+            user['depth'] = depth + 1
+
+            # Protected accounts answer 401 to list requests.
+            if depth < self.max_depth and not user.get('protected'):
+                self.frontier.push(user['screen_name'], depth + 1, user)
+
+        with self.crawler.profiler.phase('sink'):
+            self.sink.write(users)
@@ -0,0 +1,233 @@
+"""
+Follower graph held in NumPy arrays for fast set operations.
+
+Accounts are interned to dense integer node ids and the edges stored twice
+in CSR form (compressed sparse rows): once by follower, once by followed
+account. Every row is a sorted array, so mutual follows, common followers
+and audience overlap are vectorized intersections instead of Python sets.
+Build it from the files an `NDJSONSink` published::
+
+    records = (
+        json.loads(line)
+        for path in sink.paths
+        for line in gzip.open(path, 'rt')
+    )
+    graph = FollowerGraph.from_records(records)
+    graph.overlap('nike', 'adidas')
+
+Needs the optional `numpy` dependency.
+"""
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+
+try:
+    import numpy
+except ImportError:  # optional dependency, see FollowerGraph
+    numpy = None  # type: ignore
+
+
+class FollowerGraph(object):
+
+    def __init__(self, labels: List[Hashable], sources, targets):
+        """
+        Build the graph from edge arrays, use the from_* constructors.
+
+        Arguments:
+            labels: Account of every node id (screen names or Twitter IDs)
+            sources: Node ids of the followers, one per edge
+            targets: Node ids of the followed accounts, one per edge
+
+        Raises:
+            TwitterAPIClientException: if numpy is not installed
+        """
+        if numpy is None:
+            raise TwitterAPIClientException(
+                'FollowerGraph needs numpy: '
+                + 'pip install twitter_api_crawler[graph]',
+            )
+
+        self.labels = labels
+        self.index = {label: node for node, label in enumerate(labels)}
+
+        size = max(len(labels), 1)
+        sources = numpy.asarray(sources, dtype=numpy.int64)
+        targets = numpy.asarray(targets, dtype=numpy.int64)
+
+        # Sorting the packed edges dedupes them and orders every row.
+        edges = numpy.unique(sources * size + targets)
+        sources, targets = numpy.divmod(edges, size)
+        self.following_indptr, self.following_indices = _csr(
+            sources,
+            targets,
+            len(labels),
+        )
+
+        # Edges are sorted by follower, a stable sort by followed account
+        # keeps the followers of every account sorted.
+        order = numpy.argsort(targets, kind='stable')
+        self.followers_indptr, self.followers_indices = _csr(
+            targets[order],
+            sources[order],
+            len(labels),
+        )
+
+    @classmethod
+    def from_edges(
+        cls,
+        edges: Iterable[Tuple[Hashable, Hashable]],
+    ) -> 'FollowerGraph':
+        """
+        Build the graph from (follower, followed) pairs of account labels.
+        """
+        labels: List[Hashable] = []
+        index: Dict[Hashable, int] = {}
+        sources = []
+        targets = []
+
+        for follower, followed in edges:
+            for label in (follower, followed):
+                if label not in index:
+                    index[label] = len(labels)
+                    labels.append(label)
+            sources.append(index[follower])
+            targets.append(index[followed])
+
+        return cls(labels, sources, targets)
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict]) -> 'FollowerGraph':
+        """
+        Build the graph from crawl output.
+
+        Records are user objects tagged with `crawled_from` and
+        `relationship`, as written to the sinks. Accounts are labelled by
+        their lowercased screen name.
+        """
+        def edges():
+            for record in records:
+                crawled = record['crawled_from'].lower()
+                user = record['screen_name'].lower()
+                if record['relationship'] == 'followers':
+                    yield user, crawled
+                else:
+                    yield crawled, user
+
+        return cls.from_edges(edges())
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    @property
+    def edges(self) -> int:
+        return len(self.following_indices)
+
+    def node(self, label: Hashable) -> int:
+        """
+        Return the node id of an account.
+
+        Raises
+            KeyError: if the account is not in the graph
+        """
+        if label not in self.index and isinstance(label, str):
+            label = label.lower()
+        return self.index[label]
+
+    def following(self, label: Hashable):
+        """Return the sorted node ids the account follows."""
+        node = self.node(label)
+        start, end = self.following_indptr[node:node + 2]
+        return self.following_indices[start:end]
+
+    def followers(self, label: Hashable):
+        """Return the sorted node ids following the account."""
+        node = self.node(label)
+        start, end = self.followers_indptr[node:node + 2]
+        return self.followers_indices[start:end]
+
+    def to_labels(self, nodes) -> List[Hashable]:
+        return [self.labels[node] for node in nodes]
+
+    def mutual(self, label: Hashable):
+        """Return the node ids the account follows that follow it back."""
+        return intersect(self.following(label), self.followers(label))
+
+    def common_followers(self, first: Hashable, second: Hashable):
+        return intersect(self.followers(first), self.followers(second))
+
+    def common_following(self, first: Hashable, second: Hashable):
+        return intersect(self.following(first), self.following(second))
+
+    def overlap(self, first: Hashable, second: Hashable) -> Dict:
+        """
+        Compare the audiences (followers) of two accounts.
+
+        Returns
+            A dict with the common, first_only and second_only follower
+            counts and their jaccard and overlap coefficients
+        """
+        first_followers = self.followers(first)
+        second_followers = self.followers(second)
+        common = len(intersect(first_followers, second_followers))
+        union = len(first_followers) + len(second_followers) - common
+        smallest = min(len(first_followers), len(second_followers))
+
+        return {
+            'common': common,
+            'first_only': len(first_followers) - common,
+            'second_only': len(second_followers) - common,
+            'jaccard': common / union if union else 0.0,
+            'overlap': common / smallest if smallest else 0.0,
+        }
+
+    def degrees(self) -> Tuple:
+        """Return the in (followers) and out (following) degree arrays."""
+        return (
+            numpy.diff(self.followers_indptr),
+            numpy.diff(self.following_indptr),
+        )
+
+    def degree_stats(self) -> Dict:
+        """
+        Summarize the degree distributions.
+
+        Returns
+            Nodes, edges and the mean, median, p99 and max of the followers
+            and following degrees
+        """
+        stats = {'nodes': len(self), 'edges': self.edges}
+        for name, degrees in zip(('followers', 'following'), self.degrees()):
+            if not len(degrees):
+                degrees = numpy.zeros(1, dtype=numpy.int64)
+            stats[name] = {
+                'mean': float(degrees.mean()),
+                'median': float(numpy.median(degrees)),
+                'p99': float(numpy.percentile(degrees, 99)),
+                'max': int(degrees.max()),
+            }
+
+        return stats
+
+
+def intersect(first, second):
+    """
+    Intersect two sorted arrays of unique values.
+
+    Binary searches the smaller array in the larger one, O(m log n) in
+    vectorized code instead of sorting both like numpy.intersect1d.
+    """
+    if len(first) > len(second):
+        first, second = second, first
+    if not len(first):
+        return first
+
+    positions = numpy.searchsorted(second, first)
+    positions[positions == len(second)] = 0
+    return first[second[positions] == first]
+
+
+def _csr(rows, columns, size: int) -> Tuple:
+    """Turn row sorted (row, column) pairs into indptr and indices arrays."""
+    indptr = numpy.zeros(size + 1, dtype=numpy.int64)
+    numpy.cumsum(numpy.bincount(rows, minlength=size), out=indptr[1:])
+    return indptr, columns.astype(numpy.int32)
@@ -0,0 +1,66 @@
+"""
+Health of the API keys, used by the crawler to pick the next key.
+
+Every `TwitterAPIv1` keeps a `KeyHealth` tracking the moving averages of
+its latency and error rate. Together with the share of the endpoint quota
+left they make a score, higher is healthier, that the `weighted` key
+strategy of `TwitterAPIv1Crawler` uses as the key's weight.
+"""
+import threading
+from typing import Optional
+
+# Weight of the latest request in the moving averages.
+SMOOTHING = 0.2
+
+# Lowest score a key gets, so degraded keys are still probed now and then
+# and get a chance to recover.
+MIN_SCORE = 0.05
+
+
+class KeyHealth(object):
+
+    def __init__(self, smoothing: float = SMOOTHING):
+        """
+        Track the latency and error rate of a key.
+
+        Arguments:
+            smoothing: Weight of the latest request in the averages
+        """
+        self.smoothing = smoothing
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def record(self, elapsed: float, error: bool = False) -> None:
+        """
+        Add a request to the averages.
+
+        Arguments:
+            elapsed: Seconds the request took
+            error: The request failed (5xx or connection error)
+        """
+        with self._lock:
+            self.requests += 1
+            if self.latency is None:
+                self.latency = elapsed
+            else:
+                self.latency += self.smoothing * (elapsed - self.latency)
+            self.error_rate += self.smoothing * (error - self.error_rate)
+
+    def score(self, quota_left: Optional[float] = None) -> float:
+        """
+        Score the key, 1 for an idle key with no history.
+
+        Arguments:
+            quota_left: Share of the endpoint quota left (0 to 1), None
+            when unknown
+
+        Returns
+            The share of requests succeeding, scaled down by the latency
+            in seconds and the quota used
+        """
+        quota = 1.0 if quota_left is None else quota_left
+        latency = self.latency or 0.0
+        score = quota * (1 - self.error_rate) / (1 + latency)
+        return max(score, MIN_SCORE)
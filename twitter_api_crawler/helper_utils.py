@@ -1,5 +1,6 @@
+import datetime
 import re
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import logging
 import requests
@@ -8,6 +9,20 @@ logger = logging.getLogger(__name__)
 
 MAX_ENS_DOMAIN_LENGTH = 50  # arbitrary. I don't know the actual length
 
+# Quotes inside JSON strings are escaped, so this only matches the key.
+NEXT_CURSOR_RE = re.compile(rb'"next_cursor"\s*:\s*(-?\d+)')
+
+V2_CREATED_AT_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+V1_CREATED_AT_FORMAT = '%a %b %d %H:%M:%S +0000 %Y'
+
+# v2 public_metrics and the v1.1 counts they stand for.
+V2_PUBLIC_METRICS = {
+    'followers_count': 'followers_count',
+    'following_count': 'friends_count',
+    'tweet_count': 'statuses_count',
+    'listed_count': 'listed_count',
+}
+
 
 def get_ens_domains_from_text(text: str) -> List[str]:
     """
@@ -116,6 +131,62 @@ def sanitize(string: str) -> str:
     return string.replace('\x00', '').replace(r'\u0000', '')
 
 
+def get_next_cursor(body: bytes) -> Optional[int]:
+    """
+    Read next_cursor out of a raw list response without decoding it.
+
+    Parameters
+        body: The response body of a cursored endpoint, eg. friends/list
+
+    Returns
+        The next cursor (0 on the last page), None if the body has none
+    """
+    # Twitter puts the cursors after the users, search from the end.
+    start = body.rfind(b'"next_cursor"')
+    if start == -1:
+        return None
+
+    match = NEXT_CURSOR_RE.match(body, start)
+    return int(match.group(1)) if match else None
+
+
+def user_from_v2(user: Dict) -> Dict:
+    """
+    Convert a v2 user object to the v1.1 shape the rest of the crawler uses.
+
+    username becomes screen_name, the id an int (id_str keeps the string),
+    public_metrics become the v1.1 counts and created_at the v1.1 format.
+    Other fields, eg. entities, are kept as they are.
+
+    Parameters
+        user: API v2 user object
+
+    Returns
+        A new user dict
+    """
+    converted = {
+        key: value for key, value in user.items()
+        if key not in {'username', 'public_metrics'}
+    }
+    converted['id'] = int(user['id'])
+    converted['id_str'] = str(user['id'])
+    converted['screen_name'] = user['username']
+
+    metrics = user.get('public_metrics') or {}
+    for name, v1_name in V2_PUBLIC_METRICS.items():
+        if name in metrics:
+            converted[v1_name] = metrics[name]
+
+    if user.get('created_at'):
+        created_at = datetime.datetime.strptime(
+            user['created_at'],
+            V2_CREATED_AT_FORMAT,
+        )
+        converted['created_at'] = created_at.strftime(V1_CREATED_AT_FORMAT)
+
+    return converted
+
+
 def get_mentions(response: Dict) -> List[str]:
     """
     Given an API response status object.
@@ -0,0 +1,158 @@
+"""
+Key quota and sleep state shared by every process using the same credentials.
+
+Without it each process rediscovers a 429 on its own and a restarted process
+forgets which keys are asleep. `SQLiteKeyState` keeps the state in a database
+file in WAL mode that `TwitterAPIv1Crawler` consults and updates atomically.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from twitter_api_crawler.sqlite_utils import Transaction, connect
+
+
+class SQLiteKeyState(object):
+
+    def __init__(self, path: str, timeout: float = 30):
+        """
+        Open (or create) the shared key state database.
+
+        Arguments:
+            path: Database file shared by the processes
+            timeout: Seconds to wait for the database lock
+        """
+        self.connection = connect(path, timeout)
+        self._lock = threading.Lock()
+        self.connection.executescript(
+            '''
+            CREATE TABLE IF NOT EXISTS key_sleep (
+                key TEXT PRIMARY KEY,
+                sleep_until REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS key_quota (
+                key TEXT NOT NULL,
+                endpoint TEXT NOT NULL,
+                remaining INTEGER NOT NULL,
+                reset REAL NOT NULL,
+                PRIMARY KEY (key, endpoint)
+            );
+            ''',
+        )
+
+    def sleep(self, key: str, until: float) -> None:
+        """
+        Put a key to sleep until the given epoch time.
+
+        A key that is already asleep for longer keeps its later wake-up time.
+        """
+        with self._transaction() as cursor:
+            cursor.execute(
+                'INSERT INTO key_sleep (key, sleep_until) VALUES (?, ?) '
+                + 'ON CONFLICT (key) DO UPDATE SET '
+                + 'sleep_until = MAX(sleep_until, excluded.sleep_until)',
+                (key, until),
+            )
+
+    def wakeup(self, key: str) -> None:
+        with self._transaction() as cursor:
+            cursor.execute('DELETE FROM key_sleep WHERE key = ?', (key,))
+
+    def sleep_until(self, key: str) -> Optional[float]:
+        """
+        Return when a sleeping key wakes up.
+
+        Returns
+            An epoch time or None when the key is awake
+        """
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT sleep_until FROM key_sleep '
+                + 'WHERE key = ? AND sleep_until > ?',
+                (key, time.time()),
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def sleeping(self) -> Dict[str, float]:
+        """Return every sleeping key with its wake-up time."""
+        with self._lock:
+            rows = self.connection.execute(
+                'SELECT key, sleep_until FROM key_sleep WHERE sleep_until > ?',
+                (time.time(),),
+            ).fetchall()
+
+        return dict(rows)
+
+    def update_quota(
+        self,
+        key: str,
+        endpoint: str,
+        remaining: int,
+        reset: float,
+    ) -> None:
+        """Record the quota the API reported in its x-rate-limit headers."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                'INSERT OR REPLACE INTO key_quota '
+                + '(key, endpoint, remaining, reset) VALUES (?, ?, ?, ?)',
+                (key, endpoint, remaining, reset),
+            )
+
+    def try_acquire(
+        self,
+        key: str,
+        endpoint: str = None,
+    ) -> Tuple[bool, Optional[float]]:
+        """
+        Claim one request of a key's quota.
+
+        Fails when the key is asleep or, once a response told us the quota
+        of the endpoint, when no request is left before its reset time. The
+        check and the decrement happen in one transaction so two processes
+        never spend the same remaining request.
+
+        Returns
+            (True, None) when the caller may send the request with the key,
+            otherwise False and the epoch time the key wakes up or the
+            quota resets
+        """
+        now = time.time()
+
+        with self._transaction() as cursor:
+            asleep = cursor.execute(
+                'SELECT sleep_until FROM key_sleep '
+                + 'WHERE key = ? AND sleep_until > ?',
+                (key, now),
+            ).fetchone()
+            if asleep:
+                return False, asleep[0]
+
+            if endpoint is None:
+                return True, None
+
+            row = cursor.execute(
+                'SELECT remaining, reset FROM key_quota '
+                + 'WHERE key = ? AND endpoint = ? AND reset > ?',
+                (key, endpoint, now),
+            ).fetchone()
+            if row is None:
+                return True, None
+
+            remaining, reset = row
+            if remaining <= 0:
+                return False, reset
+
+            cursor.execute(
+                'UPDATE key_quota SET remaining = remaining - 1 '
+                + 'WHERE key = ? AND endpoint = ?',
+                (key, endpoint),
+            )
+
+        return True, None
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _transaction(self) -> Transaction:
+        return Transaction(self.connection, self._lock)
@@ -0,0 +1,209 @@
+"""
+Metrics instrumentation for the API clients and the crawler.
+
+The clients and the crawler report counters, gauges and histograms to a
+`MetricsSink`. The default sink does nothing and is skipped entirely on the
+hot path, `InMemoryMetrics` keeps the values around for inspection and
+`PrometheusMetrics` renders them in the Prometheus text exposition format.
+"""
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsSink(object):
+    """
+    A sink that drops everything.
+
+    Subclasses set `enabled` to True, callers check it before building labels
+    so an unconfigured client pays a single attribute lookup per request.
+    """
+
+    enabled = False
+
+    def increment(self, name: str, value: float = 1, labels: Dict = None):
+        """Add value to a counter."""
+
+    def gauge(self, name: str, value: float, labels: Dict = None):
+        """Set a gauge to value."""
+
+    def observe(self, name: str, value: float, labels: Dict = None):
+        """Record value in a histogram."""
+
+
+NULL_METRICS = MetricsSink()
+
+
+class InMemoryMetrics(MetricsSink):
+
+    enabled = True
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Keep every metric in memory.
+
+        Arguments:
+            buckets: Upper bounds of the histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.counters: Dict[str, Dict[LabelSet, float]] = {}
+        self.gauges: Dict[str, Dict[LabelSet, float]] = {}
+        self.histograms: Dict[str, Dict[LabelSet, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, labels: Dict = None):
+        key = _label_set(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, labels: Dict = None):
+        key = _label_set(labels)
+        with self._lock:
+            self.gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name: str, value: float, labels: Dict = None):
+        key = _label_set(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            # per bucket counts, then +Inf count and the sum
+            state = series.setdefault(key, [0] * (len(self.buckets) + 2))
+            state[bisect_left(self.buckets, value)] += 1
+            state[-1] += value
+
+    def get(self, name: str, labels: Dict = None) -> Optional[float]:
+        """
+        Read the current value of a counter or gauge.
+
+        Returns
+            The value or None if the series was never reported
+        """
+        key = _label_set(labels)
+        for metric_type in (self.counters, self.gauges):
+            if key in metric_type.get(name, {}):
+                return metric_type[name][key]
+
+        return None
+
+    def count(self, name: str, labels: Dict = None) -> int:
+        """Return how many values a histogram series has observed."""
+        state = self.histograms.get(name, {}).get(_label_set(labels))
+        return sum(state[:-1]) if state else 0
+
+
+class PrometheusMetrics(InMemoryMetrics):
+
+    def __init__(
+        self,
+        prefix: str = 'twitter_api_crawler_',
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        """
+        Collect metrics and render them for a Prometheus scrape.
+
+        Arguments:
+            prefix: Prepended to every metric name
+            buckets: Upper bounds of the histogram buckets
+        """
+        super().__init__(buckets)
+        self.prefix = prefix
+
+    def render(self) -> str:
+        """Return every metric in the text exposition format."""
+        lines = []
+
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                lines.append(f'# TYPE {self.prefix}{name} counter')
+                lines.extend(self._samples(name, series))
+
+            for name, series in sorted(self.gauges.items()):
+                lines.append(f'# TYPE {self.prefix}{name} gauge')
+                lines.extend(self._samples(name, series))
+
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f'# TYPE {self.prefix}{name} histogram')
+                for labels, state in sorted(histogram.items()):
+                    lines.extend(self._histogram(name, labels, state))
+
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, host: str = '', port: int = 9100) -> ThreadingHTTPServer:
+        """
+        Expose `render()` over HTTP from a daemon thread.
+
+        Returns
+            The running server, call `shutdown()` on it to stop
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self) -> None:
+                content = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args) -> None:
+                """Keep scrapes out of stderr."""
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def _samples(self, name: str, series: Dict[LabelSet, float]) -> List[str]:
+        return [
+            f'{self.prefix}{name}{_format_labels(labels)} {_number(value)}'
+            for labels, value in sorted(series.items())
+        ]
+
+    def _histogram(
+        self,
+        name: str,
+        labels: LabelSet,
+        state: List[float],
+    ) -> List[str]:
+        lines = []
+        metric = self.prefix + name
+        cumulative = 0
+        bounds = [_number(_) for _ in self.buckets] + ['+Inf']
+
+        for bound, bucket_count in zip(bounds, state[:-1]):
+            cumulative += bucket_count
+            bucket_labels = _format_labels(labels + (('le', bound),))
+            lines.append(f'{metric}_bucket{bucket_labels} {cumulative}')
+
+        suffix = _format_labels(labels)
+        lines.append(f'{metric}_sum{suffix} {_number(state[-1])}')
+        lines.append(f'{metric}_count{suffix} {cumulative}')
+        return lines
+
+
+def _label_set(labels: Optional[Dict]) -> LabelSet:
+    if not labels:
+        return ()
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ''
+
+    escaped = (
+        (name, value.replace('\\', r'\\').replace('"', r'\"'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{k}="{v}"' for k, v in escaped) + '}'
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
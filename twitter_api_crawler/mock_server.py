@@ -0,0 +1,818 @@
+"""
+A local stand-in for the Twitter v1.1 API and the v2 user endpoints.
+
+Serves lookups, follow lists and timelines from a synthetic graph,
+paginates with cursors (max_id for timelines) and enforces per key / per
+endpoint rate-limits the same way the real API does. Latency, 503s and
+NUL-laden payloads can be injected so the retry and scheduling code paths
+can be exercised offline and reproducibly.
+
+Run it standalone with::
+
+    python -m twitter_api_crawler.mock_server --port 8000 --users 5000
+"""
+import argparse
+import base64
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_WINDOW = 15 * 60
+
+# Per-window request limits for user-context keys.
+DEFAULT_RATE_LIMITS = {
+    'users/lookup': 900,
+    'followers/list': 15,
+    'friends/list': 15,
+    'followers/ids': 15,
+    'friends/ids': 15,
+    'friendships/lookup': 15,
+    'friendships/show': 180,
+    'statuses/user_timeline': 900,
+    '2/users/by': 900,
+    '2/users/:id/followers': 15,
+    '2/users/:id/following': 15,
+}
+
+# App-only (bearer token) limits where they differ from the user ones.
+DEFAULT_APP_RATE_LIMITS = {
+    'users/lookup': 300,
+    'friendships/show': 15,
+    'statuses/user_timeline': 1500,
+    '2/users/by': 300,
+}
+
+# Endpoints that refuse app-only requests.
+USER_CONTEXT_ENDPOINTS = frozenset({'friendships/lookup'})
+
+V2_USER_LIST_RE = re.compile(r'^2/users/(\d+)/(followers|following)$')
+
+LIST_PAGE_SIZE = 200
+IDS_PAGE_SIZE = 5000
+LOOKUP_MAX_USERS = 100
+V2_PAGE_SIZE = 1000
+TIMELINE_PAGE_SIZE = 200
+# Only the most recent tweets of an account are reachable via the timeline.
+TIMELINE_MAX_TWEETS = 3200
+
+OAUTH_CONSUMER_KEY_RE = re.compile(r'oauth_consumer_key="([^"]+)"')
+
+
+class SyntheticGraph(object):
+
+    def __init__(
+        self,
+        num_users: int = 1000,
+        mean_following: int = 50,
+        seed: int = 0,
+    ):
+        """
+        Build a deterministic follow graph.
+
+        Out-degrees are drawn from a heavy tailed distribution so a handful of
+        accounts are followed by most of the graph, which is what makes real
+        follower crawls expensive.
+
+        Arguments:
+            num_users: Number of accounts in the graph
+            mean_following: Rough average of accounts each user follows
+            seed: Seed for the random generator
+        """
+        rng = random.Random(seed)
+        self.num_users = num_users
+        self.following: Dict[int, List[int]] = {}
+        self.followers: Dict[int, List[int]] = {
+            user_id: [] for user_id in self.ids()
+        }
+
+        population = list(self.ids())
+        cum_weights = list(accumulate(1 / user_id for user_id in population))
+
+        for user_id in population:
+            degree = int(rng.paretovariate(1.5) * mean_following / 3)
+            degree = min(degree, num_users - 1)
+            picked = set(rng.choices(
+                population,
+                cum_weights=cum_weights,
+                k=degree,
+            ))
+            picked.discard(user_id)
+            self.following[user_id] = sorted(picked, reverse=True)
+
+            for followed in self.following[user_id]:
+                self.followers[followed].append(user_id)
+
+        # Newest first, like the API.
+        for follower_list in self.followers.values():
+            follower_list.reverse()
+
+        self.statuses: Dict[int, int] = {
+            user_id: user_id % 1000 for user_id in self.ids()
+        }
+
+    def ids(self):
+        return range(1, self.num_users + 1)
+
+    @staticmethod
+    def screen_name(user_id: int) -> str:
+        return f'user{user_id}'
+
+    def resolve(self, screen_name: str = None, user_id=None) -> Optional[int]:
+        """Translate a screen_name or id into a graph id."""
+        if user_id is not None:
+            user_id = int(user_id)
+            return user_id if user_id in self.following else None
+
+        if screen_name and screen_name.lower().startswith('user'):
+            suffix = screen_name[4:]
+            if suffix.isdigit() and int(suffix) in self.following:
+                return int(suffix)
+
+        return None
+
+    def user(self, user_id: int, nul: bool = False) -> Dict:
+        """Render a v1.1 user object for the id."""
+        screen_name = self.screen_name(user_id)
+        name = f'User {user_id}'
+        mention = self.screen_name(user_id % self.num_users + 1)
+        description = (
+            f'Account {user_id}. Friends with @{mention} #graph{user_id % 7}'
+        )
+
+        if nul:
+            name = f'\x00{name}'
+            description = f'{description}\x00'
+
+        return {
+            'id': user_id,
+            'id_str': str(user_id),
+            'name': name,
+            'screen_name': screen_name,
+            'location': '',
+            'description': description,
+            'url': None,
+            'entities': {'description': {'urls': []}},
+            'protected': False,
+            'followers_count': len(self.followers[user_id]),
+            'friends_count': len(self.following[user_id]),
+            'listed_count': 0,
+            'created_at': 'Sat Oct 15 15:14:51 +0000 2016',
+            'favourites_count': 0,
+            'verified': False,
+            'statuses_count': self.statuses[user_id],
+            'lang': None,
+        }
+
+    def tweet_id(self, user_id: int, number: int) -> int:
+        """Id of the number-th tweet of a user, growing with the number."""
+        return number * (self.num_users + 1) + user_id
+
+    def tweet(self, user_id: int, number: int) -> Dict:
+        """Render the number-th tweet (from 1) of a user."""
+        tweet_id = self.tweet_id(user_id, number)
+        mention = self.screen_name((user_id + number) % self.num_users + 1)
+        hashtag = f'graph{number % 7}'
+        text = f'Tweet {number} to @{mention} #{hashtag}'
+        at = text.index('@')
+        tag = text.index('#')
+
+        return {
+            'id': tweet_id,
+            'id_str': str(tweet_id),
+            'created_at': 'Wed Sep 07 05:14:07 +0000 2022',
+            'text': text,
+            'entities': {
+                'hashtags': [{
+                    'text': hashtag,
+                    'indices': [tag, tag + len(hashtag) + 1],
+                }],
+                'symbols': [],
+                'user_mentions': [{
+                    'screen_name': mention,
+                    'id': int(mention[4:]),
+                    'id_str': mention[4:],
+                    'indices': [at, at + len(mention) + 1],
+                }],
+                'urls': [],
+            },
+            'user': {
+                'id': user_id,
+                'id_str': str(user_id),
+                'screen_name': self.screen_name(user_id),
+            },
+        }
+
+    def post(self, user_id: int) -> Dict:
+        """Add a tweet at the top of a user's timeline."""
+        self.statuses[user_id] += 1
+        return self.tweet(user_id, self.statuses[user_id])
+
+
+class MockTwitterAPI(object):
+
+    def __init__(
+        self,
+        graph: SyntheticGraph = None,
+        rate_limits: Dict[str, int] = None,
+        window: float = RATE_LIMIT_WINDOW,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        nul_rate: float = 0.0,
+        seed: int = 0,
+        accounts: Dict[str, int] = None,
+        app_rate_limits: Dict[str, int] = None,
+    ):
+        """
+        Request handling state shared by every connection of the server.
+
+        Arguments:
+            graph: The synthetic graph to serve, a small one by default
+            rate_limits: Requests allowed per window, keyed by endpoint
+            window: Length of a rate-limit window in seconds
+            latency: Seconds added to every response
+            error_rate: Probability of answering with a 503
+            nul_rate: Probability of a user object carrying NUL characters
+            seed: Seed for the fault injection random generator
+            accounts: Graph id each key authenticates as, keys missing here
+            authenticate as the user named like the key, or else user 1
+            app_rate_limits: Requests allowed per window to bearer tokens,
+            endpoints missing here get the user limits
+        """
+        self.graph = graph or SyntheticGraph()
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS)
+        self.rate_limits.update(rate_limits or {})
+        self.app_rate_limits = dict(DEFAULT_APP_RATE_LIMITS)
+        self.app_rate_limits.update(app_rate_limits or {})
+        self.window = window
+        self.latency = latency
+        self.error_rate = error_rate
+        self.nul_rate = nul_rate
+        self.accounts = accounts or {}
+
+        self.stats: Counter = Counter()
+        self._rng = random.Random(seed)
+        self._windows: Dict[Tuple[str, str], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def handle(
+        self,
+        method: str,
+        path: str,
+        params: Dict[str, str],
+        authorization: str = '',
+    ) -> Tuple[int, Dict[str, str], Dict]:
+        """
+        Answer a single request.
+
+        Returns
+            A tuple of HTTP status, response headers and JSON body
+        """
+        endpoint = path.strip('/')
+        if endpoint.startswith('1.1/'):
+            endpoint = endpoint[len('1.1/'):]
+        if endpoint.endswith('.json'):
+            endpoint = endpoint[:-len('.json')]
+
+        if endpoint == 'oauth2/token':
+            return self._oauth2_token(params, authorization)
+
+        # v2 ids are part of the path, eg. 2/users/12/followers
+        match = V2_USER_LIST_RE.match(endpoint)
+        if match:
+            params = {**params, 'id': match.group(1)}
+            endpoint = f'2/users/:id/{match.group(2)}'
+
+        name = endpoint.replace(':id/', '')
+        if name.startswith('2/'):
+            name = f'v{name}'
+        handler = getattr(self, '_' + name.replace('/', '_'), None)
+        if endpoint not in self.rate_limits or handler is None:
+            return 404, {}, _error(34, 'Sorry, that page does not exist.')
+
+        key = _key_id(authorization)
+        app = authorization.startswith('Bearer ')
+        if app and endpoint in USER_CONTEXT_ENDPOINTS:
+            return 403, {}, _error(
+                220,
+                'Your credentials do not allow access to this resource.',
+            )
+
+        with self._lock:
+            self.stats[('requests', key, endpoint)] += 1
+            allowed, headers = self._consume(key, endpoint, app)
+            fail = self._rng.random() < self.error_rate
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if not allowed:
+            with self._lock:
+                self.stats[('429', key, endpoint)] += 1
+            return 429, headers, _error(88, 'Rate limit exceeded')
+
+        if fail:
+            with self._lock:
+                self.stats[('503', key, endpoint)] += 1
+            return 503, headers, _error(130, 'Over capacity')
+
+        status, body = handler(params, key)
+        return status, headers, body
+
+    def _consume(
+        self,
+        key: str,
+        endpoint: str,
+        app: bool = False,
+    ) -> Tuple[bool, Dict[str, str]]:
+        now = time.time()
+        limit = self.rate_limits[endpoint]
+        if app:
+            limit = self.app_rate_limits.get(endpoint, limit)
+        window = self._windows.get((key, endpoint))
+
+        if window is None or now >= window[0]:
+            window = [now + self.window, 0]
+            self._windows[(key, endpoint)] = window
+
+        allowed = window[1] < limit
+        if allowed:
+            window[1] += 1
+
+        return allowed, {
+            'x-rate-limit-limit': str(limit),
+            'x-rate-limit-remaining': str(limit - window[1]),
+            'x-rate-limit-reset': str(int(window[0])),
+        }
+
+    def _nul(self) -> bool:
+        if not self.nul_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.nul_rate
+
+    def _oauth2_token(
+        self,
+        params: Dict[str, str],
+        authorization: str,
+    ) -> Tuple[int, Dict[str, str], Dict]:
+        """Issue a bearer token for the API key of a Basic auth header."""
+        if params.get('grant_type') != 'client_credentials':
+            return 403, {}, _error(99, 'Unable to verify your credentials')
+
+        try:
+            credentials = base64.b64decode(authorization.split(' ', 1)[1])
+            api_key = credentials.decode().split(':', 1)[0]
+        except (IndexError, ValueError):
+            return 403, {}, _error(99, 'Unable to verify your credentials')
+
+        return 200, {}, {
+            'token_type': 'bearer',
+            'access_token': f'app-{api_key}',
+        }
+
+    def _users_lookup(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        graph = self.graph
+        found = []
+
+        if 'user_id' in params:
+            wanted = params['user_id'].split(',')[:LOOKUP_MAX_USERS]
+            found = [graph.resolve(user_id=_) for _ in wanted if _.isdigit()]
+        elif 'screen_name' in params:
+            wanted = params['screen_name'].split(',')[:LOOKUP_MAX_USERS]
+            found = [graph.resolve(screen_name=_.strip()) for _ in wanted]
+
+        users = [graph.user(_, self._nul()) for _ in found if _]
+        if not users:
+            return 404, _error(17, 'No user matches for specified terms.')
+
+        return 200, users
+
+    def _followers_list(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        return self._page(params, self.graph.followers, 'users')
+
+    def _friends_list(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        return self._page(params, self.graph.following, 'users')
+
+    def _followers_ids(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        return self._page(params, self.graph.followers, 'ids')
+
+    def _friends_ids(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        return self._page(params, self.graph.following, 'ids')
+
+    def _friendships_lookup(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, List[Dict]]:
+        graph = self.graph
+        account = self._account(key)
+
+        if 'user_id' in params:
+            wanted = params['user_id'].split(',')[:LOOKUP_MAX_USERS]
+            found = [graph.resolve(user_id=_) for _ in wanted if _.isdigit()]
+        else:
+            wanted = params.get('screen_name', '').split(',')
+            found = [
+                graph.resolve(screen_name=_.strip())
+                for _ in wanted[:LOOKUP_MAX_USERS]
+            ]
+
+        relationships = []
+        for user_id in found:
+            if user_id is None:
+                continue
+
+            connections = []
+            if user_id in graph.following[account]:
+                connections.append('following')
+            if account in graph.following[user_id]:
+                connections.append('followed_by')
+
+            relationships.append({
+                'name': f'User {user_id}',
+                'screen_name': graph.screen_name(user_id),
+                'id': user_id,
+                'id_str': str(user_id),
+                'connections': connections or ['none'],
+            })
+
+        return 200, relationships
+
+    def _friendships_show(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        graph = self.graph
+        source = graph.resolve(
+            screen_name=params.get('source_screen_name'),
+            user_id=params.get('source_id'),
+        )
+        target = graph.resolve(
+            screen_name=params.get('target_screen_name'),
+            user_id=params.get('target_id'),
+        )
+        if source is None or target is None:
+            return 404, _error(50, 'User not found.')
+
+        following = target in graph.following[source]
+        followed_by = source in graph.following[target]
+
+        def side(user_id, follows, followed):
+            return {
+                'id': user_id,
+                'id_str': str(user_id),
+                'screen_name': graph.screen_name(user_id),
+                'following': follows,
+                'followed_by': followed,
+            }
+
+        return 200, {
+            'relationship': {
+                'source': side(source, following, followed_by),
+                'target': side(target, followed_by, following),
+            },
+        }
+
+    def _statuses_user_timeline(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, List[Dict]]:
+        graph = self.graph
+        user_id = graph.resolve(
+            screen_name=params.get('screen_name'),
+            user_id=params.get('user_id'),
+        )
+        if user_id is None:
+            return 404, _error(34, 'Sorry, that page does not exist.')
+
+        count = min(int(params.get('count', 20)), TIMELINE_PAGE_SIZE)
+        total = graph.statuses[user_id]
+        step = graph.num_users + 1
+
+        # Tweet numbers in (low, high], newest first.
+        high = total
+        if params.get('max_id'):
+            high = min(high, (int(params['max_id']) - user_id) // step)
+        low = max(total - TIMELINE_MAX_TWEETS, 0)
+        if params.get('since_id'):
+            low = max(low, (int(params['since_id']) - user_id) // step)
+
+        numbers = range(high, max(low, high - count), -1)
+        return 200, [graph.tweet(user_id, number) for number in numbers]
+
+    def _v2_users_by(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        fields = _csv(params.get('user.fields'))
+        wanted = _csv(params.get('usernames'))[:LOOKUP_MAX_USERS]
+        body: Dict = {}
+
+        for username in wanted:
+            user_id = self.graph.resolve(screen_name=username)
+            if user_id is None:
+                body.setdefault('errors', []).append(_v2_not_found(username))
+            else:
+                body.setdefault('data', []).append(
+                    self._v2_user(user_id, fields),
+                )
+
+        return 200, body
+
+    def _v2_users_followers(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        return self._v2_page(params, self.graph.followers)
+
+    def _v2_users_following(
+        self,
+        params: Dict[str, str],
+        key: str,
+    ) -> Tuple[int, Dict]:
+        return self._v2_page(params, self.graph.following)
+
+    def _v2_page(
+        self,
+        params: Dict[str, str],
+        adjacency: Dict[int, List[int]],
+    ) -> Tuple[int, Dict]:
+        user_id = self.graph.resolve(user_id=params['id'])
+        if user_id is None:
+            return 200, {'errors': [_v2_not_found(params['id'])]}
+
+        count = min(int(params.get('max_results', 100)), V2_PAGE_SIZE)
+        offset = int(params.get('pagination_token') or 0)
+        fields = _csv(params.get('user.fields'))
+
+        related = adjacency[user_id]
+        page = related[offset:offset + count]
+        body: Dict = {'meta': {'result_count': len(page)}}
+        if page:
+            body['data'] = [self._v2_user(_, fields) for _ in page]
+        if offset + count < len(related):
+            body['meta']['next_token'] = str(offset + count)
+
+        return 200, body
+
+    def _v2_user(self, user_id: int, fields: List[str]) -> Dict:
+        """Render a v2 user object with the requested fields."""
+        user = self.graph.user(user_id, self._nul())
+        available = {
+            'created_at': '2016-10-15T15:14:51.000Z',
+            'description': user['description'],
+            'entities': user['entities'],
+            'location': user['location'],
+            'protected': user['protected'],
+            'public_metrics': {
+                'followers_count': user['followers_count'],
+                'following_count': user['friends_count'],
+                'tweet_count': user['statuses_count'],
+                'listed_count': user['listed_count'],
+            },
+            'url': user['url'] or '',
+            'verified': user['verified'],
+        }
+
+        rendered = {
+            'id': user['id_str'],
+            'name': user['name'],
+            'username': user['screen_name'],
+        }
+        for field in fields:
+            if field in available:
+                rendered[field] = available[field]
+
+        return rendered
+
+    def _account(self, key: str) -> int:
+        """Return the graph id a key authenticates as."""
+        if key in self.accounts:
+            return self.accounts[key]
+        return self.graph.resolve(screen_name=key) or 1
+
+    def _page(
+        self,
+        params: Dict[str, str],
+        adjacency: Dict[int, List[int]],
+        kind: str,
+    ) -> Tuple[int, Dict]:
+        user_id = self.graph.resolve(
+            screen_name=params.get('screen_name'),
+            user_id=params.get('user_id'),
+        )
+        if user_id is None:
+            return 404, _error(34, 'Sorry, that page does not exist.')
+
+        max_count = LIST_PAGE_SIZE if kind == 'users' else IDS_PAGE_SIZE
+        count = min(int(params.get('count', 20)), max_count)
+        cursor = int(params.get('cursor', -1))
+        offset = max(cursor, 0)
+
+        related = adjacency[user_id]
+        page = related[offset:offset + count]
+        next_cursor = offset + count if offset + count < len(related) else 0
+
+        if kind == 'users':
+            items = [self.graph.user(_, self._nul()) for _ in page]
+            if params.get('include_user_entities') == 'false':
+                for item in items:
+                    del item['entities']
+        else:
+            items = page
+
+        return 200, {
+            kind: items,
+            'next_cursor': next_cursor,
+            'next_cursor_str': str(next_cursor),
+            'previous_cursor': -offset if offset else 0,
+            'previous_cursor_str': str(-offset if offset else 0),
+        }
+
+
+class MockTwitterServer(object):
+
+    def __init__(
+        self,
+        api: MockTwitterAPI = None,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ):
+        """
+        Serve a MockTwitterAPI over HTTP in a background thread.
+
+        Arguments:
+            api: Request handling state, a default MockTwitterAPI if omitted
+            host: Interface to bind to
+            port: Port to bind to, 0 picks a free one
+        """
+        self.api = api or MockTwitterAPI()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.mock_api = self.api  # type: ignore
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """Root URL to pass to `TwitterAPIv1(base_url=...)`."""
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/1.1'
+
+    def start(self) -> 'MockTwitterServer':
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever,
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> 'MockTwitterServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        self._dispatch('GET')
+
+    def do_POST(self) -> None:
+        self._dispatch('POST')
+
+    def _dispatch(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        params = _flatten(parse_qs(parsed.query))
+
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            body = self.rfile.read(length).decode()
+            params.update(_flatten(parse_qs(body)))
+
+        status, headers, payload = self.server.mock_api.handle(  # type: ignore
+            method,
+            parsed.path,
+            params,
+            self.headers.get('Authorization', ''),
+        )
+
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json;charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        for name, header_value in headers.items():
+            self.send_header(name, header_value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format, *args)
+
+
+def _flatten(query: Dict[str, List[str]]) -> Dict[str, str]:
+    return {name: values[-1] for name, values in query.items()}
+
+
+def _error(code: int, message: str) -> Dict:
+    return {'errors': [{'code': code, 'message': message}]}
+
+
+def _csv(value: Optional[str]) -> List[str]:
+    return [_.strip() for _ in (value or '').split(',') if _.strip()]
+
+
+def _v2_not_found(value: str) -> Dict:
+    return {
+        'value': value,
+        'detail': f'Could not find user: [{value}].',
+        'title': 'Not Found Error',
+        'type': 'https://api.twitter.com/2/problems/resource-not-found',
+    }
+
+
+def _key_id(authorization: str) -> str:
+    """Identify the credential a request was signed with."""
+    match = OAUTH_CONSUMER_KEY_RE.search(authorization)
+    if match:
+        return match.group(1)
+
+    if authorization.startswith('Bearer '):
+        return authorization[len('Bearer '):]
+
+    return 'anonymous'
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--mean-following', type=int, default=50)
+    parser.add_argument('--window', type=float, default=RATE_LIMIT_WINDOW)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--nul-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    api = MockTwitterAPI(
+        graph=SyntheticGraph(args.users, args.mean_following, args.seed),
+        window=args.window,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        nul_rate=args.nul_rate,
+        seed=args.seed,
+    )
+    server = MockTwitterServer(api, args.host, args.port)
+    print(f'Serving {args.users} users on {server.base_url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
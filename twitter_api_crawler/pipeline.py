@@ -0,0 +1,285 @@
+"""
+Staged producer/consumer crawl pipeline.
+
+Fetching pages, parsing them into user records, enriching the records and
+writing them to a sink run as separate stages connected by bounded queues::
+
+    usernames -> fetch -> parse -> enrich -> sink
+
+Each stage has its own number of worker threads, so a slow URL unroll in the
+enrichment stage does not keep the API keys idle, and a full queue blocks the
+stage feeding it (backpressure) so memory stays bounded. The cursor of an
+account only moves past a page once the sink stage wrote it. With an
+`AIMDController` the requests in flight in the fetch stage adapt to how the
+API responds.
+"""
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from twitter_api_crawler.concurrency import AIMDController
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import (
+    Twitter404Exception,
+    Twitter429Exception,
+    Twitter503Exception,
+    TwitterNoAvailableAPIs,
+)
+from twitter_api_crawler.helper_utils import (
+    get_ens_domains_from_text,
+    get_hashtags_from_text,
+    get_mentions_from_text,
+    get_urls,
+)
+from twitter_api_crawler.sinks import Sink
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 16
+RETRY_BACKOFF = 1.0
+MAX_RETRIES = 3
+
+_DONE = object()
+
+Enricher = Callable[[Dict], object]
+
+
+def _description(user: Dict) -> str:
+    return user.get('description') or ''
+
+
+# Fields added to every user record by the enrichment stage.
+DEFAULT_ENRICHERS: Dict[str, Enricher] = {
+    'urls': get_urls,
+    'description_mentions': lambda user: get_mentions_from_text(
+        _description(user),
+    ),
+    'description_hashtags': lambda user: get_hashtags_from_text(
+        _description(user),
+    ),
+    'ens_domains': lambda user: get_ens_domains_from_text(
+        f'{user.get("name") or ""} {_description(user)}',
+    ),
+}
+
+
+class Pipeline(object):
+
+    def __init__(
+        self,
+        crawler: TwitterAPIv1Crawler,
+        sink: Sink,
+        relationship: str = 'following',
+        enrichers: Optional[Dict[str, Enricher]] = None,
+        fetch_workers: int = 1,
+        parse_workers: int = 1,
+        enrich_workers: int = 4,
+        queue_size: int = QUEUE_SIZE,
+        concurrency: Optional[AIMDController] = None,
+    ):
+        """
+        Wire a crawler, enrichers and a sink into a staged pipeline.
+
+        Arguments:
+            crawler: Supplies the API clients for the fetch stage
+            sink: Receives the enriched records, written by a single thread
+            relationship: `following` or `followers`
+            enrichers: Field names and functions computing them from a user,
+            DEFAULT_ENRICHERS if None, pass {} to skip enrichment
+            fetch_workers: Accounts paginated concurrently
+            parse_workers: Threads turning pages into user records
+            enrich_workers: Threads running the enrichers
+            queue_size: Capacity of each queue between stages
+            concurrency: Adapts the requests in flight, the fetch stage then
+            runs up to concurrency.maximum workers
+        """
+        self.crawler = crawler
+        self.sink = sink
+        self.relationship = relationship
+        self.enrichers = DEFAULT_ENRICHERS if enrichers is None else enrichers
+        self.concurrency = concurrency
+        if concurrency is not None:
+            fetch_workers = max(fetch_workers, concurrency.maximum)
+            concurrency.attach(crawler)
+
+        self.workers = {
+            'fetch': fetch_workers,
+            'parse': parse_workers,
+            'enrich': enrich_workers,
+            'sink': 1,
+        }
+        self.queue_size = queue_size
+
+        self.stats = {'accounts': 0, 'pages': 0, 'users': 0, 'errors': 0}
+        self._stats_lock = threading.Lock()
+
+        # Cursors of the pages written out of order, per account and page
+        # sequence, and the sequence of the next page to commit.
+        self._written: Dict[str, Dict[int, int]] = {}
+        self._next_page: Dict[str, int] = {}
+
+    def run(self, usernames: Iterable[str]) -> Dict:
+        """
+        Crawl every username through the pipeline.
+
+        Returns
+            Counts of accounts, pages, users and errors and the elapsed time
+        """
+        started = time.perf_counter()
+
+        todo: queue.Queue = queue.Queue()
+        for username in usernames:
+            todo.put(username)
+
+        stages = [
+            ('fetch', self._fetch),
+            ('parse', self._parse),
+            ('enrich', self._enrich),
+            ('sink', self._write),
+        ]
+        inbox = todo
+        running = []
+        for name, handler in stages:
+            outbox: queue.Queue = queue.Queue(maxsize=self.queue_size)
+            threads = [
+                threading.Thread(
+                    target=self._work,
+                    args=(handler, inbox, outbox),
+                    name=f'pipeline-{name}-{index}',
+                    daemon=True,
+                )
+                for index in range(self.workers[name])
+            ]
+            for thread in threads:
+                thread.start()
+            running.append((threads, inbox))
+            inbox = outbox
+
+        # Shut the stages down in order: once every worker of a stage has
+        # drained its inbox, the next stage gets one sentinel per worker.
+        for threads, stage_inbox in running:
+            for _ in threads:
+                stage_inbox.put(_DONE)
+            for thread in threads:
+                thread.join()
+
+        self.sink.flush()
+        return {**self.stats, 'elapsed': time.perf_counter() - started}
+
+    def _work(
+        self,
+        handler: Callable,
+        inbox: queue.Queue,
+        outbox: queue.Queue,
+    ) -> None:
+        while True:
+            item = inbox.get()
+            if item is _DONE:
+                return
+
+            try:
+                handler(item, outbox.put)
+            except Exception:
+                logger.exception('Pipeline stage failed')
+                self._count('errors')
+
+    def _fetch(self, username: str, emit: Callable) -> None:
+        """Paginate one account, emitting every page with its sequence."""
+        if self.relationship == 'followers':
+            get_page = self.crawler.get_followers
+        else:
+            get_page = self.crawler.get_following
+
+        cursor = self.crawler.get_cursor(username)
+        retries = 0
+        sequence = 0
+
+        while cursor != 0:
+            try:
+                page = self._request(get_page, username, cursor)
+            except Twitter429Exception:
+                continue
+            except TwitterNoAvailableAPIs:
+                time.sleep(self.crawler.seconds_until_available())
+                continue
+            except Twitter404Exception:
+                logger.info(f'{username} not found, skipping')
+                break
+            except Twitter503Exception:
+                retries += 1
+                self.crawler.metrics.increment(
+                    'retries_total',
+                    labels={'reason': '503'},
+                )
+                if retries > MAX_RETRIES:
+                    raise
+                time.sleep(RETRY_BACKOFF * retries)
+                continue
+
+            retries = 0
+            cursor = page['cursor']
+            page['sequence'] = sequence
+            sequence += 1
+            self._count('pages')
+            emit(page)
+
+        self._count('accounts')
+
+    def _request(self, get_page: Callable, username: str, cursor: int) -> Dict:
+        if self.concurrency is None:
+            return get_page(username, cursor)
+
+        with self.concurrency.slot():
+            return get_page(username, cursor)
+
+    def _parse(self, page: Dict, emit: Callable) -> None:
+        """Tag the users of a page with the edge they were crawled from."""
+        with self.crawler.profiler.phase('extraction'):
+            for user in page['users']:
+                user['crawled_from'] = page['username']
+                user['relationship'] = self.relationship
+
+        emit(page)
+
+    def _enrich(self, page: Dict, emit: Callable) -> None:
+        with self.crawler.profiler.phase('enrichment'):
+            for user in page['users']:
+                for field, enricher in self.enrichers.items():
+                    user[field] = enricher(user)
+
+        emit(page)
+
+    def _write(self, page: Dict, emit: Callable) -> None:
+        if page['users']:
+            with self.crawler.profiler.phase('sink'):
+                self.sink.write(page['users'])
+
+        self._count('users', len(page['users']))
+        self._commit(page)
+
+    def _commit(self, page: Dict) -> None:
+        """
+        Move the cursor of the account past a written page.
+
+        Pages reach the sink out of order when the parse or enrich stages
+        run several workers, so the cursor only advances over the pages
+        written without a gap. Only the single sink worker calls this.
+        """
+        username = page['username']
+        written = self._written.setdefault(username, {})
+        written[page['sequence']] = page['cursor']
+
+        sequence = self._next_page.get(username, 0)
+        while sequence in written:
+            self.crawler.set_cursor(username, written.pop(sequence))
+            sequence += 1
+        self._next_page[username] = sequence
+
+        if self.crawler.get_cursor(username) == 0:
+            del self._written[username], self._next_page[username]
+
+    def _count(self, name: str, value: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[name] += value
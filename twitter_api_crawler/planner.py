@@ -0,0 +1,255 @@
+"""
+Plan a crawl across API keys and rate-limit windows before starting it.
+
+The follower and following counts returned by `users/lookup` tell exactly
+how many list pages each account takes. `plan_crawl` turns them into a
+per key schedule, largest accounts first onto the least loaded key (LPT),
+so the last key finishes as early as possible, and projects when the whole
+job ends::
+
+    users = lookup_counts(crawler, usernames)
+    plan = plan_crawl(users, list(crawler.apis), max_requests=500)
+    print(plan.report())
+"""
+import datetime
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional
+
+from twitter_api_crawler.crawler import TwitterAPIv1Crawler
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+
+PAGE_SIZE = 200
+WINDOW = 15 * 60
+REQUESTS_PER_WINDOW = 15
+
+COUNT_FIELDS = {
+    'following': 'friends_count',
+    'followers': 'followers_count',
+}
+
+
+def request_cost(
+    user: Dict,
+    relationship: str = 'following',
+    page_size: int = PAGE_SIZE,
+) -> int:
+    """
+    Return the number of list requests needed to crawl an account.
+
+    Arguments:
+        user: A v1.1 user object, from `users/lookup`
+        relationship: `following` or `followers`
+        page_size: Users per page
+    """
+    count = user.get(COUNT_FIELDS[relationship]) or 0
+    return max(1, math.ceil(count / page_size))
+
+
+def lookup_counts(
+    crawler: TwitterAPIv1Crawler,
+    usernames: Iterable[str],
+) -> List[Dict]:
+    """
+    Fetch the user objects of the accounts to plan, 100 per request.
+
+    Accounts that no longer exist are left out. Rate-limited keys are
+    paused and the chunk retried with the next one.
+
+    Raises:
+        TwitterNoAvailableAPIs: once every key is asleep
+    """
+    return crawler.lookup_users(list(usernames))
+
+
+class CrawlPlan(object):
+
+    def __init__(
+        self,
+        assignments: Dict[str, List[Dict]],
+        skipped: List[str],
+        requests_per_window: int,
+        window: float,
+        seconds_per_request: float,
+        start: datetime.datetime,
+    ):
+        """
+        Schedule built by `plan_crawl`.
+
+        Arguments:
+            assignments: Tasks of every key in crawl order, each a dict with
+            username, requests and truncated
+            skipped: Accounts left out by the cost cap
+            requests_per_window: Requests a key may send per window
+            window: Length of a rate-limit window in seconds
+            seconds_per_request: Expected duration of one request
+            start: When the crawl starts
+        """
+        self.assignments = assignments
+        self.skipped = skipped
+        self.requests_per_window = requests_per_window
+        self.window = window
+        self.seconds_per_request = seconds_per_request
+        self.start = start
+
+    def load(self, key: str) -> int:
+        """Return the requests assigned to a key."""
+        return sum(task['requests'] for task in self.assignments[key])
+
+    def duration(self, requests: int) -> float:
+        """
+        Return the seconds a single key needs for a number of requests.
+
+        Every full window is waited out, the last one only lasts as long as
+        its requests.
+        """
+        if not requests:
+            return 0.0
+
+        windows = math.ceil(requests / self.requests_per_window)
+        last = requests - (windows - 1) * self.requests_per_window
+        return (windows - 1) * self.window + last * self.seconds_per_request
+
+    @property
+    def makespan(self) -> float:
+        """Seconds until the busiest key is done."""
+        return max(
+            (self.duration(self.load(key)) for key in self.assignments),
+            default=0.0,
+        )
+
+    @property
+    def finish(self) -> datetime.datetime:
+        return self.start + datetime.timedelta(seconds=self.makespan)
+
+    def windows(self, key: str) -> List[List[Dict]]:
+        """
+        Split the tasks of a key into its rate-limit windows.
+
+        Accounts spanning windows are split, the crawl resumes them from
+        their cursor.
+
+        Returns
+            One list per window of dicts with username and requests
+        """
+        windows: List[List[Dict]] = [[]]
+        room = self.requests_per_window
+
+        for task in self.assignments[key]:
+            left = task['requests']
+            while left:
+                if not room:
+                    windows.append([])
+                    room = self.requests_per_window
+                used = min(left, room)
+                windows[-1].append(
+                    {'username': task['username'], 'requests': used},
+                )
+                left -= used
+                room -= used
+
+        return windows if windows[0] else []
+
+    def report(self) -> Dict:
+        """
+        Summarize the plan.
+
+        Returns
+            Accounts, requests, skipped and truncated accounts, the load of
+            every key, the makespan in seconds, the makespan if the
+            requests were spread perfectly evenly over the keys (a lower
+            bound) and the projected finish time
+        """
+        tasks = [
+            task for tasks in self.assignments.values() for task in tasks
+        ]
+        total = sum(task['requests'] for task in tasks)
+        keys = max(len(self.assignments), 1)
+
+        return {
+            'accounts': len(tasks),
+            'requests': total,
+            'skipped': list(self.skipped),
+            'truncated': [
+                task['username'] for task in tasks if task['truncated']
+            ],
+            'loads': {key: self.load(key) for key in self.assignments},
+            'makespan': self.makespan,
+            'lower_bound': self.duration(math.ceil(total / keys)),
+            'finish': self.finish.isoformat(),
+        }
+
+
+def plan_crawl(
+    users: Iterable[Dict],
+    keys: List[str],
+    relationship: str = 'following',
+    max_requests: Optional[int] = None,
+    cap: str = 'truncate',
+    requests_per_window: int = REQUESTS_PER_WINDOW,
+    window: float = WINDOW,
+    seconds_per_request: float = 1.0,
+    start: Optional[datetime.datetime] = None,
+) -> CrawlPlan:
+    """
+    Assign accounts to keys to finish the crawl as early as possible.
+
+    Accounts are sorted by request cost, largest first, and each goes to
+    the key with the least work so far (longest processing time first,
+    within 4/3 of the optimal makespan).
+
+    Arguments:
+        users: v1.1 user objects of the accounts, eg. from `lookup_counts`
+        keys: The API keys to spread the work over
+        relationship: `following` or `followers`
+        max_requests: Cost cap per account, None for no cap
+        cap: What happens to an account over the cap, `truncate` crawls its
+        first max_requests pages, `skip` leaves it out
+        requests_per_window: Requests a key may send per window
+        window: Length of a rate-limit window in seconds
+        seconds_per_request: Expected duration of one request
+        start: When the crawl starts, now by default
+
+    Returns
+        A CrawlPlan
+
+    Raises
+        TwitterAPIClientException: for an unknown cap or no keys
+    """
+    if cap not in {'truncate', 'skip'}:
+        raise TwitterAPIClientException(f'Unknown cap: {cap}')
+    if not keys:
+        raise TwitterAPIClientException('At least one key is needed')
+
+    tasks = []
+    skipped = []
+    for user in users:
+        cost = request_cost(user, relationship)
+        truncated = max_requests is not None and cost > max_requests
+        if truncated and cap == 'skip':
+            skipped.append(user['screen_name'])
+            continue
+
+        tasks.append({
+            'username': user['screen_name'],
+            'requests': min(cost, max_requests) if truncated else cost,
+            'truncated': truncated,
+        })
+
+    assignments: Dict[str, List[Dict]] = {key: [] for key in keys}
+    loads = [(0, index, key) for index, key in enumerate(keys)]
+    heapq.heapify(loads)
+
+    for task in sorted(tasks, key=lambda _: -_['requests']):
+        load, index, key = heapq.heappop(loads)
+        assignments[key].append(task)
+        heapq.heappush(loads, (load + task['requests'], index, key))
+
+    return CrawlPlan(
+        assignments,
+        skipped,
+        requests_per_window,
+        window,
+        seconds_per_request,
+        start or datetime.datetime.now(datetime.timezone.utc),
+    )
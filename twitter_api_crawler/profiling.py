@@ -0,0 +1,249 @@
+"""
+Opt-in profiling of crawl runs.
+
+A `Profiler` attributes wall time and memory growth to the phases of a crawl
+(key acquisition, HTTP, sanitize, decode, extraction, enrichment and sink)
+and can additionally run cProfile. Enable it by passing one to the crawler or
+by setting the environment variable::
+
+    TWITTER_API_CRAWLER_PROFILE=1             # report to stderr at exit
+    TWITTER_API_CRAWLER_PROFILE=/tmp/crawl    # report to a file at exit
+
+When enabled from the environment the report is also dumped on SIGUSR1.
+"""
+import atexit
+import cProfile
+import io
+import logging
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict, List, TextIO
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENV_VAR = 'TWITTER_API_CRAWLER_PROFILE'
+
+_env_profiler = None
+_env_profiler_lock = threading.Lock()
+
+
+class _NullPhase(object):
+
+    def __enter__(self) -> None:
+        """Do nothing."""
+
+    def __exit__(self, *exc_info) -> None:
+        """Do nothing."""
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullProfiler(object):
+    """Profiler used when profiling is off, every phase is a no-op."""
+
+    enabled = False
+
+    def phase(self, name: str) -> _NullPhase:
+        return _NULL_PHASE
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Phase(object):
+
+    def __init__(self, profiler: 'Profiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.memory = self.profiler.traced_memory()
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self.started
+        growth = self.profiler.traced_memory() - self.memory
+        self.profiler.record(self.name, elapsed, growth)
+
+
+class Profiler(object):
+
+    enabled = True
+
+    def __init__(self, trace_allocations: bool = True, cprofile: bool = False):
+        """
+        Collect per phase timings for a crawl run.
+
+        Arguments:
+            trace_allocations: Track memory growth per phase with tracemalloc
+            cprofile: Also run cProfile in the thread calling `start()`
+        """
+        self.trace_allocations = trace_allocations
+        self.phases: Dict[str, List[float]] = {}
+        self.cprofile = cProfile.Profile() if cprofile else None
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def start(self) -> 'Profiler':
+        """Start tracemalloc and cProfile if requested."""
+        self.started = time.perf_counter()
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.cprofile:
+            self.cprofile.enable()
+        return self
+
+    def stop(self) -> None:
+        if self.cprofile:
+            self.cprofile.disable()
+        if self.trace_allocations and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def phase(self, name: str) -> _Phase:
+        """
+        Time a block of code as part of the named phase.
+
+        Usage::
+
+            with profiler.phase('decode'):
+                json.loads(body)
+        """
+        return _Phase(self, name)
+
+    def record(self, name: str, elapsed: float, growth: int = 0) -> None:
+        """Add one call of a phase to the totals."""
+        with self._lock:
+            totals = self.phases.setdefault(name, [0, 0.0, 0])
+            totals[0] += 1
+            totals[1] += elapsed
+            totals[2] += growth
+
+    def traced_memory(self) -> int:
+        if self.trace_allocations and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return 0
+
+    def report(self, top: int = 15) -> str:
+        """
+        Summarize where the time went.
+
+        Arguments:
+            top: Number of cProfile functions and allocation sites to list
+
+        Returns
+            A printable multi-line report
+        """
+        wall = time.perf_counter() - self.started
+        lines = [
+            f'Crawl profile after {wall:.3f}s wall time',
+            '',
+            f'{"phase":<20}{"calls":>10}{"seconds":>12}{"% wall":>9}'
+            + f'{"mem KiB":>12}',
+        ]
+
+        with self._lock:
+            phases = sorted(self.phases.items(), key=lambda _: -_[1][1])
+
+        for name, (calls, seconds, growth) in phases:
+            share = seconds / wall * 100 if wall else 0
+            lines.append(
+                f'{name:<20}{calls:>10}{seconds:>12.4f}{share:>8.1f}%'
+                + f'{growth / 1024:>12.1f}',
+            )
+
+        if self.trace_allocations and tracemalloc.is_tracing():
+            lines.extend(['', 'Top allocation sites'])
+            snapshot = tracemalloc.take_snapshot()
+            for stat in snapshot.statistics('lineno')[:top]:
+                lines.append(f'  {stat}')
+
+        if self.cprofile:
+            stream = io.StringIO()
+            stats = pstats.Stats(self.cprofile, stream=stream)
+            stats.sort_stats('cumulative').print_stats(top)
+            lines.extend(['', stream.getvalue()])
+
+        return '\n'.join(lines)
+
+    def dump(self, stream: TextIO = None) -> None:
+        """Write the report to a stream, stderr by default."""
+        stream = stream or sys.stderr
+        stream.write(self.report() + '\n')
+        stream.flush()
+
+    def install_signal_handler(self, signum: int = None) -> bool:
+        """
+        Dump the report to stderr whenever the process receives signum.
+
+        The handler only starts a thread writing the report, the signal may
+        interrupt the main thread while it holds the profiler lock.
+
+        Arguments:
+            signum: Signal number, SIGUSR1 by default
+
+        Returns
+            False if the platform or the calling thread does not allow it
+        """
+        signum = signum or getattr(signal, 'SIGUSR1', None)
+        if signum is None:
+            return False
+
+        try:
+            signal.signal(signum, self._dump_in_thread)
+        except ValueError:  # not the main thread
+            return False
+
+        return True
+
+    def _dump_in_thread(self, *args) -> None:
+        threading.Thread(
+            target=self.dump,
+            name='profiler-dump',
+            daemon=True,
+        ).start()
+
+
+def profiler_from_env():
+    """
+    Return the profiler requested by PROFILE_ENV_VAR.
+
+    The profiler is built once per process and shared by every crawler, so
+    there is one report at exit and one SIGUSR1 handler.
+
+    Returns
+        A started Profiler reporting at exit, or NULL_PROFILER when unset
+    """
+    global _env_profiler
+
+    setting = os.environ.get(PROFILE_ENV_VAR, '')
+    if setting.lower() in {'', '0', 'false', 'no'}:
+        return NULL_PROFILER
+
+    with _env_profiler_lock:
+        if _env_profiler is None:
+            _env_profiler = _start_env_profiler(setting)
+        return _env_profiler
+
+
+def _start_env_profiler(setting: str) -> Profiler:
+    profiler = Profiler(cprofile=True).start()
+    profiler.install_signal_handler()
+
+    if setting.lower() in {'1', 'true', 'yes'}:
+        atexit.register(profiler.dump)
+    else:
+        atexit.register(_dump_to_file, profiler, setting)
+
+    logger.info(f'Profiling enabled through {PROFILE_ENV_VAR}')
+    return profiler
+
+
+def _dump_to_file(profiler: Profiler, path: str) -> None:
+    with open(path, 'w') as report_file:
+        profiler.dump(report_file)
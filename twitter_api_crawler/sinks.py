@@ -0,0 +1,300 @@
+"""
+Streaming output sinks for crawl results.
+
+Sinks receive pages of records (user dicts) as they arrive and persist them
+incrementally, so memory use stays bounded no matter how large the crawl.
+
+`NDJSONSink` writes (optionally gzip compressed) newline delimited JSON and
+rotates files by size and age. `ParquetSink` writes columnar Parquet files in
+row groups, it needs the optional `pyarrow` dependency.
+
+Files are written under a `.part` suffix and renamed once complete, so
+downstream consumers can pick up every file without the suffix.
+"""
+import datetime
+import gzip
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency, see ParquetSink
+    pyarrow = None  # type: ignore
+
+MAX_FILE_BYTES = 256 * 1024 * 1024
+MAX_FILE_SECONDS = 60 * 60
+ROW_GROUP_SIZE = 50000
+
+# Scalar fields of a v1.1 user object kept by the Parquet sink by default.
+USER_COLUMNS = {
+    'id': 'int64',
+    'id_str': 'string',
+    'screen_name': 'string',
+    'name': 'string',
+    'description': 'string',
+    'location': 'string',
+    'url': 'string',
+    'protected': 'bool',
+    'verified': 'bool',
+    'followers_count': 'int64',
+    'friends_count': 'int64',
+    'listed_count': 'int64',
+    'favourites_count': 'int64',
+    'statuses_count': 'int64',
+    'created_at': 'string',
+    'crawled_from': 'string',
+    'relationship': 'string',
+}
+
+
+class Sink(object):
+    """Base class of the sinks, usable as a context manager."""
+
+    def write(self, records: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """Persist anything buffered."""
+
+    def publish(self) -> None:
+        """Make every record written so far visible to consumers."""
+        self.flush()
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> 'Sink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class MemorySink(Sink):
+    """Keep the records in a list, handy for tests and small crawls."""
+
+    def __init__(self):
+        self.records: List[Dict] = []
+
+    def write(self, records: List[Dict]) -> None:
+        self.records.extend(records)
+
+
+class NDJSONSink(Sink):
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = 'crawl',
+        compress: bool = True,
+        max_bytes: int = MAX_FILE_BYTES,
+        max_seconds: float = MAX_FILE_SECONDS,
+    ):
+        """
+        Write records as newline delimited JSON with file rotation.
+
+        Arguments:
+            directory: Where the files are written, created if missing
+            prefix: File name prefix
+            compress: Gzip the files
+            max_bytes: Rotate once this many uncompressed bytes are written
+            max_seconds: Rotate files older than this
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+
+        self.paths: List[str] = []
+        self._file = None
+        self._path = ''
+        self._bytes = 0
+        self._opened = 0.0
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def write(self, records: List[Dict]) -> None:
+        if not records:
+            return
+
+        payload = ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n'
+            for record in records
+        ).encode()
+
+        with self._lock:
+            if self._file is None:
+                self._open()
+
+            self._file.write(payload)
+            self._bytes += len(payload)
+
+            too_big = self._bytes >= self.max_bytes
+            too_old = time.monotonic() - self._opened >= self.max_seconds
+            if too_big or too_old:
+                self._rotate()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def publish(self) -> None:
+        """Rename the current file, the next write starts a new one."""
+        with self._lock:
+            self._rotate()
+
+    def close(self) -> None:
+        self.publish()
+
+    def _open(self) -> None:
+        stamp = _timestamp()
+        extension = '.ndjson.gz' if self.compress else '.ndjson'
+        name = f'{self.prefix}-{stamp}-{self._sequence:05d}{extension}'
+
+        self._sequence += 1
+        self._path = os.path.join(self.directory, name)
+        part = f'{self._path}.part'
+        opener = gzip.open if self.compress else open
+        self._file = opener(part, 'wb')
+        self._bytes = 0
+        self._opened = time.monotonic()
+
+    def _rotate(self) -> None:
+        """Close the current file and publish it under its final name."""
+        if self._file is None:
+            return
+
+        self._file.close()
+        os.replace(f'{self._path}.part', self._path)
+        self.paths.append(self._path)
+        self._file = None
+
+
+class ParquetSink(Sink):
+
+    def __init__(
+        self,
+        directory: str,
+        prefix: str = 'crawl',
+        columns: Optional[Dict[str, str]] = None,
+        row_group_size: int = ROW_GROUP_SIZE,
+        max_rows: Optional[int] = None,
+        compression: str = 'snappy',
+    ):
+        """
+        Write records to Parquet files, one row group per batch.
+
+        Records are buffered until row_group_size rows are collected. Only
+        the configured columns are kept, missing values become nulls.
+
+        Arguments:
+            directory: Where the files are written, created if missing
+            prefix: File name prefix
+            columns: Column names and Arrow type names, USER_COLUMNS if None
+            row_group_size: Rows per row group
+            max_rows: Rotate to a new file after this many rows
+            compression: Parquet compression codec
+
+        Raises:
+            TwitterAPIClientException: if pyarrow is not installed
+        """
+        if pyarrow is None:
+            raise TwitterAPIClientException(
+                'ParquetSink needs pyarrow: '
+                + 'pip install twitter_api_crawler[parquet]',
+            )
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.columns = columns or USER_COLUMNS
+        self.row_group_size = row_group_size
+        self.max_rows = max_rows
+        self.compression = compression
+
+        self.paths: List[str] = []
+        self.schema = pyarrow.schema(
+            [(name, type_name) for name, type_name in self.columns.items()],
+        )
+        self._buffer: List[Dict] = []
+        self._writer = None
+        self._path = ''
+        self._rows = 0
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def write(self, records: List[Dict]) -> None:
+        with self._lock:
+            self._buffer.extend(records)
+            while len(self._buffer) >= self.row_group_size:
+                batch = self._buffer[:self.row_group_size]
+                del self._buffer[:self.row_group_size]
+                self._write_row_group(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._buffer:
+                self._write_row_group(self._buffer)
+                self._buffer = []
+
+    def publish(self) -> None:
+        """Write the buffered rows and close the file under its name."""
+        self.flush()
+        with self._lock:
+            self._rotate()
+
+    def close(self) -> None:
+        self.publish()
+
+    def _write_row_group(self, records: List[Dict]) -> None:
+        if self._writer is None:
+            self._open()
+
+        table = pyarrow.Table.from_pydict(
+            {
+                name: [record.get(name) for record in records]
+                for name in self.columns
+            },
+            schema=self.schema,
+        )
+        self._writer.write_table(table, row_group_size=len(records))
+        self._rows += len(records)
+
+        if self.max_rows and self._rows >= self.max_rows:
+            self._rotate()
+
+    def _open(self) -> None:
+        stamp = _timestamp()
+        name = f'{self.prefix}-{stamp}-{self._sequence:05d}.parquet'
+
+        self._sequence += 1
+        self._path = os.path.join(self.directory, name)
+        self._writer = pyarrow.parquet.ParquetWriter(
+            f'{self._path}.part',
+            self.schema,
+            compression=self.compression,
+        )
+        self._rows = 0
+
+    def _rotate(self) -> None:
+        if self._writer is None:
+            return
+
+        self._writer.close()
+        os.replace(f'{self._path}.part', self._path)
+        self.paths.append(self._path)
+        self._writer = None
+
+
+def _timestamp() -> str:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return now.strftime('%Y%m%dT%H%M%S')
@@ -0,0 +1,417 @@
+"""
+Snapshots of the follower and following lists of crawled accounts.
+
+Twitter returns both lists newest first, so comparing a fresh crawl to the
+previous snapshot lets `TwitterAPIv1Crawler.crawl_incremental` stop paging
+at the first known ID instead of walking the whole list again. Unfollows
+only show up in a full sweep, which the snapshot records the time of.
+
+`CompactSnapshotStore` keeps every snapshot as a sorted, delta encoded and
+zlib compressed ID array, so months of history fit on one disk and churn
+between two snapshots is computed without building user dicts. With the
+optional `numpy` dependency the IDs are rebuilt and compared as vectors,
+otherwise as unsigned 64-bit arrays.
+"""
+import array
+import itertools
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+
+try:
+    import numpy
+except ImportError:  # optional dependency, see CompactSnapshotStore.diff
+    numpy = None  # type: ignore
+
+# magic, version, array typecode of the deltas, count, first ID, updated and
+# full_sweep epoch times, followed by the zlib compressed deltas.
+_HEADER = struct.Struct('<4sBcQQdd')
+_MAGIC = b'TWSN'
+_VERSION = 1
+_TYPECODES = ('B', 'H', 'I', 'Q')
+
+
+class SnapshotStore(object):
+    """Keep the snapshots in memory, handy for tests and short runs."""
+
+    def __init__(self):
+        self._snapshots: Dict[tuple, Dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self, username: str, relationship: str) -> Optional[Dict]:
+        """
+        Return the last snapshot of an account.
+
+        Returns
+            A dict with ids (newest first), updated and full_sweep (epoch
+            times), or None if the account was never crawled
+        """
+        with self._lock:
+            return self._snapshots.get((username, relationship))
+
+    def save(
+        self,
+        username: str,
+        relationship: str,
+        ids: List[int],
+        full_sweep: bool = False,
+    ) -> None:
+        """
+        Store the ids of an account, newest first.
+
+        Arguments:
+            full_sweep: The ids come from a complete crawl of the list
+        """
+        now = time.time()
+        swept = self.last_full_sweep(username, relationship)
+        if full_sweep or swept is None:
+            swept = now
+
+        self._store(
+            username,
+            relationship,
+            {'ids': list(ids), 'updated': now, 'full_sweep': swept},
+        )
+
+    def _store(self, username: str, relationship: str, snapshot: Dict) -> None:
+        with self._lock:
+            self._snapshots[(username, relationship)] = snapshot
+
+    def get_ids(self, username: str, relationship: str) -> List[int]:
+        snapshot = self.load(username, relationship)
+        return snapshot['ids'] if snapshot else []
+
+    def needs_full_sweep(
+        self,
+        username: str,
+        relationship: str,
+        every: Optional[float] = None,
+    ) -> bool:
+        """
+        Tell whether the next crawl of an account should walk the whole list.
+
+        Arguments:
+            every: Seconds between full sweeps, None to only sweep accounts
+            without a snapshot
+
+        Returns
+            True if there is no snapshot or the last full sweep is too old
+        """
+        swept = self.last_full_sweep(username, relationship)
+        if swept is None:
+            return True
+
+        if every is None:
+            return False
+
+        return time.time() - swept >= every
+
+    def last_full_sweep(
+        self,
+        username: str,
+        relationship: str,
+    ) -> Optional[float]:
+        """Return when the account was last crawled in full, or None."""
+        snapshot = self.load(username, relationship)
+        return snapshot['full_sweep'] if snapshot else None
+
+
+class JSONSnapshotStore(SnapshotStore):
+
+    def __init__(self, directory: str):
+        """
+        Keep one JSON file per account and relationship.
+
+        Arguments:
+            directory: Where the files are written, created if missing
+        """
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def load(self, username: str, relationship: str) -> Optional[Dict]:
+        path = self.path(username, relationship)
+        with self._lock:
+            if not os.path.exists(path):
+                return None
+            with open(path) as snapshot_file:
+                return json.load(snapshot_file)
+
+    def _store(self, username: str, relationship: str, snapshot: Dict) -> None:
+        path = self.path(username, relationship)
+
+        # Write to a temporary file and rename so a crash never leaves a
+        # truncated snapshot behind.
+        with self._lock:
+            with open(f'{path}.part', 'w') as snapshot_file:
+                json.dump(snapshot, snapshot_file)
+            os.replace(f'{path}.part', path)
+
+    def path(self, username: str, relationship: str) -> str:
+        name = re.sub(r'[^\w.-]', '_', username.lower())
+        return os.path.join(self.directory, f'{relationship}-{name}.json')
+
+
+class CompactSnapshotStore(SnapshotStore):
+
+    def __init__(self, directory: str, keep: Optional[int] = None):
+        """
+        Keep the snapshot history of every account as compact ID arrays.
+
+        Each save adds a file, IDs are stored sorted so `load` returns them
+        in ascending order rather than newest first. Files are read through
+        mmap and only the header is parsed to check sweep times.
+
+        Arguments:
+            directory: Where the files are written, created if missing
+            keep: Snapshots kept per account, None keeps the whole history
+        """
+        super().__init__()
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.keep = keep
+
+    def load(self, username: str, relationship: str) -> Optional[Dict]:
+        history = self.history(username, relationship)
+        return self.read(history[-1]) if history else None
+
+    def last_full_sweep(
+        self,
+        username: str,
+        relationship: str,
+    ) -> Optional[float]:
+        history = self.history(username, relationship)
+        if not history:
+            return None
+
+        return self.read(history[-1], ids=False)['full_sweep']
+
+    def history(self, username: str, relationship: str) -> List[str]:
+        """Return the snapshot files of an account, oldest first."""
+        path = self.path(username, relationship)
+        if not os.path.isdir(path):
+            return []
+
+        return [
+            os.path.join(path, name)
+            for name in sorted(os.listdir(path))
+            if name.endswith('.snap')
+        ]
+
+    def read(self, path: str, ids: bool = True) -> Dict:
+        """
+        Read a snapshot file.
+
+        Arguments:
+            path: A file returned by `history`
+            ids: Decode the IDs, False to only read the times
+
+        Returns
+            A dict with updated, full_sweep and count, plus the sorted ids
+
+        Raises
+            TwitterAPIClientException: if the file is not a snapshot
+        """
+        snapshot = self._read(path, ids)
+        if ids:
+            snapshot['ids'] = snapshot['ids'].tolist()
+
+        return snapshot
+
+    def _read(self, path: str, ids: bool) -> Dict:
+        """Read a snapshot file, keeping the ids in a 64-bit buffer."""
+        with open(path, 'rb') as snapshot_file:
+            with mmap.mmap(
+                snapshot_file.fileno(),
+                0,
+                access=mmap.ACCESS_READ,
+            ) as mapped:
+                header = _HEADER.unpack_from(mapped)
+                magic, version, typecode, count, first, updated, swept = header
+                if magic != _MAGIC or version != _VERSION:
+                    raise TwitterAPIClientException(
+                        f'Not a snapshot file: {path}',
+                    )
+
+                snapshot = {
+                    'updated': updated,
+                    'full_sweep': swept,
+                    'count': count,
+                }
+                if ids:
+                    payload = zlib.decompress(mapped[_HEADER.size:])
+                    snapshot['ids'] = _decode_array(
+                        typecode.decode(),
+                        first,
+                        count,
+                        payload,
+                    )
+
+        return snapshot
+
+    def diff(
+        self,
+        username: str,
+        relationship: str,
+        older: Optional[str] = None,
+        newer: Optional[str] = None,
+    ) -> Dict[str, List[int]]:
+        """
+        Compare two snapshots of an account.
+
+        Arguments:
+            older: Snapshot file, the one before newer by default
+            newer: Snapshot file, the latest by default
+
+        Returns
+            A dict with the added and removed IDs, both sorted
+        """
+        history = self.history(username, relationship)
+        newer = newer or (history[-1] if history else None)
+        if older is None and newer in history:
+            index = history.index(newer)
+            older = history[index - 1] if index else None
+
+        empty = _decode_array('B', 0, 0, b'')
+        new_ids = self._read(newer, True)['ids'] if newer else empty
+        old_ids = self._read(older, True)['ids'] if older else empty
+
+        if numpy is None:
+            added, removed = diff_ids(old_ids, new_ids)
+            return {'added': added, 'removed': removed}
+
+        # Both arrays are sorted and unique, so numpy can skip its dedupe.
+        return {
+            'added': numpy.setdiff1d(
+                new_ids,
+                old_ids,
+                assume_unique=True,
+            ).tolist(),
+            'removed': numpy.setdiff1d(
+                old_ids,
+                new_ids,
+                assume_unique=True,
+            ).tolist(),
+        }
+
+    def path(self, username: str, relationship: str) -> str:
+        name = re.sub(r'[^\w.-]', '_', username.lower())
+        return os.path.join(self.directory, f'{relationship}-{name}')
+
+    def _store(self, username: str, relationship: str, snapshot: Dict) -> None:
+        directory = self.path(username, relationship)
+        os.makedirs(directory, exist_ok=True)
+
+        ids = sorted(set(snapshot['ids']))
+        typecode, first, payload = _encode(ids)
+        header = _HEADER.pack(
+            _MAGIC,
+            _VERSION,
+            typecode.encode(),
+            len(ids),
+            first,
+            snapshot['updated'],
+            snapshot['full_sweep'],
+        )
+
+        name = f'{int(snapshot["updated"] * 1000000):020d}.snap'
+        path = os.path.join(directory, name)
+        with self._lock:
+            with open(f'{path}.part', 'wb') as snapshot_file:
+                snapshot_file.write(header)
+                snapshot_file.write(payload)
+            os.replace(f'{path}.part', path)
+
+        if self.keep:
+            for expired in self.history(username, relationship)[:-self.keep]:
+                os.remove(expired)
+
+
+def diff_ids(
+    old: Sequence[int],
+    new: Sequence[int],
+) -> Tuple[List[int], List[int]]:
+    """
+    Merge two sorted ID sequences.
+
+    Returns
+        The IDs only in new (added) and only in old (removed)
+    """
+    added = []
+    removed = []
+    i = j = 0
+
+    while i < len(old) and j < len(new):
+        if old[i] == new[j]:
+            i += 1
+            j += 1
+        elif old[i] < new[j]:
+            removed.append(old[i])
+            i += 1
+        else:
+            added.append(new[j])
+            j += 1
+
+    removed.extend(old[i:])
+    added.extend(new[j:])
+    return added, removed
+
+
+def _encode(ids: List[int]) -> Tuple[str, int, bytes]:
+    """Delta encode sorted IDs in the narrowest array type and compress."""
+    if not ids:
+        return 'B', 0, zlib.compress(b'')
+
+    deltas = [b - a for a, b in zip(ids, ids[1:])]
+    largest = max(deltas, default=0)
+    typecode = next(
+        code for code in _TYPECODES
+        if largest < 1 << (8 * array.array(code).itemsize)
+    )
+
+    packed = array.array(typecode, deltas)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+
+    return typecode, ids[0], zlib.compress(packed.tobytes())
+
+
+def _decode_array(typecode: str, first: int, count: int, payload: bytes):
+    """
+    Rebuild sorted IDs from their deltas without a list of Python ints.
+
+    Returns
+        A numpy uint64 array, or an array.array('Q') without numpy
+    """
+    if numpy is not None:
+        ids = numpy.zeros(count, dtype=numpy.uint64)
+        if count:
+            ids[0] = first
+            ids[1:] = numpy.frombuffer(
+                payload,
+                dtype=f'<u{array.array(typecode).itemsize}',
+            )
+            numpy.cumsum(ids, out=ids)
+        return ids
+
+    if not count:
+        return array.array('Q')
+
+    deltas = array.array(typecode)
+    deltas.frombytes(payload)
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+
+    return array.array(
+        'Q',
+        itertools.accumulate(itertools.chain([first], deltas)),
+    )
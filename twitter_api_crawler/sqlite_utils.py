@@ -0,0 +1,53 @@
+"""SQLite helpers shared by the stores that coordinate several processes."""
+import sqlite3
+import threading
+
+
+def connect(path: str, timeout: float = 30) -> sqlite3.Connection:
+    """
+    Open a database for use by many processes and threads.
+
+    The connection is in autocommit mode so `Transaction` controls locking
+    explicitly, and the journal in WAL mode so readers never block writers.
+    """
+    connection = sqlite3.connect(
+        path,
+        timeout=timeout,
+        isolation_level=None,
+        check_same_thread=False,
+    )
+    connection.execute('PRAGMA journal_mode=WAL')
+    return connection
+
+
+class Transaction(object):
+
+    def __init__(self, connection: sqlite3.Connection, lock: threading.Lock):
+        """
+        Run a block in a `BEGIN IMMEDIATE` transaction.
+
+        The database write lock makes the block atomic across processes and
+        lock serializes the threads sharing the connection.
+
+        Arguments:
+            connection: A connection opened with `connect`
+            lock: Lock guarding the connection within this process
+        """
+        self.connection = connection
+        self.lock = lock
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self.lock.acquire()
+        try:
+            self.cursor = self.connection.cursor()
+            self.cursor.execute('BEGIN IMMEDIATE')
+        except Exception:
+            self.lock.release()
+            raise
+        return self.cursor
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        try:
+            self.cursor.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.lock.release()
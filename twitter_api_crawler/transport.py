@@ -0,0 +1,169 @@
+"""
+Transports sending the HTTP requests of `TwitterAPIv1`.
+
+`RequestsTransport` is the default, a requests session per request (a
+`CachedSession` with `cache_requests`). `HTTP2Transport` keeps a pool of
+httpx connections and multiplexes concurrent requests over HTTP/2, so many
+threads paginating at once share a few connections instead of opening one
+each. It needs the optional `httpx` dependency::
+
+    transport = HTTP2Transport()
+    crawler.create_api('key1', ..., transport=transport)
+
+Both return responses with status_code, headers, content, url and json(),
+and raise `requests.RequestException` subclasses on connection errors and
+timeouts, so the client handles them the same way.
+"""
+from typing import Dict, Optional
+
+import requests
+from requests_cache import CachedSession
+
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+
+try:
+    import httpx
+except ImportError:  # optional dependency, see HTTP2Transport
+    httpx = None  # type: ignore
+
+MAX_CONNECTIONS = 10
+
+
+class Transport(object):
+    """Base class of the transports."""
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        auth=None,
+        params: Dict = None,
+        data: Dict = None,
+    ):
+        """
+        Send a request and return its response.
+
+        Arguments:
+            method: HTTP method, eg. `get`
+            url: The full URL of the destination
+            auth: A requests auth object signing the request
+            params: Query string parameters
+            data: Form encoded body
+
+        Raises:
+            requests.RequestException: on connection errors and timeouts
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> 'Transport':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class RequestsTransport(Transport):
+
+    def __init__(self, cache_requests: bool = False):
+        """
+        Send every request in a new requests session, HTTP/1.1.
+
+        Arguments:
+            cache_requests: Send through a requests_cache CachedSession
+        """
+        self.cache_requests = cache_requests
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        auth=None,
+        params: Dict = None,
+        data: Dict = None,
+    ) -> requests.Response:
+        if self.cache_requests:
+            session = CachedSession()
+        else:
+            session = requests.session()
+
+        return getattr(session, method)(
+            url=url,
+            auth=auth,
+            params=params,
+            data=data,
+        )
+
+
+class HTTP2Transport(Transport):
+
+    def __init__(
+        self,
+        http2: bool = True,
+        http1: bool = True,
+        max_connections: int = MAX_CONNECTIONS,
+        timeout: Optional[float] = None,
+    ):
+        """
+        Multiplex requests over a shared pool of httpx connections.
+
+        The request is built and signed by requests, so OAuth1 and bearer
+        auth work unchanged, then sent by an httpx client. Plain http URLs,
+        eg. a local mock server, fall back to HTTP/1.1 keep-alive unless
+        http1 is off.
+
+        Arguments:
+            http2: Negotiate HTTP/2, or stay on pooled HTTP/1.1
+            http1: Allow HTTP/1.1, off to speak HTTP/2 from the first byte,
+            even over plain http (h2c with prior knowledge)
+            max_connections: Connections kept open at most
+            timeout: Seconds to wait for the server, None to wait forever
+
+        Raises:
+            TwitterAPIClientException: if httpx is not installed
+        """
+        if httpx is None:
+            raise TwitterAPIClientException(
+                'HTTP2Transport needs httpx: '
+                + 'pip install twitter_api_crawler[http2]',
+            )
+
+        self.client = httpx.Client(
+            http1=http1,
+            http2=http2,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections),
+        )
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        auth=None,
+        params: Dict = None,
+        data: Dict = None,
+    ):
+        prepared = requests.Request(
+            method.upper(),
+            url,
+            auth=auth,
+            params=params,
+            data=data,
+        ).prepare()
+
+        try:
+            return self.client.request(
+                prepared.method,
+                prepared.url,
+                headers=dict(prepared.headers),
+                content=prepared.body,
+            )
+        except httpx.TimeoutException as exc:
+            raise requests.Timeout(str(exc)) from exc
+        except httpx.TransportError as exc:
+            raise requests.ConnectionError(str(exc)) from exc
+
+    def close(self) -> None:
+        self.client.close()
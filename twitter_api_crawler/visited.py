@@ -0,0 +1,314 @@
+"""
+Compact visited sets for crawls of hundreds of millions of accounts.
+
+A Python set costs around 40 bytes per integer, snowflake IDs included.
+`IntSet` keeps integer IDs in sorted runs of unsigned 64 bit integers, 8
+bytes per ID however sparse they are. `BloomFilter` stores string keys
+(screen names) in a fixed number of bits at the cost of a configurable false
+positive rate.
+`VisitedSet` combines both and persists to a single file::
+
+    visited = VisitedSet(capacity=100000000)
+    frontier = Frontier(visited=visited)
+    ...
+    visited.save('visited.bin')
+"""
+import array
+import bisect
+import hashlib
+import heapq
+import math
+import os
+import struct
+import sys
+import threading
+from typing import BinaryIO, Iterable, Iterator, List, Set, Union
+
+from twitter_api_crawler.exceptions import TwitterAPIClientException
+
+# New IDs wait in a Python set until this many are written out as a run.
+BUFFER_LIMIT = 4096
+# Runs are merged this many values at a time to bound the temporary lists.
+MERGE_SLICE = 65536
+
+_MAGIC = b'TWVS'
+_VERSION = 2
+_BLOOM = struct.Struct('<QBQQd')
+
+
+class IntSet(object):
+
+    def __init__(self, values: Iterable[int] = ()):
+        """
+        Exact set of integers between 0 and 2 ** 64 - 1.
+
+        New values collect in a small set that is written out as a sorted
+        run once it holds BUFFER_LIMIT values. Runs of similar length are
+        merged like a binary counter, so every value is copied O(log n)
+        times and a lookup bisects O(log n) runs.
+
+        Arguments:
+            values: Initial members
+        """
+        self._runs: List[array.array] = []
+        self._buffer: Set[int] = set()
+        self._count = 0
+        self.update(values)
+
+    def add(self, value: int) -> bool:
+        """
+        Add a value.
+
+        Returns
+            True if the value was not a member yet
+        """
+        if value in self:
+            return False
+
+        self._buffer.add(value)
+        self._count += 1
+        if len(self._buffer) >= BUFFER_LIMIT:
+            self._flush()
+        return True
+
+    def update(self, values: Iterable[int]) -> None:
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value: int) -> bool:
+        # Read the buffer before the runs, _flush replaces them in the
+        # opposite order so lock-free readers never miss a value.
+        if value in self._buffer:
+            return True
+
+        for run in self._runs:
+            index = bisect.bisect_left(run, value)
+            if index < len(run) and run[index] == value:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[int]:
+        return heapq.merge(*self._runs, sorted(self._buffer))
+
+    def nbytes(self) -> int:
+        """Return the bytes used by the runs, without the pending buffer."""
+        return sum(run.itemsize * len(run) for run in self._runs)
+
+    def _flush(self) -> None:
+        runs = list(self._runs)
+        run = array.array('Q', sorted(self._buffer))
+        while runs and len(runs[-1]) <= len(run):
+            run = _merge(runs.pop(), run)
+        runs.append(run)
+
+        self._runs = runs
+        self._buffer = set()
+
+    def dump(self, stream: BinaryIO) -> None:
+        runs = self._runs + [array.array('Q', sorted(self._buffer))]
+        stream.write(struct.pack('<Q', len(runs)))
+        for run in runs:
+            stream.write(struct.pack('<Q', len(run)))
+            stream.write(_little_endian(run).tobytes())
+
+    @classmethod
+    def load(cls, stream: BinaryIO) -> 'IntSet':
+        values = cls()
+        (runs,) = struct.unpack('<Q', stream.read(8))
+
+        for _ in range(runs):
+            (length,) = struct.unpack('<Q', stream.read(8))
+            run = array.array('Q')
+            run.frombytes(stream.read(length * run.itemsize))
+            run = _little_endian(run)
+            if run:
+                values._runs.append(run)
+                values._count += len(run)
+
+        return values
+
+
+class BloomFilter(object):
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        """
+        Probabilistic set of strings in a fixed amount of memory.
+
+        Membership tests never miss an added key but report a key that was
+        never added with probability error_rate, as long as no more than
+        capacity keys are added.
+
+        Arguments:
+            capacity: Expected number of keys
+            error_rate: False positive rate at capacity
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(
+            8,
+            math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2),
+        )
+        self.hashes = max(1, round(self.size / max(capacity, 1) * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def add(self, key: str) -> bool:
+        """
+        Add a key.
+
+        Returns
+            True if the key was (most likely) not a member yet
+        """
+        new = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                new = True
+
+        self.count += new
+        return new
+
+    def __contains__(self, key: str) -> bool:
+        return all(
+            self.bits[position >> 3] & 1 << (position & 7)
+            for position in self._positions(key)
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _positions(self, key: str) -> Iterator[int]:
+        # Double hashing, Kirsch and Mitzenmacher.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def dump(self, stream: BinaryIO) -> None:
+        stream.write(
+            _BLOOM.pack(
+                self.size,
+                self.hashes,
+                self.count,
+                self.capacity,
+                self.error_rate,
+            ),
+        )
+        stream.write(self.bits)
+
+    @classmethod
+    def load(cls, stream: BinaryIO) -> 'BloomFilter':
+        header = _BLOOM.unpack(stream.read(_BLOOM.size))
+        size, hashes, count, capacity, error_rate = header
+
+        bloom = cls.__new__(cls)
+        bloom.capacity = capacity
+        bloom.error_rate = error_rate
+        bloom.size = size
+        bloom.hashes = hashes
+        bloom.count = count
+        bloom.bits = bytearray(stream.read((size + 7) // 8))
+        return bloom
+
+
+class VisitedSet(object):
+
+    def __init__(self, capacity: int = 10000000, error_rate: float = 0.001):
+        """
+        Visited accounts keyed by integer ID or by screen name.
+
+        Integer IDs are kept exactly in an IntSet. Screen names go to a
+        BloomFilter and are lowercased first, so with error_rate of them a
+        never visited name is reported as visited. `Frontier` dedupes on
+        the IDs and only uses the names as a pre-check.
+
+        Arguments:
+            capacity: Expected number of screen names
+            error_rate: False positive rate for screen names at capacity
+        """
+        self.ids = IntSet()
+        self.names = BloomFilter(capacity, error_rate)
+        self._lock = threading.Lock()
+
+    def add(self, key: Union[int, str]) -> bool:
+        """
+        Mark an account as visited.
+
+        Returns
+            True if the account was not visited yet
+        """
+        with self._lock:
+            if isinstance(key, int):
+                return self.ids.add(key)
+            return self.names.add(key.lower())
+
+    def __contains__(self, key: Union[int, str]) -> bool:
+        if isinstance(key, int):
+            return key in self.ids
+        return key.lower() in self.names
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.names)
+
+    def save(self, path: str) -> None:
+        """Write the set to a file, replacing it atomically."""
+        with self._lock:
+            with open(f'{path}.part', 'wb') as visited_file:
+                visited_file.write(_MAGIC + bytes([_VERSION]))
+                self.ids.dump(visited_file)
+                self.names.dump(visited_file)
+            os.replace(f'{path}.part', path)
+
+    @classmethod
+    def load(cls, path: str) -> 'VisitedSet':
+        """
+        Read a set written by `save`.
+
+        Raises
+            TwitterAPIClientException: if the file is not a visited set
+        """
+        with open(path, 'rb') as visited_file:
+            header = visited_file.read(len(_MAGIC) + 1)
+            if header != _MAGIC + bytes([_VERSION]):
+                raise TwitterAPIClientException(
+                    f'Not a visited set file: {path}',
+                )
+
+            visited = cls.__new__(cls)
+            visited.ids = IntSet.load(visited_file)
+            visited.names = BloomFilter.load(visited_file)
+            visited._lock = threading.Lock()
+
+        return visited
+
+
+def _merge(first: array.array, second: array.array) -> array.array:
+    """Merge two sorted runs of distinct values."""
+    merged = array.array('Q')
+    i = j = 0
+
+    while i < len(first) and j < len(second):
+        pivot = min(
+            first[min(i + MERGE_SLICE, len(first)) - 1],
+            second[min(j + MERGE_SLICE, len(second)) - 1],
+        )
+        first_stop = bisect.bisect_right(first, pivot, i)
+        second_stop = bisect.bisect_right(second, pivot, j)
+        merged.extend(sorted(first[i:first_stop] + second[j:second_stop]))
+        i, j = first_stop, second_stop
+
+    merged.extend(first[i:])
+    merged.extend(second[j:])
+    return merged
+
+
+def _little_endian(group: array.array) -> array.array:
+    if sys.byteorder == 'big':
+        group = array.array(group.typecode, group)
+        group.byteswap()
+    return group